@@ -0,0 +1,121 @@
+import subprocess
+
+# Segments are no shorter than this; each one pays an encoder warm-up and a keyframe
+MIN_SEGMENT_SECONDS = 30.0
+# Segments per worker, so one slow (high-motion) segment does not leave the others idle
+SEGMENTS_PER_WORKER = 4
+# Cut points sit this far before a keyframe, so a rounded timestamp never drops the keyframe itself
+SEEK_EPSILON = 0.0005
+
+
+def keyframe_times(ffprobe_path, input_file, startupinfo=None):
+    """Video keyframe times in seconds from the start of the file, read from packet flags
+
+    Only packets are read, nothing is decoded, so this takes seconds even
+    for hours of video. Raises RuntimeError if ffprobe fails, since a
+    partial list would put the cuts in the wrong places.
+    """
+    cmd = [
+        ffprobe_path, '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'format=start_time:packet=pts_time,flags',
+        '-of', 'csv',
+        input_file
+    ]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               universal_newlines=True, startupinfo=startupinfo)
+    times = []
+    start_time = 0.0
+    for line in process.stdout:
+        fields = line.strip().split(',')
+        try:
+            if fields[0] == 'packet' and 'K' in fields[2]:
+                times.append(float(fields[1]))
+            elif fields[0] == 'format':
+                start_time = float(fields[1])
+        except (IndexError, ValueError):
+            continue  # N/A timestamps
+    if process.wait() != 0:
+        raise RuntimeError(f"ffprobe could not read keyframes (exit code {process.returncode})")
+    # -ss counts from the start of the file, packet times from the container's zero
+    return sorted(t - start_time for t in times)
+
+
+def segment_length_for(duration, workers):
+    return max(MIN_SEGMENT_SECONDS, duration / (max(1, workers) * SEGMENTS_PER_WORKER))
+
+
+def plan_segments(keyframes, duration, target_length):
+    """Split [0, duration) at keyframes into (start, length) segments of about target_length seconds
+
+    Consecutive segments share their cut point, so every frame lands in
+    exactly one segment.
+    """
+    cuts = [0.0]
+    for time_point in keyframes:
+        if time_point - cuts[-1] >= target_length and duration - time_point >= target_length / 2:
+            cuts.append(time_point - SEEK_EPSILON)
+    cuts.append(duration)
+    return [(start, end - start) for start, end in zip(cuts, cuts[1:])]
+
+
+def build_segment_command(ffmpeg_path, input_file, segment_file, start, length, settings, threads=None):
+    """Encode one video-only segment; input seeking to a keyframe makes the cut exact and cheap"""
+    cmd = [ffmpeg_path]
+    if start > 0:
+        cmd += ['-ss', f"{start:.6f}"]
+    cmd += [
+        '-i', input_file,
+        '-t', f"{length:.6f}",
+        '-map', '0:v:0',
+        '-an', '-sn', '-dn',
+        '-c:v', 'libx264',
+        '-crf', str(settings['crf']),
+        '-preset', settings['preset'],
+    ]
+    if threads:
+        cmd += ['-threads', str(threads)]
+    cmd += [
+        # Keep source timestamps; duplicated or dropped frames would show at the joins
+        '-fps_mode', 'passthrough',
+        '-y', segment_file
+    ]
+    return cmd
+
+
+def build_audio_command(ffmpeg_path, input_file, audio_file, settings):
+    """Encode the whole audio track in one piece, so there are no AAC priming gaps at segment joins"""
+    return [
+        ffmpeg_path,
+        '-i', input_file,
+        '-map', '0:a:0',
+        '-vn', '-sn', '-dn',
+        '-c:a', 'aac',
+        '-b:a', f"{settings['audio_quality']}k",
+        '-y', audio_file
+    ]
+
+
+def write_concat_list(list_file, segment_files):
+    """Write an ffconcat file naming each segment"""
+    with open(list_file, 'w', encoding='utf-8') as f:
+        f.write("ffconcat version 1.0\n")
+        for segment_file in segment_files:
+            escaped = segment_file.replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+
+def build_concat_command(ffmpeg_path, list_file, audio_file, output_file):
+    """Join the segments and the audio track (None for silent inputs) without re-encoding"""
+    cmd = [ffmpeg_path, '-f', 'concat', '-safe', '0', '-i', list_file]
+    if audio_file:
+        cmd += ['-i', audio_file]
+    cmd += ['-map', '0:v:0']
+    if audio_file:
+        cmd += ['-map', '1:a:0']
+    cmd += [
+        '-c', 'copy',
+        '-movflags', '+faststart',
+        '-y', output_file
+    ]
+    return cmd
@@ -1,11 +1,14 @@
 import os
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import subprocess
 from threading import Thread
-import sys
+import sqlite3
 import tarfile
 import platform
+from transcode_engine import TranscodeEngine, TranscodeJob, get_quality_settings
+from media_probe import PLAN_AUDIO, PLAN_COPY, ProbeCache
+from crf_search import SampleCache
+from ui_events import UIEventBus
 
 class AutoFFmpegConverter:
     def __init__(self, root):
@@ -16,6 +19,10 @@ class AutoFFmpegConverter:
         # Variabel FFmpeg
         self.ffmpeg_path = None
         self.ffmpeg_extracted = False
+        self.engine = None
+        
+        # Antrian update UI dari worker thread
+        self.ui = UIEventBus(self.root)
         
         # Setup UI
         self.setup_ui()
@@ -33,6 +40,9 @@ class AutoFFmpegConverter:
         self.input_path = tk.StringVar()
         self.output_path = tk.StringVar()
         self.quality_var = tk.StringVar(value="balanced")
+        self.chunked_var = tk.BooleanVar(value=False)
+        self.target_size_var = tk.StringVar()
+        self.auto_crf_var = tk.BooleanVar(value=False)
         self.status_var = tk.StringVar(value="Ready")
         
         # Main Frame
@@ -66,6 +76,16 @@ class AutoFFmpegConverter:
                     values=["high", "balanced", "medium", "small"], 
                     state="readonly").grid(row=2, column=1, sticky=tk.W, padx=5)
         
+        ttk.Checkbutton(input_frame, text="Parallel chunked encode (long videos)",
+                        variable=self.chunked_var).grid(row=3, column=1, sticky=tk.W, padx=5)
+        
+        ttk.Label(input_frame, text="Target Size (MB):").grid(row=4, column=0, sticky=tk.W)
+        ttk.Entry(input_frame, textvariable=self.target_size_var, width=10).grid(row=4, column=1, sticky=tk.W, padx=5)
+        ttk.Label(input_frame, text="(empty = use quality preset)").grid(row=4, column=1, padx=90, sticky=tk.W)
+        
+        ttk.Checkbutton(input_frame, text="Auto CRF per video (preset sets the quality target)",
+                        variable=self.auto_crf_var).grid(row=5, column=1, sticky=tk.W, padx=5)
+        
         # Progress
         self.progress = ttk.Progressbar(main_frame, orient=tk.HORIZONTAL, length=550, mode='determinate')
         self.progress.pack(pady=15)
@@ -74,6 +94,9 @@ class AutoFFmpegConverter:
         self.status_label = ttk.Label(main_frame, textvariable=self.status_var)
         self.status_label.pack()
         
+        self.ui.register('progress', lambda value: self.progress.configure(value=value))
+        self.ui.register('status', self.status_var.set)
+        
         # Convert Button
         self.convert_btn = ttk.Button(main_frame, text="Convert Video", command=self.start_conversion, state=tk.DISABLED)
         self.convert_btn.pack(pady=10)
@@ -180,16 +203,7 @@ class AutoFFmpegConverter:
     
     def get_quality_settings(self):
         """Return FFmpeg parameters based on quality selection"""
-        quality = self.quality_var.get()
-        
-        if quality == "high":
-            return {"crf": 18, "preset": "slow", "audio_quality": 192}
-        elif quality == "balanced":
-            return {"crf": 22, "preset": "medium", "audio_quality": 160}
-        elif quality == "medium":
-            return {"crf": 26, "preset": "fast", "audio_quality": 128}
-        else:  # small
-            return {"crf": 30, "preset": "veryfast", "audio_quality": 96}
+        return get_quality_settings(self.quality_var.get())
     
     def start_conversion(self):
         if not self.ffmpeg_extracted:
@@ -204,112 +218,88 @@ class AutoFFmpegConverter:
             messagebox.showerror("Error", "Please select output video file")
             return
             
+        target_size = self.target_size_var.get().strip()
+        try:
+            target_size_mb = float(target_size) if target_size else None
+        except ValueError:
+            messagebox.showerror("Error", "Target size must be a number of MB")
+            return
+        if target_size_mb is not None and target_size_mb <= 0:
+            messagebox.showerror("Error", "Target size must be greater than 0 MB")
+            return
+        
+        job = TranscodeJob(self.input_path.get(), self.output_path.get(), self.quality_var.get(),
+                           chunked=self.chunked_var.get(), target_size_mb=target_size_mb,
+                           auto_crf=self.auto_crf_var.get())
+        self.output_path.set(job.output_file)
+        self.status_var.set("Preparing conversion...")
+        self.progress['value'] = 0
+        
         # Start conversion in thread
-        Thread(target=self.run_conversion, daemon=True).start()
+        Thread(target=self.run_conversion, args=(job,), daemon=True).start()
+    
+    def get_engine(self):
+        """Return the transcode engine bound to the current FFmpeg binary"""
+        if self.engine is None or self.engine.ffmpeg_path != self.ffmpeg_path:
+            try:
+                probe_cache, sample_cache = ProbeCache(), SampleCache()
+            except (OSError, sqlite3.Error):
+                probe_cache, sample_cache = None, None  # Tanpa cache, tiap file di-probe ulang
+            self.engine = TranscodeEngine(self.ffmpeg_path, probe_cache=probe_cache, sample_cache=sample_cache)
+        return self.engine
     
-    def run_conversion(self):
+    def run_conversion(self, job):
+        completed = False
         try:
-            input_file = self.input_path.get()
-            output_file = self.output_path.get()
-            
-            # Validasi file input
-            if not os.path.exists(input_file):
-                messagebox.showerror("Error", "Input file does not exist!")
-                return
-                
-            # Cek ekstensi output
-            if not output_file.lower().endswith('.mp4'):
-                output_file += '.mp4'
-                self.output_path.set(output_file)
-            
-            # Get quality settings
-            settings = self.get_quality_settings()
-            
-            # Update UI
-            self.status_var.set("Preparing conversion...")
-            self.progress['value'] = 0
-            self.root.update()
-            
-            # Bangun perintah FFmpeg
-            cmd = [
-                self.ffmpeg_path,
-                '-i', input_file,
-                '-c:v', 'libx264',
-                '-crf', str(settings['crf']),
-                '-preset', settings['preset'],
-                '-c:a', 'aac',
-                '-b:a', f"{settings['audio_quality']}k",
-                '-movflags', '+faststart',
-                '-y',  # Overwrite output
-                output_file
-            ]
-            
-            # Untuk Windows, kita perlu mengatur startupinfo
-            startupinfo = None
-            if platform.system() == "Windows":
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            
-            # Jalankan FFmpeg
-            process = subprocess.Popen(
-                cmd, 
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1,
-                startupinfo=startupinfo
-            )
-            
-            # Parse output untuk progress
-            duration = 0
-            for line in process.stdout:
-                line = line.strip()
-                
-                # Cari durasi video
-                if 'Duration:' in line:
-                    time_str = line.split('Duration:')[1].split(',')[0].strip()
-                    h, m, s = time_str.split(':')
-                    duration = int(h)*3600 + int(m)*60 + float(s)
-                
-                # Update progress
-                if 'time=' in line:
-                    time_str = line.split('time=')[1].split()[0]
-                    h, m, s = time_str.split(':')
-                    current_time = int(h)*3600 + int(m)*60 + float(s)
-                    
-                    if duration > 0:
-                        progress_percent = (current_time / duration) * 100
-                        self.progress['value'] = progress_percent
-                        self.status_var.set(f"Converting... {progress_percent:.1f}%")
-                        self.root.update()
+            def on_progress(event):
+                percent = event.percent
+                if percent is None:
+                    return
+                self.ui.set('progress', percent)
+                self.ui.set('status', f"Converting... {percent:.1f}%")
             
-            process.wait()
+            result = self.get_engine().run_job(job, on_progress=on_progress)
             
-            if process.returncode == 0:
-                self.progress['value'] = 100
-                self.status_var.set("Conversion complete!")
+            if result.ok:
+                completed = True
+                self.ui.set('progress', 100)
+                if result.plan == PLAN_COPY:
+                    self.ui.set('status', "Conversion complete! (already compliant, stream copied)")
+                elif result.plan == PLAN_AUDIO:
+                    self.ui.set('status', "Conversion complete! (video copied, audio re-encoded)")
+                elif result.crf_search:
+                    self.ui.set('status', f"Conversion complete! ({result.crf_search})")
+                elif result.size_error is not None:
+                    self.ui.set('status', f"Conversion complete, but {result.size_error:+.1%} off the target size "
+                                          f"after {result.passes} passes")
+                elif result.passes:
+                    self.ui.set('status', f"Conversion complete! ({result.passes} passes in {result.elapsed:.0f}s)")
+                else:
+                    self.ui.set('status', "Conversion complete!")
                 
                 # Tampilkan info ukuran file
-                input_size = os.path.getsize(input_file) / (1024 * 1024)  # MB
-                output_size = os.path.getsize(output_file) / (1024 * 1024)  # MB
+                input_size = result.input_size / (1024 * 1024)  # MB
+                output_size = result.output_size / (1024 * 1024)  # MB
                 
-                messagebox.showinfo(
+                self.ui.call(
+                    messagebox.showinfo,
                     "Success", 
                     f"Video converted successfully!\n\n"
                     f"Original size: {input_size:.2f} MB\n"
                     f"Compressed size: {output_size:.2f} MB\n"
-                    f"Saved to: {output_file}"
+                    f"Saved to: {job.output_file}"
+                    + "".join(f"\n\nNote: {warning}" for warning in result.warnings)
                 )
             else:
-                messagebox.showerror("Error", "Video conversion failed")
-                self.status_var.set("Conversion failed")
+                self.ui.call(messagebox.showerror, "Error", f"Video conversion failed: {result.error}")
+                self.ui.set('status', "Conversion failed")
             
         except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
-            self.status_var.set(f"Error: {str(e)}")
+            self.ui.call(messagebox.showerror, "Error", f"An error occurred: {str(e)}")
+            self.ui.set('status', f"Error: {str(e)}")
         finally:
-            if self.progress['value'] < 100:
-                self.progress['value'] = 0
+            if not completed:
+                self.ui.set('progress', 0)
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,209 @@
+import os
+import re
+import sqlite3
+import tempfile
+import subprocess
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+
+SCHEMA_VERSION = 1
+CANDIDATE_CRFS = tuple(range(16, 36, 2))
+SAMPLE_COUNT = 3
+SAMPLE_SECONDS = 4.0
+# Score each quality preset has to reach: SSIM (0-1) or PSNR (dB), averaged over the samples
+QUALITY_TARGETS = {
+    'ssim': {"high": 0.99, "balanced": 0.98, "medium": 0.97, "small": 0.955},
+    'psnr': {"high": 45.0, "balanced": 42.0, "medium": 39.0, "small": 36.0},
+}
+METRIC_PATTERNS = {
+    'ssim': re.compile(r'SSIM .*All:([0-9.]+)'),
+    'psnr': re.compile(r'PSNR .*average:([0-9.]+|inf)'),
+}
+
+
+def default_cache_path():
+    return os.path.join(os.path.expanduser('~'), '.auto_ffmpeg', 'crf_samples.sqlite3')
+
+
+def sample_windows(duration, count=SAMPLE_COUNT, length=SAMPLE_SECONDS):
+    """(start, length) windows spread evenly through the input, away from intros and credits"""
+    if duration <= count * length:
+        return [(0.0, duration)]
+    return [(duration * (i + 1) / (count + 1) - length / 2, length) for i in range(count)]
+
+
+def target_score(metric, quality):
+    targets = QUALITY_TARGETS[metric]
+    return targets.get(quality, targets["balanced"])
+
+
+def build_sample_command(ffmpeg_path, input_file, sample_file, start, length, crf, settings, threads=None):
+    cmd = [
+        ffmpeg_path, '-hide_banner', '-nostats', '-loglevel', 'error',
+        '-ss', f"{start:.3f}", '-t', f"{length:.3f}",
+        '-i', input_file,
+        '-map', '0:v:0', '-an', '-sn', '-dn',
+        '-c:v', 'libx264',
+        '-crf', str(crf),
+        '-preset', settings['preset'],
+    ]
+    if threads:
+        cmd += ['-threads', str(threads)]
+    return cmd + ['-y', sample_file]
+
+
+def build_metric_command(ffmpeg_path, input_file, sample_file, start, length, metric):
+    """Compare a sample with the same window of the source; the filter prints its summary at info level"""
+    return [
+        ffmpeg_path, '-hide_banner', '-nostats', '-loglevel', 'info',
+        '-i', sample_file,
+        '-ss', f"{start:.3f}", '-t', f"{length:.3f}",
+        '-i', input_file,
+        '-lavfi', f"[0:v][1:v:0]{metric}",
+        '-f', 'null', '-'
+    ]
+
+
+def parse_score(metric, stderr):
+    match = None
+    for match in METRIC_PATTERNS[metric].finditer(stderr):
+        pass
+    if match is None:
+        raise RuntimeError(f"No {metric.upper()} summary in ffmpeg output")
+    # Identical frames give an infinite PSNR
+    return float('inf') if match.group(1) == 'inf' else float(match.group(1))
+
+
+def choose_crf(scores, target):
+    """Highest CRF whose mean score still meets target; the lowest candidate if none does"""
+    passing = [crf for crf, score in scores.items() if score >= target]
+    return max(passing) if passing else min(scores)
+
+
+class SampleCache:
+    """Mean sample scores keyed by input identity, sampling, x264 preset, metric and CRF"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or default_cache_path()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                conn.execute('DROP TABLE IF EXISTS samples')
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS samples (
+                    key TEXT NOT NULL,
+                    crf INTEGER NOT NULL,
+                    score REAL NOT NULL,
+                    PRIMARY KEY (key, crf)
+                )
+            ''')
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    @staticmethod
+    def key(input_identity, windows, settings, metric):
+        spec = ','.join(f"{start:.3f}+{length:.3f}" for start, length in windows)
+        return f"{input_identity}|{spec}|{settings['preset']}|{metric}"
+
+    def get(self, key):
+        """{crf: score} already measured for key"""
+        with closing(self._connect()) as conn:
+            return dict(conn.execute('SELECT crf, score FROM samples WHERE key = ?', (key,)).fetchall())
+
+    def put_many(self, key, scores):
+        with closing(self._connect()) as conn, conn:
+            conn.executemany('INSERT OR REPLACE INTO samples VALUES (?, ?, ?)',
+                             [(key, crf, score) for crf, score in scores.items()])
+
+
+class CRFSearch:
+    """Outcome of a per-title CRF search"""
+
+    def __init__(self, metric, target, scores, crf, cached):
+        self.metric = metric
+        self.target = target
+        self.scores = scores  # {crf: mean score over the sample windows}
+        self.crf = crf
+        self.cached = cached  # CRFs answered from the cache
+
+    def __str__(self):
+        return (f"CRF {self.crf} ({self.metric.upper()} {self.scores[self.crf]:.4g}, target {self.target:g}; "
+                f"{len(self.scores) - self.cached} of {len(self.scores)} CRFs sampled)")
+
+
+def _probe_points(lo, hi, count):
+    """Up to count candidate indices spread evenly through lo..hi; one is the midpoint"""
+    return sorted({lo + (hi - lo + 1) * (j + 1) // (count + 1) for j in range(count)})
+
+
+def search_crf(run, ffmpeg_path, input_file, duration, settings, target, metric='ssim', workers=1,
+               threads=None, cache=None, input_identity=None, candidates=CANDIDATE_CRFS):
+    """Search candidates for the highest CRF that meets target, encoding sample windows in parallel
+
+    Quality falls as CRF rises, so the candidates are bisected: a CRF that
+    misses the target rules out every higher one. With more workers than
+    sample windows several CRFs are probed per round. Cached scores narrow
+    the range for free. Raises RuntimeError if a sample encode or metric
+    run fails.
+
+    run(cmd) runs one ffmpeg command and returns (returncode, stderr text),
+    so the caller can track and cancel the processes.
+    """
+    candidates = sorted(candidates)
+    windows = sample_windows(duration)
+    key = SampleCache.key(input_identity or os.path.abspath(input_file), windows, settings, metric)
+    scores = {}
+    if cache is not None:
+        try:
+            scores = {crf: score for crf, score in cache.get(key).items() if crf in candidates}
+        except (OSError, sqlite3.Error):
+            scores = {}
+    cached = len(scores)
+    measured = {}
+    per_round = max(1, workers // len(windows))
+
+    with tempfile.TemporaryDirectory(prefix='crf-samples-') as work_dir, \
+            ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+
+        def measure(crf, index, start, length):
+            sample_file = os.path.join(work_dir, f"crf{crf}-{index}.mp4")
+            returncode, stderr = run(build_sample_command(ffmpeg_path, input_file, sample_file, start, length,
+                                                          crf, settings, threads))
+            if returncode != 0:
+                raise RuntimeError(f"Sample encode at CRF {crf} failed: {stderr.strip()[-200:]}")
+            returncode, stderr = run(build_metric_command(ffmpeg_path, input_file, sample_file,
+                                                          start, length, metric))
+            if returncode != 0:
+                raise RuntimeError(f"{metric.upper()} measurement failed: {stderr.strip()[-200:]}")
+            os.remove(sample_file)
+            return parse_score(metric, stderr)
+
+        # Indices lo..hi are still undecided; everything below lo passed, everything above hi missed
+        lo, hi = 0, len(candidates) - 1
+        while lo <= hi:
+            probes = [i for i in range(lo, hi + 1) if candidates[i] in scores]
+            if not probes:
+                probes = _probe_points(lo, hi, per_round)
+                futures = {candidates[i]: [pool.submit(measure, candidates[i], index, start, length)
+                                           for index, (start, length) in enumerate(windows)] for i in probes}
+                for crf, window_futures in futures.items():
+                    measured[crf] = sum(f.result() for f in window_futures) / len(window_futures)
+                scores.update(measured)
+            for i in probes:
+                if scores[candidates[i]] >= target:
+                    lo = i + 1
+                else:
+                    hi = i - 1
+                    break
+
+    if cache is not None and measured:
+        try:
+            cache.put_many(key, measured)
+        except (OSError, sqlite3.Error):
+            pass
+
+    return CRFSearch(metric, target, scores, choose_crf(scores, target), cached)
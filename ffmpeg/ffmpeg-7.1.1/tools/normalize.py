@@ -1,22 +1,36 @@
 #!/usr/bin/env python3
 
 import argparse
+import json
 import logging
+import os
+import re
 import shlex
+import sqlite3
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
 
 HELP = '''
 Normalize audio input.
 
-The command uses ffprobe to analyze an input file with the ebur128
-filter, and finally run ffmpeg to normalize the input depending on the
-computed adjustment.
+The command analyzes each input once with the loudnorm filter and then
+runs ffmpeg to normalize it depending on the measured loudness, either
+with a plain volume adjustment (default) or with a second loudnorm pass
+fed with the measured values (--mode loudnorm).
+
+Several inputs can be given (-i a.wav -i b.wav --output-dir out); they
+are analyzed and encoded concurrently. Measurements are cached per file,
+and inputs already within --tolerance of the target are skipped.
 
 ffmpeg encoding arguments can be passed through the extra arguments
 after options, for example as in:
 normalize.py --input input.mp3 --output output.mp3 -- -loglevel debug -y
 '''
 
+CACHE_SCHEMA_VERSION = 2
+AUDIO_RATE_PATTERN = re.compile(r'Stream #\S+.*: Audio: .*?, (\d+) Hz')
+
 logging.basicConfig(format='normalize|%(levelname)s> %(message)s', level=logging.INFO)
 log = logging.getLogger()
 
@@ -27,47 +41,188 @@ class Formatter(
     pass
 
 
+def _run_command(cmd, dry_run=False, capture=False):
+    """Run cmd with no stdin, so concurrent ffmpegs never read the terminal or wait on a prompt
+
+    Only capture=True keeps stderr (for parsing); otherwise ffmpeg logs to the terminal.
+    """
+    log.info(f"Running command:\n$ {shlex.join(cmd)}")
+    if not dry_run:
+        return subprocess.run(cmd, check=True, stdin=subprocess.DEVNULL,
+                              stderr=subprocess.PIPE if capture else None, text=True)
+
+
+def default_cache_path():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'ffmpeg-normalize.sqlite3')
+
+
+class LoudnessCache:
+    """loudnorm measurements keyed by path, invalidated by size and mtime"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(sqlite3.connect(db_path)) as conn, conn:
+            if conn.execute('PRAGMA user_version').fetchone()[0] != CACHE_SCHEMA_VERSION:
+                conn.execute('DROP TABLE IF EXISTS loudness')
+                conn.execute(f'PRAGMA user_version = {CACHE_SCHEMA_VERSION}')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS loudness (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    stats TEXT NOT NULL
+                )
+            ''')
+
+    @staticmethod
+    def _identity(path):
+        st = os.stat(path)
+        return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+    def get(self, path):
+        try:
+            key, size, mtime_ns = self._identity(path)
+            with closing(sqlite3.connect(self.db_path)) as conn:
+                row = conn.execute('SELECT size, mtime_ns, stats FROM loudness WHERE path = ?', (key,)).fetchone()
+        except (OSError, sqlite3.Error):
+            return None
+        if row is None or (row[0], row[1]) != (size, mtime_ns):
+            return None
+        return json.loads(row[2])
+
+    def put(self, path, stats):
+        key, size, mtime_ns = self._identity(path)
+        with closing(sqlite3.connect(self.db_path)) as conn, conn:
+            conn.execute('INSERT OR REPLACE INTO loudness VALUES (?, ?, ?, ?)', (key, size, mtime_ns, json.dumps(stats)))
+
+
+def parse_loudnorm_stats(stderr):
+    """The JSON block loudnorm prints at the end of an analysis pass, plus the input sample rate"""
+    end = stderr.rfind('}')
+    start = stderr.rfind('{', 0, end)
+    if start < 0 or end < 0:
+        raise ValueError("no loudnorm statistics in ffmpeg output")
+    stats = json.loads(stderr[start:end + 1])
+    missing = [key for key in ('input_i', 'input_tp', 'input_lra', 'input_thresh') if key not in stats]
+    if missing:
+        raise ValueError(f"incomplete loudnorm statistics, missing {', '.join(missing)}")
+    rate = AUDIO_RATE_PATTERN.search(stderr)
+    return {
+        'input_i': stats['input_i'],
+        'input_tp': stats['input_tp'],
+        'input_lra': stats['input_lra'],
+        'input_thresh': stats['input_thresh'],
+        'sample_rate': int(rate.group(1)) if rate else None,
+    }
+
+
+def analyze(path, target, true_peak, lra):
+    """Decode the audio once through loudnorm and return its input measurements"""
+    cmd = [
+        'ffmpeg', '-nostdin', '-hide_banner', '-nostats', '-i', path, '-vn', '-sn', '-dn',
+        '-af', f'loudnorm=I={target}:TP={true_peak}:LRA={lra}:print_format=json',
+        '-f', 'null', '-'
+    ]
+    result = _run_command(cmd, capture=True)
+    return parse_loudnorm_stats(result.stderr)
+
+
+def normalize_command(path, output, stats, args):
+    if args.mode == 'loudnorm':
+        audio_filter = (
+            f"loudnorm=I={args.target}:TP={args.true_peak}:LRA={args.lra}"
+            f":measured_I={stats['input_i']}:measured_TP={stats['input_tp']}"
+            f":measured_LRA={stats['input_lra']}:measured_thresh={stats['input_thresh']}"
+            ":linear=true"
+        )
+        # loudnorm always outputs 192 kHz; go back to the source rate
+        if stats.get('sample_rate'):
+            audio_filter += f",aresample={stats['sample_rate']}"
+    else:
+        audio_filter = f"volume={args.target - float(stats['input_i']):.2f}dB"
+    return ['ffmpeg', '-nostdin', '-i', path, '-af', audio_filter] + args.encode_arguments + [output]
+
+
+def process(path, output, stats, args):
+    """Analyze (unless stats came from the cache) and normalize one input; returns (stats, action)"""
+    if stats is None:
+        stats = analyze(path, args.target, args.true_peak, args.lra)
+    loudness = float(stats['input_i'])
+    adjust = args.target - loudness
+    if abs(adjust) <= args.tolerance:
+        log.info(f"No normalization needed for '{path}' ({loudness:.2f} LUFS)")
+        return stats, 'skipped'
+    log.info(f"Adjusting '{path}' by {adjust:.2f}dB ({args.mode})...")
+    _run_command(normalize_command(path, output, stats, args), args.dry_run)
+    return stats, 'normalized'
+
+
 def normalize():
     parser = argparse.ArgumentParser(description=HELP, formatter_class=Formatter)
-    parser.add_argument('--input', '-i', required=True, help='specify input file')
-    parser.add_argument('--output', '-o', required=True, help='specify output file')
+    parser.add_argument('--input', '-i', required=True, action='append',
+                        help='specify input file; repeat for a batch')
+    parser.add_argument('--output', '-o', help='specify output file (single input)')
+    parser.add_argument('--output-dir', help='write each normalized input here under its own name (batch)')
+    parser.add_argument('--mode', choices=('volume', 'loudnorm'), default='volume',
+                        help='plain gain change, or a second loudnorm pass using the measured values')
+    parser.add_argument('--target', type=float, default=-23.0, help='integrated loudness target in LUFS')
+    parser.add_argument('--true-peak', type=float, default=-2.0, help='loudnorm true peak ceiling in dBTP')
+    parser.add_argument('--lra', type=float, default=7.0, help='loudnorm loudness range target in LU')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='skip inputs whose loudness is within this many LU of the target')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1,
+                        help='inputs analyzed and encoded at the same time')
+    parser.add_argument('--cache', default=default_cache_path(), help='loudness measurement cache file')
+    parser.add_argument('--no-cache', action='store_true', help='always analyze, do not read or write the cache')
     parser.add_argument('--dry-run', '-n', help='simulate commands', action='store_true')
     parser.add_argument('encode_arguments', nargs='*', help='specify encode options used for the actual encoding')
 
     args = parser.parse_args()
-
-    analysis_cmd = [
-        'ffprobe', '-v', 'error', '-of', 'compact=p=0:nk=1',
-        '-show_entries', 'frame_tags=lavfi.r128.I', '-f', 'lavfi',
-        f"amovie='{args.input}',ebur128=metadata=1"
-    ]
-
-    def _run_command(cmd, dry_run=False):
-        log.info(f"Running command:\n$ {shlex.join(cmd)}")
-        if not dry_run:
-            result = subprocess.run(cmd, check=True, stdout=subprocess.PIPE)
-            return result
-
-    result = _run_command(analysis_cmd)
-
-    loudness = ref = -23
-    for line in result.stdout.splitlines():
-        sline = line.rstrip()
-        if sline:
-            loudness = sline
-
-    adjust = ref - float(loudness)
-    if abs(adjust) < 0.0001:
-        logging.info(f"No normalization needed for '{args.input}'")
-        return
-
-    logging.info(f"Adjusting '{args.input}' by {adjust:.2f}dB...")
-    normalize_cmd = [
-        'ffmpeg', '-i', args.input, '-af', f'volume={adjust:.2f}dB'
-    ] + args.encode_arguments + [args.output]
-
-    _run_command(normalize_cmd, args.dry_run)
+    if len(args.input) > 1 and not args.output_dir:
+        parser.error('--output-dir is required with more than one input')
+    if not args.output and not args.output_dir:
+        parser.error('one of --output or --output-dir is required')
+    if args.output and len(args.input) > 1:
+        parser.error('--output takes a single input; use --output-dir for a batch')
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    cache = None if args.no_cache else LoudnessCache(args.cache)
+    outputs = {path: args.output or os.path.join(args.output_dir, os.path.basename(path)) for path in args.input}
+    targets = {}
+    for path in args.input:
+        target = os.path.abspath(outputs[path])
+        if target in targets:
+            parser.error(f"'{targets[target]}' and '{path}' would both be written to '{outputs[path]}'")
+        targets[target] = path
+
+    # The work happens in the ffmpeg children, so threads are enough to keep one ffmpeg per job running
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = {
+            pool.submit(process, path, outputs[path], cache.get(path) if cache else None, args): path
+            for path in args.input
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                stats, action = future.result()
+            except (subprocess.CalledProcessError, OSError, ValueError, KeyError) as e:
+                stderr = getattr(e, 'stderr', None)
+                detail = stderr.strip().splitlines()[-1] if stderr and stderr.strip() else str(e)
+                log.error(f"Failed to normalize '{path}': {detail}")
+                failed += 1
+                continue
+            if cache:
+                try:
+                    cache.put(path, stats)
+                except (OSError, sqlite3.Error) as e:
+                    log.warning(f"Could not cache loudness of '{path}': {e}")
+            log.info(f"{action}: '{path}'")
+    return 1 if failed else 0
 
 
 if __name__ == '__main__':
-    normalize()
+    raise SystemExit(normalize())
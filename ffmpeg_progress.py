@@ -0,0 +1,148 @@
+import os
+import re
+import time
+import subprocess
+from threading import Lock
+
+# Input summary line ffmpeg logs at info level
+DURATION_PATTERN = re.compile(r'Duration: (\d+):(\d{2}):(\d{2}(?:\.\d+)?)')
+
+
+def ffprobe_path_for(ffmpeg_path):
+    """Return the ffprobe binary that sits next to an ffmpeg binary"""
+    dir_name, file_name = os.path.split(ffmpeg_path)
+    return os.path.join(dir_name, file_name.replace('ffmpeg', 'ffprobe', 1))
+
+
+def probe_duration(ffprobe_path, input_file, startupinfo=None):
+    """Return the container duration in seconds using a single ffprobe call"""
+    cmd = [
+        ffprobe_path, '-v', 'error',
+        '-show_entries', 'format=duration',
+        '-of', 'default=noprint_wrappers=1:nokey=1',
+        input_file
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                universal_newlines=True, startupinfo=startupinfo)
+        return float(result.stdout.strip())
+    except (OSError, ValueError):
+        return 0.0
+
+
+def parse_duration(line):
+    """Seconds from an ffmpeg 'Duration: 00:01:02.50' line, None for other lines or N/A"""
+    match = DURATION_PATTERN.search(line)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _number(value, suffix=''):
+    """Parse a -progress value like '1.5x' or '812.3kbits/s', None for N/A"""
+    if value is None:
+        return None
+    value = value.strip()
+    if suffix and value.endswith(suffix):
+        value = value[:-len(suffix)]
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class ProgressEvent:
+    """Structured snapshot of one ffmpeg -progress block"""
+
+    def __init__(self, job, duration, fields):
+        self.job = job
+        self.duration = duration
+        self.done = fields.get('progress') == 'end'
+        self.frame = _number(fields.get('frame'))
+        self.fps = _number(fields.get('fps'))
+        self.speed = _number(fields.get('speed'), 'x')
+        self.bitrate = _number(fields.get('bitrate'), 'kbits/s')  # kbit/s
+        self.total_size = _number(fields.get('total_size'))  # bytes
+        # out_time_ms is actually microseconds, like out_time_us
+        out_us = _number(fields.get('out_time_us')) or _number(fields.get('out_time_ms'))
+        self.out_time = out_us / 1000000 if out_us is not None and out_us >= 0 else None
+
+    @property
+    def percent(self):
+        if self.done:
+            return 100.0
+        if not self.duration or self.out_time is None:
+            return None
+        return max(0.0, min(100.0, self.out_time / self.duration * 100))
+
+    def __repr__(self):
+        return (f"ProgressEvent(out_time={self.out_time}, fps={self.fps}, speed={self.speed}, "
+                f"bitrate={self.bitrate}, total_size={self.total_size}, done={self.done})")
+
+
+class ProgressParser:
+    """Turn the key=value lines of `ffmpeg -progress pipe:1` into ProgressEvents"""
+
+    def __init__(self, job, duration):
+        self.job = job
+        self.duration = duration
+        self.last_event = None
+        self._fields = {}
+
+    def feed(self, line):
+        """Consume one line and return a ProgressEvent when a block completes"""
+        key, sep, value = line.strip().partition('=')
+        if not sep:
+            return None
+        self._fields[key] = value
+        if key != 'progress':
+            return None
+        event = ProgressEvent(self.job, self.duration, self._fields)
+        self._fields = {}
+        self.last_event = event
+        return event
+
+
+class ProgressPublisher:
+    """Fan ProgressEvents out to listeners at a capped rate per job"""
+
+    def __init__(self, max_rate=4.0):
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self._listeners = []
+        self._last_sent = {}
+        self._lock = Lock()
+
+    def subscribe(self, listener):
+        """Register listener(event); returns the listener for later unsubscribe"""
+        with self._lock:
+            self._listeners.append(listener)
+        return listener
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def forget(self, job):
+        """Drop the rate-limit state of a finished, failed or cancelled job"""
+        with self._lock:
+            self._last_sent.pop(id(job), None)
+
+    def publish(self, event, extra_listener=None):
+        """Deliver event unless the job was updated too recently; final events always go out"""
+        now = time.monotonic()
+        key = id(event.job)
+        with self._lock:
+            if not event.done and now - self._last_sent.get(key, 0.0) < self.min_interval:
+                return False
+            if event.done:
+                self._last_sent.pop(key, None)
+            else:
+                self._last_sent[key] = now
+            listeners = list(self._listeners)
+        if extra_listener:
+            listeners.append(extra_listener)
+        for listener in listeners:
+            listener(event)
+        return True
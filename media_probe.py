@@ -0,0 +1,179 @@
+import os
+import json
+import sqlite3
+import subprocess
+from contextlib import closing
+
+SCHEMA_VERSION = 1
+# Container overhead allowed on top of the audio target before AAC is re-encoded
+AUDIO_BITRATE_SLACK = 1.1
+# H.264 that plays everywhere MP4 does
+COPY_PIX_FMTS = ('yuv420p', 'yuvj420p')
+COPY_PROFILES = ('Constrained Baseline', 'Baseline', 'Main', 'High')
+
+PLAN_COPY = 'copy'    # remux only
+PLAN_AUDIO = 'audio'  # copy video, transcode audio
+PLAN_FULL = 'full'    # transcode both
+
+
+def default_cache_path():
+    """SQLite file in the converter's per-user folder"""
+    return os.path.join(os.path.expanduser('~'), '.auto_ffmpeg', 'media_cache.sqlite3')
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _rate(value):
+    """'30000/1001' -> 29.97"""
+    num, _, den = (value or '').partition('/')
+    num, den = _float(num), _float(den or 1)
+    return num / den if num and den else None
+
+
+class MediaInfo:
+    """Stream metadata from one `ffprobe -show_format -show_streams` call"""
+
+    def __init__(self, data):
+        self.data = data
+        streams = data.get('streams', [])
+        self.video = next((s for s in streams if s.get('codec_type') == 'video'
+                           and not s.get('disposition', {}).get('attached_pic')), None)
+        self.audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+        self.format = data.get('format', {})
+
+    @property
+    def duration(self):
+        return _float(self.format.get('duration')) or 0.0
+
+    @property
+    def video_bitrate(self):
+        """Video bits per second; MKV and WebM do not store it, so it is derived from the file size"""
+        bitrate = _float(self.video.get('bit_rate')) if self.video else None
+        if bitrate:
+            return bitrate
+        total = _float(self.format.get('bit_rate'))
+        if not total and self.duration:
+            total = (_float(self.format.get('size')) or 0) * 8 / self.duration
+        if not total:
+            return None
+        return max(0.0, total - (self.audio_bitrate or 0))
+
+    @property
+    def audio_bitrate(self):
+        return _float(self.audio.get('bit_rate')) if self.audio else None
+
+    @property
+    def bits_per_pixel(self):
+        if not self.video:
+            return None
+        bitrate = self.video_bitrate
+        pixels = (self.video.get('width') or 0) * (self.video.get('height') or 0)
+        fps = _rate(self.video.get('avg_frame_rate')) or _rate(self.video.get('r_frame_rate'))
+        if not bitrate or not pixels or not fps:
+            return None
+        return bitrate / (pixels * fps)
+
+    def video_copyable(self, settings):
+        """H.264 4:2:0 no richer than the preset would produce"""
+        max_bpp = settings.get('copy_bpp')
+        if not self.video or max_bpp is None:
+            return False
+        if self.video.get('codec_name') != 'h264' or self.video.get('pix_fmt') not in COPY_PIX_FMTS:
+            return False
+        if self.video.get('profile') not in COPY_PROFILES:
+            return False
+        bpp = self.bits_per_pixel
+        return bpp is not None and bpp <= max_bpp
+
+    def audio_copyable(self, settings):
+        if self.audio is None:
+            return True
+        if self.audio.get('codec_name') != 'aac':
+            return False
+        bitrate = self.audio_bitrate
+        return bitrate is not None and bitrate <= settings['audio_quality'] * 1000 * AUDIO_BITRATE_SLACK
+
+
+def plan_transcode(info, settings):
+    """PLAN_COPY, PLAN_AUDIO or PLAN_FULL for an input and a quality preset"""
+    if not info.video_copyable(settings):
+        return PLAN_FULL
+    return PLAN_COPY if info.audio_copyable(settings) else PLAN_AUDIO
+
+
+class ProbeCache:
+    """ffprobe output keyed by path and invalidated by size and mtime"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or default_cache_path()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                conn.execute('DROP TABLE IF EXISTS probes')
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS probes (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    data TEXT NOT NULL
+                )
+            ''')
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    @staticmethod
+    def identity(input_file):
+        st = os.stat(input_file)
+        return os.path.abspath(input_file), st.st_size, st.st_mtime_ns
+
+    def get(self, input_file):
+        path, size, mtime_ns = self.identity(input_file)
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT size, mtime_ns, data FROM probes WHERE path = ?', (path,)).fetchone()
+        if row is None or (row[0], row[1]) != (size, mtime_ns):
+            return None
+        return json.loads(row[2])
+
+    def put(self, input_file, data):
+        path, size, mtime_ns = self.identity(input_file)
+        with closing(self._connect()) as conn, conn:
+            conn.execute('INSERT OR REPLACE INTO probes VALUES (?, ?, ?, ?)', (path, size, mtime_ns, json.dumps(data)))
+
+
+def probe_media(ffprobe_path, input_file, cache=None, startupinfo=None):
+    """Return a MediaInfo from a single ffprobe call, or from cache when the file is unchanged"""
+    if cache is not None:
+        try:
+            data = cache.get(input_file)
+        except (OSError, sqlite3.Error, ValueError):
+            data = None
+        if data is not None:
+            return MediaInfo(data)
+
+    cmd = [
+        ffprobe_path, '-v', 'error',
+        '-print_format', 'json',
+        '-show_format', '-show_streams',
+        input_file
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            universal_newlines=True, startupinfo=startupinfo)
+    if result.returncode != 0:
+        detail = result.stderr.strip().splitlines()
+        raise RuntimeError(f"ffprobe failed: {detail[-1] if detail else result.returncode}")
+    data = json.loads(result.stdout or '{}')
+    if cache is not None:
+        try:
+            cache.put(input_file, data)
+        except (OSError, sqlite3.Error):
+            pass
+    return MediaInfo(data)
@@ -1,4 +1,5 @@
 import os
+import sys
 import zipfile
 import tarfile
 import rarfile
@@ -8,16 +9,38 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 from PIL import Image, ImageTk
 from threading import Thread
+from itertools import accumulate
 from datetime import datetime
 import webbrowser
 import subprocess
-import patoolib
-import img2pdf
 from fpdf import FPDF
 import pytesseract
-from pdf2image import convert_from_path
+from archive_batch import archive_base_name, batch_extract, find_archives, tar_mode
+from parallel_zip import write_zip
+from parallel_compress import open_tar_writer
+from archive_listing import ArchiveListing, stream_listing
+from archive_index import ArchiveIndexCache, cached_stream_listing, read_tar_members_at
+from tar_seek import open_indexed_tar
+from archive_verify import verify_archive
+from image_batch import convert_batch, find_images, output_path_for
+from image_preview import PreviewService
+from pdf_stream import write_pdf
+from ocr_engine import OCRCache, ocr_images, ocr_pdf
+from output_layout import LAYOUTS, LayoutManifest, OutputLayout
+from image_manifest import (ImageManifest, RECORD_BATCH, conversion_params, entry_for, plan_incremental,
+                            remove_deleted)
+from volume_set import (find_checksum_manifest, find_volumes, logical_name, merge_volume_files, merged_output_path,
+                        open_archive_file, open_archive_output, read_checksum_manifest, verify_checksums)
+from concurrent.futures import ProcessPoolExecutor
+
+# The Tk event bus is shared with the video converter one folder up
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ui_events import UIEventBus
 
 class FileExtractorApp:
+    # Tree rows inserted per directory page
+    TREE_PAGE_SIZE = 1000
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Advanced Archive Manager - WinRAR Alternative")
@@ -50,15 +73,35 @@ class FileExtractorApp:
         self.status_bar = ttk.Label(root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
         
+        # Worker threads post UI updates here instead of touching widgets
+        self.ui = UIEventBus(root)
+        self.ui.register('progress', lambda value: self.progress.configure(value=value))
+        self.ui.register('status', self.status_var.set)
+        
         # Initialize variables
         self.current_archive = ""
-        self.current_files = []
+        self.listing = None
+        self.tree_filled = {}
+        try:
+            self.index_cache = ArchiveIndexCache()
+        except Exception:
+            self.index_cache = None  # Listing still works, just without the cache
         self.compression_level = tk.IntVar(value=6)
         self.compression_method = tk.StringVar(value="ZIP")
         self.password_var = tk.StringVar()
         self.split_size_var = tk.StringVar(value="0")
         self.image_format_var = tk.StringVar(value="JPEG")
         self.image_quality_var = tk.IntVar(value=85)
+        self.image_max_dim_var = tk.IntVar(value=0)
+        self.ocr_lang_var = tk.StringVar(value="eng")
+        self.ocr_preprocess_var = tk.BooleanVar(value=True)
+        self.ocr_dpi_var = tk.IntVar(value=300)
+        try:
+            self.ocr_cache = OCRCache()
+        except Exception:
+            self.ocr_cache = None  # OCR still works, just without the cache
+        self.preview_service = PreviewService()
+        self.preview_request = None
         
     def create_extract_tab(self):
         """Create the extraction tab"""
@@ -98,6 +141,10 @@ class FileExtractorApp:
         mid_frame.grid_rowconfigure(0, weight=1)
         mid_frame.grid_columnconfigure(0, weight=1)
         
+        # Directories are filled in when expanded
+        self.tree.bind('<<TreeviewOpen>>', self.on_tree_open)
+        self.tree.bind('<Double-1>', self.on_tree_double_click)
+        
         # Bottom frame for extraction options
         bottom_frame = ttk.Frame(tab)
         bottom_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -244,6 +291,23 @@ class FileExtractorApp:
         ttk.Scale(quality_frame, from_=1, to=100, variable=self.image_quality_var, orient=tk.HORIZONTAL).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         ttk.Label(quality_frame, textvariable=self.image_quality_var).pack(side=tk.LEFT, padx=5)
         
+        # Max dimension
+        size_frame = ttk.Frame(mid_frame)
+        size_frame.pack(fill=tk.X, padx=5, pady=2)
+        
+        ttk.Label(size_frame, text="Max Dimension (px, 0 = original):").pack(side=tk.LEFT)
+        ttk.Spinbox(size_frame, from_=0, to=20000, increment=100, textvariable=self.image_max_dim_var, width=8).pack(side=tk.LEFT, padx=5)
+        
+        # OCR language
+        ocr_frame = ttk.Frame(mid_frame)
+        ocr_frame.pack(fill=tk.X, padx=5, pady=2)
+        
+        ttk.Label(ocr_frame, text="OCR Language:").pack(side=tk.LEFT)
+        ttk.Entry(ocr_frame, textvariable=self.ocr_lang_var, width=12).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(ocr_frame, text="Clean up images before OCR (binarize, deskew)", variable=self.ocr_preprocess_var).pack(side=tk.LEFT, padx=5)
+        ttk.Label(ocr_frame, text="PDF DPI:").pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Spinbox(ocr_frame, from_=72, to=600, increment=50, textvariable=self.ocr_dpi_var, width=5).pack(side=tk.LEFT, padx=5)
+        
         # Output directory
         out_frame = ttk.Frame(tab)
         out_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -268,6 +332,9 @@ class FileExtractorApp:
         ocr_btn = ttk.Button(convert_btn_frame, text="Extract Text (OCR)", command=self.extract_text_from_images)
         ocr_btn.pack(side=tk.LEFT, padx=5)
         
+        ocr_pdf_btn = ttk.Button(convert_btn_frame, text="Extract Text from PDF (OCR)", command=self.extract_text_from_pdf)
+        ocr_pdf_btn.pack(side=tk.LEFT, padx=5)
+        
         # Preview area
         preview_frame = ttk.LabelFrame(tab, text="Image Preview")
         preview_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -308,6 +375,9 @@ class FileExtractorApp:
         merge_btn = ttk.Button(merge_frame, text="Merge Volumes", command=self.merge_volumes)
         merge_btn.pack(side=tk.LEFT, padx=5)
         
+        self.merge_verify = tk.BooleanVar(value=True)
+        ttk.Checkbutton(merge_frame, text="Verify checksums", variable=self.merge_verify).pack(side=tk.LEFT, padx=5)
+        
         # Batch processing
         batch_frame = ttk.LabelFrame(tab, text="Batch Processing")
         batch_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -334,6 +404,32 @@ class FileExtractorApp:
         batch_out_btn = ttk.Button(batch_out_frame, text="Browse...", command=self.browse_batch_output)
         batch_out_btn.pack(side=tk.LEFT, padx=5)
         
+        # Batch concurrency
+        batch_workers_frame = ttk.Frame(batch_frame)
+        batch_workers_frame.pack(fill=tk.X, padx=5, pady=2)
+        
+        ttk.Label(batch_workers_frame, text="Parallel Workers:").pack(side=tk.LEFT)
+        self.batch_workers = tk.IntVar(value=os.cpu_count() or 1)
+        ttk.Spinbox(batch_workers_frame, from_=1, to=256, textvariable=self.batch_workers, width=5).pack(side=tk.LEFT, padx=5)
+        
+        # Output layout
+        batch_layout_frame = ttk.Frame(batch_frame)
+        batch_layout_frame.pack(fill=tk.X, padx=5, pady=2)
+        
+        ttk.Label(batch_layout_frame, text="Output Layout:").pack(side=tk.LEFT)
+        self.batch_layout = tk.StringVar(value='mirror')
+        ttk.OptionMenu(batch_layout_frame, self.batch_layout, self.batch_layout.get(), *LAYOUTS).pack(side=tk.LEFT, padx=5)
+        ttk.Label(batch_layout_frame, text="(mirror: keep source folders, sharded: hashed subfolders, flat: one folder)").pack(side=tk.LEFT, padx=5)
+        
+        # Incremental image conversion
+        batch_incremental_frame = ttk.Frame(batch_frame)
+        batch_incremental_frame.pack(fill=tk.X, padx=5, pady=2)
+        
+        self.batch_incremental = tk.BooleanVar(value=False)
+        ttk.Checkbutton(batch_incremental_frame, text="Skip up-to-date images", variable=self.batch_incremental).pack(side=tk.LEFT, padx=5)
+        self.batch_propagate_deletes = tk.BooleanVar(value=False)
+        ttk.Checkbutton(batch_incremental_frame, text="Remove outputs of deleted images", variable=self.batch_propagate_deletes).pack(side=tk.LEFT, padx=5)
+        
         # Batch buttons
         batch_btn_frame = ttk.Frame(batch_frame)
         batch_btn_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -424,6 +520,7 @@ class FileExtractorApp:
     def browse_archive(self):
         filetypes = (
             ("Archive Files", "*.zip *.rar *.7z *.tar *.tar.gz *.tar.bz2 *.tar.xz"),
+            ("Split Archives", "*.zip.001 *.7z.001 *.tar.001 *.tar.gz.001 *.tar.bz2.001 *.tar.xz.001"),
             ("All Files", "*.*")
         )
         filename = filedialog.askopenfilename(title="Select Archive File", filetypes=filetypes)
@@ -467,7 +564,7 @@ class FileExtractorApp:
     
     def browse_merge_file(self):
         filetypes = (
-            ("Archive Files", "*.part1.rar *.zip.001 *.7z.001"),
+            ("Archive Files", "*.part1.rar *.zip.001 *.7z.001 *.tar.001 *.tar.gz.001 *.tar.bz2.001 *.tar.xz.001"),
             ("All Files", "*.*")
         )
         filename = filedialog.askopenfilename(title="Select First Volume", filetypes=filetypes)
@@ -487,56 +584,91 @@ class FileExtractorApp:
     # Archive handling methods
     def load_archive_contents(self, archive_path):
         """Load and display the contents of the selected archive"""
+        if self.listing:
+            self.listing.cancelled = True
         self.tree.delete(*self.tree.get_children())
         self.current_archive = archive_path
-        self.current_files = []
-        
-        try:
-            if archive_path.lower().endswith('.zip'):
-                with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                    for file_info in zip_ref.infolist():
-                        self.tree.insert('', 'end', text=file_info.filename, 
-                                       values=(self.format_size(file_info.file_size), 
-                                              self.format_time(file_info.date_time)))
-                        self.current_files.append(file_info.filename)
-            
-            elif archive_path.lower().endswith('.rar'):
-                with rarfile.RarFile(archive_path, 'r') as rar_ref:
-                    for file_info in rar_ref.infolist():
-                        self.tree.insert('', 'end', text=file_info.filename, 
-                                       values=(self.format_size(file_info.file_size), 
-                                              self.format_time(file_info.date_time)))
-                        self.current_files.append(file_info.filename)
-            
-            elif archive_path.lower().endswith(('.7z', '.7zip')):
-                with py7zr.SevenZipFile(archive_path, 'r') as sevenz_ref:
-                    for file_info in sevenz_ref.list():
-                        self.tree.insert('', 'end', text=file_info.filename, 
-                                       values=(self.format_size(file_info.uncompressed), 
-                                              self.format_time(file_info.creationtime)))
-                        self.current_files.append(file_info.filename)
-            
-            elif archive_path.lower().endswith(('.tar', '.tar.gz', '.tar.bz2', '.tar.xz')):
-                mode = 'r'
-                if archive_path.endswith('.gz'):
-                    mode += ':gz'
-                elif archive_path.endswith('.bz2'):
-                    mode += ':bz2'
-                elif archive_path.endswith('.xz'):
-                    mode += ':xz'
-                
-                with tarfile.open(archive_path, mode) as tar_ref:
-                    for file_info in tar_ref.getmembers():
-                        self.tree.insert('', 'end', text=file_info.name, 
-                                       values=(self.format_size(file_info.size), 
-                                              self.format_time(file_info.mtime)))
-                        self.current_files.append(file_info.name)
-            
-            self.status_var.set(f"Loaded {len(self.current_files)} files from archive")
+        self.listing = ArchiveListing(archive_path)
+        self.tree_filled = {0: 0}
+        self.status_var.set("Reading archive...")
+        
+        listing = self.listing
+        on_chunk = lambda: self.ui.call(self.on_listing_chunk, listing)
+        if self.index_cache:
+            Thread(target=cached_stream_listing, args=(listing, self.index_cache, on_chunk), daemon=True).start()
+        else:
+            Thread(target=stream_listing, args=(listing, on_chunk), daemon=True).start()
+    
+    def on_listing_chunk(self, listing):
+        """Show members that arrived since the last chunk (Tk thread)"""
+        if listing is not self.listing:
+            return
+        for dir_id in listing.take_dirty():
+            if dir_id in self.tree_filled:
+                self.populate_tree_dir(dir_id)
         
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to open archive:\n{str(e)}")
+        count = len(listing.table)
+        if listing.error:
+            messagebox.showerror("Error", f"Failed to open archive:\n{str(listing.error)}")
             self.status_var.set("Error loading archive")
+        elif listing.done:
+            self.status_var.set(f"Loaded {count} files from archive")
+        else:
+            self.status_var.set(f"Reading archive... {count} files")
+    
+    def populate_tree_dir(self, dir_id):
+        """Insert the next page of a directory's children into the tree"""
+        listing = self.listing
+        parent = '' if dir_id == 0 else f"d{dir_id}"
+        start = self.tree_filled[dir_id]
+        entries = listing.entries(dir_id, start, start + self.TREE_PAGE_SIZE)
+        
+        more_id = f"x{dir_id}"
+        if self.tree.exists(more_id):
+            self.tree.delete(more_id)
+        
+        for entry in entries:
+            if entry < 0:
+                sub_id = ~entry
+                item = self.tree.insert(parent, 'end', iid=f"d{sub_id}", text=listing.dir_name(sub_id), values=('', ''))
+                # Placeholder so the directory can be expanded
+                self.tree.insert(item, 'end', iid=f"p{sub_id}", text='')
+            else:
+                table = listing.table
+                self.tree.insert(parent, 'end', iid=f"m{entry}", text=table.name(entry).rstrip('/').rpartition('/')[2],
+                                 values=(self.format_size(table.sizes[entry]),
+                                         self.format_time(table.mtimes[entry])))
+        
+        self.tree_filled[dir_id] = start + len(entries)
+        remaining = listing.child_count(dir_id) - self.tree_filled[dir_id]
+        if remaining > 0:
+            self.tree.insert(parent, 'end', iid=more_id, text=f"... {remaining} more (double-click to show)")
+    
+    def on_tree_open(self, event):
+        """Fill a directory the first time it is expanded"""
+        item = self.tree.focus()
+        if not item.startswith('d'):
+            return
+        dir_id = int(item[1:])
+        if dir_id not in self.tree_filled:
+            self.tree.delete(f"p{dir_id}")
+            self.tree_filled[dir_id] = 0
+            self.populate_tree_dir(dir_id)
+    
+    def on_tree_double_click(self, event):
+        item = self.tree.identify_row(event.y)
+        if item.startswith('x'):
+            self.populate_tree_dir(int(item[1:]))
+    
+    def selected_member_indices(self):
+        """MemberTable indices for the selected tree items, directories included recursively"""
+        indices = []
+        for item in self.tree.selection():
+            if item.startswith('m'):
+                indices.append(int(item[1:]))
+            elif item.startswith('d'):
+                indices.extend(self.listing.member_indices_under(int(item[1:])))
+        return indices
     
     def extract_files(self, here=False):
         """Extract files from the archive"""
@@ -556,83 +688,91 @@ class FileExtractorApp:
             return
         
         try:
-            selected_items = self.tree.selection()
-            files_to_extract = None
-            
-            if selected_items:
-                files_to_extract = [self.tree.item(item, 'text') for item in selected_items]
+            selected = self.selected_member_indices()
+            table = self.listing.table
+            files_to_extract = [table.name(i) for i in selected] or None
+            # Header offsets from the listing let tar skip the getmembers() walk
+            tar_offsets = [table.offsets[i] for i in selected] if self.listing.done else None
+            # ...and the seek index lets compressed tars decode only the blocks those headers live in
+            seek_index = self.listing.seek_index if tar_offsets else None
+            # Split .001/.002/... sets are read in place as one joined stream
+            archive = self.current_archive
+            kind = logical_name(archive).lower()
             
             def extraction_thread():
                 try:
-                    self.progress['value'] = 0
-                    self.status_var.set("Extracting files...")
+                    self.ui.set('progress', 0)
+                    self.ui.set('status', "Extracting files...")
                     
-                    if self.current_archive.lower().endswith('.zip'):
-                        with zipfile.ZipFile(self.current_archive, 'r') as zip_ref:
+                    if kind.endswith('.zip'):
+                        with open_archive_file(archive) as f, zipfile.ZipFile(f, 'r') as zip_ref:
                             if files_to_extract:
                                 total = len(files_to_extract)
                                 for i, filename in enumerate(files_to_extract):
                                     zip_ref.extract(filename, extract_path, pwd=password.encode() if password else None)
-                                    self.progress['value'] = (i + 1) / total * 100
-                                    self.root.update_idletasks()
+                                    self.ui.set('progress', (i + 1) / total * 100)
                             else:
                                 zip_ref.extractall(extract_path, pwd=password.encode() if password else None)
-                                self.progress['value'] = 100
+                                self.ui.set('progress', 100)
                     
-                    elif self.current_archive.lower().endswith('.rar'):
-                        with rarfile.RarFile(self.current_archive, 'r') as rar_ref:
+                    elif kind.endswith('.rar'):
+                        with rarfile.RarFile(archive, 'r') as rar_ref:
                             if files_to_extract:
                                 total = len(files_to_extract)
                                 for i, filename in enumerate(files_to_extract):
                                     rar_ref.extract(filename, extract_path, pwd=password)
-                                    self.progress['value'] = (i + 1) / total * 100
-                                    self.root.update_idletasks()
+                                    self.ui.set('progress', (i + 1) / total * 100)
                             else:
                                 rar_ref.extractall(extract_path, pwd=password)
-                                self.progress['value'] = 100
+                                self.ui.set('progress', 100)
                     
-                    elif self.current_archive.lower().endswith(('.7z', '.7zip')):
-                        with py7zr.SevenZipFile(self.current_archive, 'r', password=password) as sevenz_ref:
+                    elif kind.endswith(('.7z', '.7zip')):
+                        with open_archive_file(archive) as f, py7zr.SevenZipFile(f, 'r', password=password) as sevenz_ref:
                             if files_to_extract:
                                 all_files = sevenz_ref.getnames()
                                 filtered = [f for f in files_to_extract if f in all_files]
                                 sevenz_ref.extract(targets=filtered, path=extract_path)
                             else:
                                 sevenz_ref.extractall(path=extract_path)
-                            self.progress['value'] = 100
+                            self.ui.set('progress', 100)
                     
-                    elif self.current_archive.lower().endswith(('.tar', '.tar.gz', '.tar.bz2', '.tar.xz')):
-                        mode = 'r'
-                        if self.current_archive.endswith('.gz'):
-                            mode += ':gz'
-                        elif self.current_archive.endswith('.bz2'):
-                            mode += ':bz2'
-                        elif self.current_archive.endswith('.xz'):
-                            mode += ':xz'
+                    elif kind.endswith(('.tar', '.tar.gz', '.tar.bz2', '.tar.xz')):
+                        if seek_index is not None and seek_index.can_seek:
+                            source, tar_context = None, open_indexed_tar(archive, seek_index)
+                        else:
+                            source = open_archive_file(archive)
+                            tar_context = tarfile.open(fileobj=source, mode=tar_mode(kind))
                         
-                        with tarfile.open(self.current_archive, mode) as tar_ref:
-                            if files_to_extract:
-                                members = [m for m in tar_ref.getmembers() if m.name in files_to_extract]
-                                total = len(members)
-                                for i, member in enumerate(members):
-                                    tar_ref.extract(member, extract_path)
-                                    self.progress['value'] = (i + 1) / total * 100
-                                    self.root.update_idletasks()
-                            else:
-                                tar_ref.extractall(extract_path)
-                                self.progress['value'] = 100
+                        try:
+                            with tar_context as tar_ref:
+                                if files_to_extract:
+                                    if tar_offsets:
+                                        members = list(read_tar_members_at(tar_ref, tar_offsets))
+                                    else:
+                                        wanted = set(files_to_extract)
+                                        members = [m for m in tar_ref.getmembers() if m.name in wanted]
+                                    total = len(members)
+                                    for i, member in enumerate(members):
+                                        tar_ref.extract(member, extract_path)
+                                        self.ui.set('progress', (i + 1) / total * 100)
+                                else:
+                                    tar_ref.extractall(extract_path)
+                                    self.ui.set('progress', 100)
+                        finally:
+                            if source is not None:
+                                source.close()
                     
-                    self.status_var.set(f"Extraction complete to {extract_path}")
-                    messagebox.showinfo("Success", "Files extracted successfully")
-                    self.log_operation(f"Extracted files from {os.path.basename(self.current_archive)} to {extract_path}")
+                    self.ui.set('status', f"Extraction complete to {extract_path}")
+                    self.ui.call(messagebox.showinfo, "Success", "Files extracted successfully")
+                    self.log_operation(f"Extracted files from {os.path.basename(archive)} to {extract_path}")
                 
                 except Exception as e:
-                    self.status_var.set("Extraction failed")
-                    messagebox.showerror("Error", f"Failed to extract files:\n{str(e)}")
-                    self.log_operation(f"Error extracting {os.path.basename(self.current_archive)}: {str(e)}")
+                    self.ui.set('status', "Extraction failed")
+                    self.ui.call(messagebox.showerror, "Error", f"Failed to extract files:\n{str(e)}")
+                    self.log_operation(f"Error extracting {os.path.basename(archive)}: {str(e)}")
                 
                 finally:
-                    self.progress['value'] = 0
+                    self.ui.set('progress', 0)
             
             Thread(target=extraction_thread, daemon=True).start()
         
@@ -647,65 +787,55 @@ class FileExtractorApp:
             return
         
         password = self.password_var.get() or None
-        
-        try:
-            self.progress['value'] = 0
-            self.status_var.set("Testing archive...")
-            
-            if self.current_archive.lower().endswith('.zip'):
-                with zipfile.ZipFile(self.current_archive, 'r') as zip_ref:
-                    bad_file = zip_ref.testzip()
-                    if bad_file:
-                        messagebox.showerror("Error", f"Archive is corrupt. Bad file: {bad_file}")
-                        self.status_var.set("Archive test failed")
-                    else:
-                        messagebox.showinfo("Success", "Archive is OK")
-                        self.status_var.set("Archive test passed")
-            
-            elif self.current_archive.lower().endswith('.rar'):
-                with rarfile.RarFile(self.current_archive, 'r') as rar_ref:
-                    rar_ref.testrar(pwd=password)
-                    messagebox.showinfo("Success", "Archive is OK")
-                    self.status_var.set("Archive test passed")
-            
-            elif self.current_archive.lower().endswith(('.7z', '.7zip')):
-                with py7zr.SevenZipFile(self.current_archive, 'r', password=password) as sevenz_ref:
-                    if sevenz_ref.test():
-                        messagebox.showinfo("Success", "Archive is OK")
-                        self.status_var.set("Archive test passed")
-                    else:
-                        messagebox.showerror("Error", "Archive is corrupt")
-                        self.status_var.set("Archive test failed")
-            
-            elif self.current_archive.lower().endswith(('.tar', '.tar.gz', '.tar.bz2', '.tar.xz')):
-                mode = 'r'
-                if self.current_archive.endswith('.gz'):
-                    mode += ':gz'
-                elif self.current_archive.endswith('.bz2'):
-                    mode += ':bz2'
-                elif self.current_archive.endswith('.xz'):
-                    mode += ':xz'
+        archive = self.current_archive
+        workers = self.batch_workers.get()
+        # A finished listing lets compressed tars be checked segment by segment in parallel
+        listing = self.listing
+        if listing and listing.archive_path == archive and listing.done and not listing.error:
+            table, seek_index = listing.table, listing.seek_index
+        else:
+            table, seek_index = None, None
+        
+        def test_thread():
+            try:
+                self.ui.set('progress', 0)
+                self.ui.set('status', "Testing archive...")
                 
-                with tarfile.open(self.current_archive, mode) as tar_ref:
-                    # Tar files don't have a test method, so we'll just try to read the first file
-                    first_member = tar_ref.next()
-                    if first_member:
-                        messagebox.showinfo("Success", "Archive appears to be OK")
-                        self.status_var.set("Archive test passed")
-                    else:
-                        messagebox.showwarning("Warning", "Archive is empty")
-                        self.status_var.set("Archive is empty")
+                def on_progress(done, total):
+                    self.ui.set('progress', done / total * 100 if total else 100)
+                
+                report = verify_archive(archive, password, workers, table, seek_index, on_progress)
+                
+                for member in report.failed:
+                    self.log_operation(f"Bad member in {os.path.basename(archive)}: {member.name}: {member.error}")
+                
+                if report.ok and not report.members:
+                    self.ui.set('status', "Archive is empty")
+                    self.ui.call(messagebox.showwarning, "Warning", "Archive is empty")
+                elif report.ok:
+                    self.ui.set('status', f"Archive test passed: {report}")
+                    self.ui.call(messagebox.showinfo, "Success", f"Archive is OK\n{report}")
+                else:
+                    failed = report.failed
+                    details = "\n".join(f"{m.name}: {m.error}" for m in failed[:10])
+                    if len(failed) > 10:
+                        details += f"\n... and {len(failed) - 10} more"
+                    if report.error:
+                        details = f"{report.error}\n{details}"
+                    self.ui.set('status', f"Archive test failed: {report}")
+                    self.ui.call(messagebox.showerror, "Error", f"Archive is corrupt\n{report}\n\n{details}")
+                
+                self.log_operation(f"Tested archive {os.path.basename(archive)} - {report}")
             
-            self.progress['value'] = 100
-            self.log_operation(f"Tested archive {os.path.basename(self.current_archive)}")
-        
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to test archive:\n{str(e)}")
-            self.status_var.set("Archive test failed")
-            self.log_operation(f"Error testing {os.path.basename(self.current_archive)}: {str(e)}")
+            except Exception as e:
+                self.ui.call(messagebox.showerror, "Error", f"Failed to test archive:\n{str(e)}")
+                self.ui.set('status', "Archive test failed")
+                self.log_operation(f"Error testing {os.path.basename(archive)}: {str(e)}")
+            
+            finally:
+                self.ui.set('progress', 0)
         
-        finally:
-            self.progress['value'] = 0
+        Thread(target=test_thread, daemon=True).start()
     
     def create_archive(self):
         """Create a new archive"""
@@ -751,42 +881,34 @@ class FileExtractorApp:
             
             def compression_thread():
                 try:
+                    # Progress is counted in input bytes, so one big file does not stall the bar
+                    input_bytes = list(accumulate(os.path.getsize(file) for file in files))
+                    total_bytes = input_bytes[-1]
+                    
+                    def on_files_done(done, total=None):
+                        self.ui.set('progress', input_bytes[done - 1] / total_bytes * 100 if total_bytes else 100)
+                        self.ui.set('status', f"Creating archive... {input_bytes[done - 1] // (1024 * 1024)}/"
+                                              f"{total_bytes // (1024 * 1024)} MB")
+                    
+                    # ZIP/7z/tar outputs stream straight into .001, .002, ... volumes when a split size is set
                     if output_path.lower().endswith('.zip'):
-                        with zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=level) as zip_ref:
-                            total = len(files)
-                            for i, file in enumerate(files):
-                                arcname = os.path.basename(file)
-                                zip_ref.write(file, arcname, compresslevel=level)
-                                if password:
-                                    # ZIP password protection is weak, but we'll add it
-                                    zip_ref.setpassword(password.encode())
-                                self.progress['value'] = (i + 1) / total * 100
-                                self.root.update_idletasks()
+                        # zipfile cannot encrypt, so the password is not applied to ZIP output
+                        entries = [(file, os.path.basename(file)) for file in files]
+                        write_zip(output_path, entries, level=level, on_progress=on_files_done, volume_size=split_size)
                     
                     elif output_path.lower().endswith('.7z'):
                         filters = [{'id': py7zr.FILTER_DEFLATE, 'level': level}]
-                        with py7zr.SevenZipFile(output_path, 'w', password=password, filters=filters) as sevenz_ref:
-                            total = len(files)
+                        with open_archive_output(output_path, split_size) as target, \
+                                py7zr.SevenZipFile(target, 'w', password=password, filters=filters) as sevenz_ref:
                             for i, file in enumerate(files):
                                 sevenz_ref.write(file, os.path.basename(file))
-                                self.progress['value'] = (i + 1) / total * 100
-                                self.root.update_idletasks()
+                                on_files_done(i + 1)
                     
                     elif output_path.lower().endswith(('.tar', '.tar.gz', '.tar.bz2', '.tar.xz')):
-                        mode = 'w'
-                        if output_path.endswith('.gz'):
-                            mode += ':gz'
-                        elif output_path.endswith('.bz2'):
-                            mode += ':bz2'
-                        elif output_path.endswith('.xz'):
-                            mode += ':xz'
-                        
-                        with tarfile.open(output_path, mode) as tar_ref:
-                            total = len(files)
+                        with open_tar_writer(output_path, level=level, volume_size=split_size) as tar_ref:
                             for i, file in enumerate(files):
                                 tar_ref.add(file, arcname=os.path.basename(file))
-                                self.progress['value'] = (i + 1) / total * 100
-                                self.root.update_idletasks()
+                                on_files_done(i + 1)
                     
                     elif output_path.lower().endswith('.rar'):
                         # RAR creation requires external tools
@@ -802,19 +924,27 @@ class FileExtractorApp:
                         if result.returncode != 0:
                             raise Exception(f"RAR error: {result.stderr}")
                         
-                        self.progress['value'] = 100
+                        self.ui.set('progress', 100)
                     
-                    self.status_var.set(f"Archive created: {os.path.basename(output_path)}")
-                    messagebox.showinfo("Success", "Archive created successfully")
-                    self.log_operation(f"Created archive {os.path.basename(output_path)}")
+                    if split_size > 0 and not output_path.lower().endswith('.rar'):
+                        volumes = find_volumes(output_path + '.001')
+                        self.ui.set('status', f"Archive created: {os.path.basename(output_path)} in {len(volumes)} volumes")
+                        self.ui.call(messagebox.showinfo, "Success",
+                                     f"Archive created successfully in {len(volumes)} volumes:\n"
+                                     f"{os.path.basename(volumes[0])} ... {os.path.basename(volumes[-1])}")
+                        self.log_operation(f"Created archive {os.path.basename(output_path)} in {len(volumes)} volumes")
+                    else:
+                        self.ui.set('status', f"Archive created: {os.path.basename(output_path)}")
+                        self.ui.call(messagebox.showinfo, "Success", "Archive created successfully")
+                        self.log_operation(f"Created archive {os.path.basename(output_path)}")
                 
                 except Exception as e:
-                    self.status_var.set("Archive creation failed")
-                    messagebox.showerror("Error", f"Failed to create archive:\n{str(e)}")
+                    self.ui.set('status', "Archive creation failed")
+                    self.ui.call(messagebox.showerror, "Error", f"Failed to create archive:\n{str(e)}")
                     self.log_operation(f"Error creating archive: {str(e)}")
                 
                 finally:
-                    self.progress['value'] = 0
+                    self.ui.set('progress', 0)
             
             Thread(target=compression_thread, daemon=True).start()
         
@@ -888,65 +1018,88 @@ class FileExtractorApp:
             messagebox.showwarning("Warning", "No volume selected")
             return
         
-        try:
-            self.progress['value'] = 10
-            self.status_var.set("Merging volumes...")
-            
-            # Determine the output file name
-            if '.part' in first_volume.lower() or '.rar' in first_volume.lower():
-                # RAR volumes
-                output_path = first_volume.split('.part')[0] + '.rar'
-                cmd = ['rar', 'r', output_path]
-            else:
-                # Assume ZIP or 7Z volumes (001, 002, etc.)
-                base = first_volume[:-3]
-                output_path = base + '.7z' if first_volume.endswith('.7z.001') else base + '.zip'
+        if '.part' in first_volume.lower() or first_volume.lower().endswith('.rar'):
+            # Multi-volume RAR sets are not plain byte splits; the first part opens the whole set
+            messagebox.showinfo("Info", "RAR volume sets do not need merging.\n"
+                                "Open the first part (.part1.rar) to browse or extract the whole set.")
+            return
+        
+        verify = self.merge_verify.get()
+        
+        def merge_thread():
+            try:
+                self.ui.set('progress', 0)
+                self.ui.set('status', "Merging volumes...")
                 
-                # Find all volumes
-                volumes = []
-                i = 1
-                while True:
-                    vol = f"{base}.{i:03d}"
-                    if not os.path.exists(vol):
-                        break
-                    volumes.append(vol)
-                    i += 1
+                volumes = find_volumes(first_volume)
+                output_path = merged_output_path(first_volume)
+                manifest = find_checksum_manifest(first_volume) if verify else None
+                checksums = read_checksum_manifest(manifest) if manifest else {}
+                if checksums:
+                    # Bad volumes are caught before anything is written
+                    self.ui.set('status', "Verifying volumes...")
+                    bad = [name for name, ok in verify_checksums(
+                        volumes, checksums,
+                        lambda done, total: self.ui.set('progress', done / total * 100 if total else 100)) if not ok]
+                    if bad:
+                        raise Exception(f"Checksum mismatch in {', '.join(bad)}")
                 
-                if not volumes:
-                    raise Exception("No volumes found to merge")
+                def on_progress(done, total):
+                    self.ui.set('progress', done / total * 100 if total else 100)
+                    self.ui.set('status', f"Merging volumes... {done // (1024 * 1024)}/{total // (1024 * 1024)} MB")
                 
-                # Combine the files
-                with open(output_path, 'wb') as outfile:
-                    for vol in volumes:
-                        with open(vol, 'rb') as infile:
-                            shutil.copyfileobj(infile, outfile)
-                        self.progress['value'] = 10 + (90 * (volumes.index(vol) + 1) / len(volumes))
-                        self.root.update_idletasks()
+                report = merge_volume_files(volumes, output_path, on_progress)
+                if os.path.basename(output_path) in checksums:
+                    self.ui.set('status', "Verifying merged archive...")
+                    report.checks = verify_checksums(
+                        [output_path], checksums,
+                        lambda done, total: self.ui.set('progress', done / total * 100 if total else 100))
+                
+                if report.checks and not report.verified:
+                    self.ui.set('status', f"Merged archive failed verification: {report}")
+                    self.ui.call(messagebox.showerror, "Error", f"Merged archive does not match {os.path.basename(manifest)}:\n"
+                                 f"{output_path}\n{report}")
+                else:
+                    note = f"\nChecked against {os.path.basename(manifest)}" if manifest else ""
+                    self.ui.set('status', f"Volume merge completed: {report}")
+                    self.ui.call(messagebox.showinfo, "Success", f"Merged volumes to:\n{output_path}\n{report}{note}")
+                self.log_operation(f"Merged volumes to {os.path.basename(output_path)} - {report}")
             
-            self.progress['value'] = 100
-            messagebox.showinfo("Success", f"Merged volumes to:\n{output_path}")
-            self.status_var.set("Volume merge completed")
-            self.log_operation(f"Merged volumes to {os.path.basename(output_path)}")
-        
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to merge volumes:\n{str(e)}")
-            self.status_var.set("Volume merge failed")
-            self.log_operation(f"Error merging volumes: {str(e)}")
+            except Exception as e:
+                self.ui.call(messagebox.showerror, "Error", f"Failed to merge volumes:\n{str(e)}")
+                self.ui.set('status', "Volume merge failed")
+                self.log_operation(f"Error merging volumes: {str(e)}")
+            
+            finally:
+                self.ui.set('progress', 0)
         
-        finally:
-            self.progress['value'] = 0
+        Thread(target=merge_thread, daemon=True).start()
     
     # Image conversion methods
     def show_image_preview(self, image_path):
         """Show a preview of the selected image"""
-        try:
-            img = Image.open(image_path)
-            img.thumbnail((300, 300))
-            photo = ImageTk.PhotoImage(img)
-            self.image_preview.config(image=photo)
-            self.image_preview.image = photo  # Keep a reference
-        except Exception as e:
-            self.image_preview.config(image=None, text="Preview not available")
+        # Decoding happens off the Tk thread; only the newest request gets displayed
+        self.preview_request = image_path
+        
+        def preview_thread():
+            try:
+                img = self.preview_service.thumbnail(image_path)
+            except Exception:
+                img = None
+            self.ui.call(self.set_image_preview, image_path, img)
+        
+        Thread(target=preview_thread, daemon=True).start()
+    
+    def set_image_preview(self, image_path, img):
+        if image_path != self.preview_request:
+            return
+        if img is None:
+            self.image_preview.config(image='', text="Preview not available")
+            self.image_preview.image = None
+            return
+        photo = ImageTk.PhotoImage(img)
+        self.image_preview.config(image=photo, text='')
+        self.image_preview.image = photo  # Keep a reference
     
     def convert_images(self):
         """Convert images to the selected format"""
@@ -962,52 +1115,35 @@ class FileExtractorApp:
         
         output_format = self.image_format_var.get().lower()
         quality = self.image_quality_var.get()
+        max_dimension = self.image_max_dim_var.get() or None
+        workers = self.batch_workers.get()
         
-        try:
-            self.progress['value'] = 0
-            self.status_var.set("Converting images...")
-            
-            for i, img_path in enumerate(image_paths):
-                try:
-                    with Image.open(img_path) as img:
-                        # Convert to RGB if saving as JPEG
-                        if output_format in ['jpg', 'jpeg'] and img.mode != 'RGB':
-                            img = img.convert('RGB')
-                        
-                        # Create output filename
-                        base = os.path.splitext(os.path.basename(img_path))[0]
-                        output_path = os.path.join(output_dir, f"{base}.{output_format}")
-                        
-                        # Handle different formats
-                        if output_format in ['jpg', 'jpeg']:
-                            img.save(output_path, 'JPEG', quality=quality)
-                        elif output_format == 'png':
-                            img.save(output_path, 'PNG', compress_level=9 - (quality // 12))
-                        elif output_format == 'bmp':
-                            img.save(output_path, 'BMP')
-                        elif output_format == 'gif':
-                            img.save(output_path, 'GIF')
-                        elif output_format == 'tiff':
-                            img.save(output_path, 'TIFF', compression='tiff_lzw')
-                        elif output_format == 'webp':
-                            img.save(output_path, 'WEBP', quality=quality)
-                        
-                        self.progress['value'] = (i + 1) / len(image_paths) * 100
-                        self.root.update_idletasks()
+        def conversion_thread():
+            try:
+                self.ui.set('progress', 0)
+                self.ui.set('status', "Converting images...")
                 
-                except Exception as e:
-                    self.log_operation(f"Error converting {os.path.basename(img_path)}: {str(e)}")
+                def on_result(result, done, total):
+                    self.ui.set('progress', done / total * 100)
+                    if not result.ok:
+                        self.log_operation(f"Error converting {os.path.basename(result.source)}: {result.error}")
+                
+                jobs = [(img_path, output_path_for(img_path, output_dir, output_format)) for img_path in image_paths]
+                report = convert_batch(jobs, output_format, quality, workers=workers, on_result=on_result,
+                                       max_dimension=max_dimension)
+                
+                self.ui.set('status', f"Converted {len(report.converted)} images to {output_format.upper()}")
+                self.ui.call(messagebox.showinfo, "Success", f"Image conversion completed\n{report}")
+                self.log_operation(f"Converted images to {output_format.upper()} - {report}")
             
-            self.status_var.set(f"Converted {len(image_paths)} images to {output_format.upper()}")
-            messagebox.showinfo("Success", "Image conversion completed")
-            self.log_operation(f"Converted {len(image_paths)} images to {output_format.upper()}")
-        
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to convert images:\n{str(e)}")
-            self.status_var.set("Image conversion failed")
+            except Exception as e:
+                self.ui.call(messagebox.showerror, "Error", f"Failed to convert images:\n{str(e)}")
+                self.ui.set('status', "Image conversion failed")
+            
+            finally:
+                self.ui.set('progress', 0)
         
-        finally:
-            self.progress['value'] = 0
+        Thread(target=conversion_thread, daemon=True).start()
     
     def create_pdf_from_images(self):
         """Create a PDF from the selected images"""
@@ -1032,26 +1168,33 @@ class FileExtractorApp:
         if not pdf_path:
             return  # User canceled
         
-        try:
-            self.progress['value'] = 0
-            self.status_var.set("Creating PDF...")
+        workers = self.batch_workers.get()
+        
+        def pdf_thread():
+            try:
+                self.ui.set('progress', 0)
+                self.ui.set('status', "Creating PDF...")
+                
+                def on_progress(done, total):
+                    self.ui.set('progress', done / total * 100)
+                    self.ui.set('status', f"Creating PDF... image {done}/{total}")
+                
+                # Pages are prepared in parallel and streamed to disk in order
+                pages = write_pdf(image_paths, pdf_path, workers=workers, on_progress=on_progress)
+                
+                self.ui.set('status', f"PDF created: {os.path.basename(pdf_path)}")
+                self.ui.call(messagebox.showinfo, "Success", "PDF created successfully")
+                self.log_operation(f"Created PDF with {pages} pages from {len(image_paths)} images")
             
-            # Convert images to PDF
-            with open(pdf_path, "wb") as f:
-                f.write(img2pdf.convert(image_paths))
+            except Exception as e:
+                self.ui.call(messagebox.showerror, "Error", f"Failed to create PDF:\n{str(e)}")
+                self.ui.set('status', "PDF creation failed")
+                self.log_operation(f"Error creating PDF: {str(e)}")
             
-            self.progress['value'] = 100
-            self.status_var.set(f"PDF created: {os.path.basename(pdf_path)}")
-            messagebox.showinfo("Success", "PDF created successfully")
-            self.log_operation(f"Created PDF from {len(image_paths)} images")
-        
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to create PDF:\n{str(e)}")
-            self.status_var.set("PDF creation failed")
-            self.log_operation(f"Error creating PDF: {str(e)}")
+            finally:
+                self.ui.set('progress', 0)
         
-        finally:
-            self.progress['value'] = 0
+        Thread(target=pdf_thread, daemon=True).start()
     
     def extract_text_from_images(self):
         """Extract text from images using OCR"""
@@ -1076,44 +1219,112 @@ class FileExtractorApp:
         if not text_path:
             return  # User canceled
         
-        try:
-            self.progress['value'] = 0
-            self.status_var.set("Extracting text...")
-            
-            # Check if Tesseract is installed
+        lang = self.ocr_lang_var.get().strip() or "eng"
+        do_preprocess = self.ocr_preprocess_var.get()
+        workers = self.batch_workers.get()
+        
+        def ocr_thread():
             try:
-                pytesseract.get_tesseract_version()
-            except EnvironmentError:
-                messagebox.showerror("Error", "Tesseract OCR is not installed or not in your PATH")
-                return
-            
-            # Process each image
-            with open(text_path, 'w', encoding='utf-8') as f:
-                for i, img_path in enumerate(image_paths):
-                    try:
-                        text = pytesseract.image_to_string(Image.open(img_path))
-                        f.write(f"=== Text from {os.path.basename(img_path)} ===\n")
-                        f.write(text)
-                        f.write("\n\n")
-                        
-                        self.progress['value'] = (i + 1) / len(image_paths) * 100
-                        self.root.update_idletasks()
+                self.ui.set('progress', 0)
+                self.ui.set('status', "Extracting text...")
+                
+                # Check if Tesseract is installed
+                try:
+                    pytesseract.get_tesseract_version()
+                except EnvironmentError:
+                    self.ui.call(messagebox.showerror, "Error", "Tesseract OCR is not installed or not in your PATH")
+                    return
+                
+                # Images are recognized in parallel; results arrive here in the original order
+                with open(text_path, 'w', encoding='utf-8') as f:
+                    def on_result(result, done, total):
+                        if result.ok:
+                            f.write(f"=== Text from {os.path.basename(result.source)} ===\n")
+                            f.write(result.text)
+                            f.write("\n\n")
+                        else:
+                            self.log_operation(f"Error processing {result.label}: {result.error}")
+                        self.ui.set('progress', done / total * 100)
                     
-                    except Exception as e:
-                        self.log_operation(f"Error processing {os.path.basename(img_path)}: {str(e)}")
+                    report = ocr_images(image_paths, on_result, workers=workers, lang=lang,
+                                        do_preprocess=do_preprocess, cache=self.ocr_cache)
+                
+                self.ui.set('progress', 100)
+                self.ui.set('status', f"Text extracted to {os.path.basename(text_path)}")
+                self.ui.call(messagebox.showinfo, "Success", f"Text extraction completed\n{report}")
+                self.log_operation(f"Extracted text from images - {report}")
+            
+            except Exception as e:
+                self.ui.call(messagebox.showerror, "Error", f"Failed to extract text:\n{str(e)}")
+                self.ui.set('status', "Text extraction failed")
+                self.log_operation(f"Error extracting text: {str(e)}")
             
-            self.progress['value'] = 100
-            self.status_var.set(f"Text extracted to {os.path.basename(text_path)}")
-            messagebox.showinfo("Success", "Text extraction completed")
-            self.log_operation(f"Extracted text from {len(image_paths)} images")
+            finally:
+                self.ui.set('progress', 0)
         
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to extract text:\n{str(e)}")
-            self.status_var.set("Text extraction failed")
-            self.log_operation(f"Error extracting text: {str(e)}")
+        Thread(target=ocr_thread, daemon=True).start()
+    
+    def extract_text_from_pdf(self):
+        """Extract text from a scanned PDF using OCR, a few pages at a time"""
+        pdf_path = filedialog.askopenfilename(title="Select PDF", filetypes=[("PDF Files", "*.pdf"), ("All Files", "*.*")])
+        if not pdf_path:
+            return
         
-        finally:
-            self.progress['value'] = 0
+        output_dir = self.image_out_path.get() or os.path.dirname(pdf_path)
+        text_path = filedialog.asksaveasfilename(
+            initialdir=output_dir,
+            initialfile=os.path.splitext(os.path.basename(pdf_path))[0] + ".txt",
+            defaultextension=".txt",
+            filetypes=[("Text Files", "*.txt")]
+        )
+        
+        if not text_path:
+            return  # User canceled
+        
+        lang = self.ocr_lang_var.get().strip() or "eng"
+        do_preprocess = self.ocr_preprocess_var.get()
+        dpi = self.ocr_dpi_var.get()
+        workers = self.batch_workers.get()
+        
+        def ocr_thread():
+            try:
+                self.ui.set('progress', 0)
+                self.ui.set('status', "Extracting text from PDF...")
+                
+                try:
+                    pytesseract.get_tesseract_version()
+                except EnvironmentError:
+                    self.ui.call(messagebox.showerror, "Error", "Tesseract OCR is not installed or not in your PATH")
+                    return
+                
+                # Pages are rasterized and recognized in small windows; text is written page by page
+                with open(text_path, 'w', encoding='utf-8') as f:
+                    def on_result(result, done, total):
+                        if result.ok:
+                            f.write(f"=== Page {result.page} ===\n")
+                            f.write(result.text)
+                            f.write("\n\n")
+                        else:
+                            self.log_operation(f"Error processing {result.label}: {result.error}")
+                        self.ui.set('progress', done / total * 100)
+                        self.ui.set('status', f"Extracting text from PDF... page {done}/{total}")
+                    
+                    report = ocr_pdf(pdf_path, on_result, workers=workers, dpi=dpi, lang=lang,
+                                     do_preprocess=do_preprocess, cache=self.ocr_cache)
+                
+                self.ui.set('status', f"Text extracted to {os.path.basename(text_path)}")
+                self.ui.call(messagebox.showinfo, "Success", f"Text extraction completed\n{report}")
+                self.log_operation(f"Extracted text from {os.path.basename(pdf_path)} - {report}")
+            
+            except Exception as e:
+                self.ui.call(messagebox.showerror, "Error", f"Failed to extract text:\n{str(e)}")
+                self.ui.set('status', "Text extraction failed")
+                self.log_operation(f"Error extracting text from {os.path.basename(pdf_path)}: {str(e)}")
+            
+            finally:
+                self.ui.set('progress', 0)
+        
+        Thread(target=ocr_thread, daemon=True).start()
     
     # Batch processing methods
     def batch_extract(self):
@@ -1129,54 +1340,48 @@ class FileExtractorApp:
             os.makedirs(output_dir, exist_ok=True)
             self.batch_output.set(output_dir)
         
-        try:
-            self.progress['value'] = 0
-            self.status_var.set("Starting batch extraction...")
-            
-            # Find all archive files
-            archives = []
-            for root, _, files in os.walk(source_dir):
-                for file in files:
-                    if file.lower().endswith(('.zip', '.rar', '.7z', '.tar', '.tar.gz', '.tar.bz2', '.tar.xz')):
-                        archives.append(os.path.join(root, file))
-            
-            if not archives:
-                messagebox.showinfo("Info", "No archive files found in the source directory")
-                return
-            
-            # Process each archive
-            for i, archive in enumerate(archives):
-                try:
-                    self.status_var.set(f"Extracting {i+1}/{len(archives)}: {os.path.basename(archive)}")
-                    
-                    # Create output subdirectory
-                    base = os.path.splitext(os.path.basename(archive))[0]
-                    if base.endswith('.tar'):
-                        base = os.path.splitext(base)[0]
-                    archive_out = os.path.join(output_dir, base)
-                    os.makedirs(archive_out, exist_ok=True)
-                    
-                    # Extract the archive
-                    patoolib.extract_archive(archive, outdir=archive_out)
-                    
-                    self.progress['value'] = (i + 1) / len(archives) * 100
-                    self.root.update_idletasks()
-                    self.log_operation(f"Extracted {os.path.basename(archive)} to {archive_out}")
+        workers = self.batch_workers.get()
+        layout = OutputLayout(source_dir, output_dir, self.batch_layout.get())
+        
+        def batch_thread():
+            try:
+                self.ui.set('progress', 0)
+                self.ui.set('status', "Starting batch extraction...")
                 
-                except Exception as e:
-                    self.log_operation(f"Error extracting {os.path.basename(archive)}: {str(e)}")
+                # Find all archive files
+                archives = find_archives(source_dir, exclude_dir=output_dir)
+                
+                if not archives:
+                    self.ui.call(messagebox.showinfo, "Info", "No archive files found in the source directory")
+                    return
+                
+                def on_result(result, done, total):
+                    self.ui.set('status', f"Extracted {done}/{total}: {os.path.basename(result.archive)}")
+                    self.ui.set('progress', done / total * 100)
+                    if result.ok:
+                        self.log_operation(f"Extracted {os.path.basename(result.archive)} to {result.outdir} "
+                                           f"({result.backend}, {result.elapsed:.2f}s)")
+                    else:
+                        self.log_operation(f"Error extracting {os.path.basename(result.archive)}: {result.error}")
+                
+                # Extract archives in parallel worker processes
+                outdirs = layout.assign(archives, stem_for=archive_base_name)
+                report = batch_extract(archives, output_dir, workers=workers, on_result=on_result, outdirs=outdirs)
+                LayoutManifest(output_dir).record(outdirs, layout.mode)
+                
+                self.ui.set('status', f"Batch extraction complete: {report}")
+                self.ui.call(messagebox.showinfo, "Success", f"Batch extraction completed\n{report}")
+                self.log_operation(f"Batch extraction completed - {report}")
             
-            self.status_var.set(f"Batch extraction complete: {len(archives)} archives processed")
-            messagebox.showinfo("Success", f"Batch extraction completed\n{len(archives)} archives processed")
-            self.log_operation(f"Batch extraction completed - {len(archives)} archives processed")
-        
-        except Exception as e:
-            messagebox.showerror("Error", f"Batch extraction failed:\n{str(e)}")
-            self.status_var.set("Batch extraction failed")
-            self.log_operation(f"Batch extraction error: {str(e)}")
+            except Exception as e:
+                self.ui.call(messagebox.showerror, "Error", f"Batch extraction failed:\n{str(e)}")
+                self.ui.set('status', "Batch extraction failed")
+                self.log_operation(f"Batch extraction error: {str(e)}")
+            
+            finally:
+                self.ui.set('progress', 0)
         
-        finally:
-            self.progress['value'] = 0
+        Thread(target=batch_thread, daemon=True).start()
     
     def batch_compress(self):
         """Batch compress directories to archives"""
@@ -1193,75 +1398,74 @@ class FileExtractorApp:
         
         format = self.compression_method.get().lower()
         level = self.compression_level.get()
+        workers = self.batch_workers.get()
         
-        try:
-            self.progress['value'] = 0
-            self.status_var.set("Starting batch compression...")
-            
-            # Find all directories (excluding the output directory)
-            dirs = []
-            for root, directories, _ in os.walk(source_dir):
-                for directory in directories:
-                    dir_path = os.path.join(root, directory)
-                    if not dir_path.startswith(output_dir):
-                        dirs.append(dir_path)
-            
-            if not dirs:
-                messagebox.showinfo("Info", "No directories found to compress")
-                return
-            
-            # Process each directory
-            for i, dir_path in enumerate(dirs):
-                try:
-                    dir_name = os.path.basename(dir_path)
-                    self.status_var.set(f"Compressing {i+1}/{len(dirs)}: {dir_name}")
-                    
-                    # Create archive path
-                    archive_path = os.path.join(output_dir, f"{dir_name}.{format}")
-                    
-                    # Compress the directory
-                    if format == 'zip':
-                        with zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=level) as zipf:
+        def batch_thread():
+            # One compression pool shared by every ZIP in the batch
+            zip_pool = ProcessPoolExecutor(max_workers=workers) if format == 'zip' else None
+            try:
+                self.ui.set('progress', 0)
+                self.ui.set('status', "Starting batch compression...")
+                
+                # Find all directories (excluding the output directory)
+                dirs = []
+                for root, directories, _ in os.walk(source_dir):
+                    for directory in directories:
+                        dir_path = os.path.join(root, directory)
+                        if not dir_path.startswith(output_dir):
+                            dirs.append(dir_path)
+                
+                if not dirs:
+                    self.ui.call(messagebox.showinfo, "Info", "No directories found to compress")
+                    return
+                
+                # Process each directory
+                for i, dir_path in enumerate(dirs):
+                    try:
+                        dir_name = os.path.basename(dir_path)
+                        self.ui.set('status', f"Compressing {i+1}/{len(dirs)}: {dir_name}")
+                        
+                        # Create archive path
+                        archive_path = os.path.join(output_dir, f"{dir_name}.{format}")
+                        
+                        # Compress the directory
+                        if format == 'zip':
+                            entries = []
                             for root, _, files in os.walk(dir_path):
                                 for file in files:
                                     file_path = os.path.join(root, file)
-                                    arcname = os.path.relpath(file_path, dir_path)
-                                    zipf.write(file_path, arcname)
-                    
-                    elif format == '7z':
-                        with py7zr.SevenZipFile(archive_path, 'w', filters=[{'id': py7zr.FILTER_DEFLATE, 'level': level}]) as sevenzf:
-                            sevenzf.writeall(dir_path, os.path.basename(dir_path))
-                    
-                    elif format in ['tar', 'tar.gz', 'tar.bz2', 'tar.xz']:
-                        mode = 'w'
-                        if format.endswith('.gz'):
-                            mode += ':gz'
-                        elif format.endswith('.bz2'):
-                            mode += ':bz2'
-                        elif format.endswith('.xz'):
-                            mode += ':xz'
+                                    entries.append((file_path, os.path.relpath(file_path, dir_path)))
+                            write_zip(archive_path, entries, level=level, workers=workers, executor=zip_pool)
+                        
+                        elif format == '7z':
+                            with py7zr.SevenZipFile(archive_path, 'w', filters=[{'id': py7zr.FILTER_DEFLATE, 'level': level}]) as sevenzf:
+                                sevenzf.writeall(dir_path, os.path.basename(dir_path))
                         
-                        with tarfile.open(archive_path, mode) as tarf:
-                            tarf.add(dir_path, arcname=os.path.basename(dir_path))
+                        elif format in ['tar', 'tar.gz', 'tar.bz2', 'tar.xz']:
+                            with open_tar_writer(archive_path, level=level, workers=workers) as tarf:
+                                tarf.add(dir_path, arcname=os.path.basename(dir_path))
+                        
+                        self.ui.set('progress', (i + 1) / len(dirs) * 100)
+                        self.log_operation(f"Compressed {dir_name} to {os.path.basename(archive_path)}")
                     
-                    self.progress['value'] = (i + 1) / len(dirs) * 100
-                    self.root.update_idletasks()
-                    self.log_operation(f"Compressed {dir_name} to {os.path.basename(archive_path)}")
+                    except Exception as e:
+                        self.log_operation(f"Error compressing {dir_name}: {str(e)}")
                 
-                except Exception as e:
-                    self.log_operation(f"Error compressing {dir_name}: {str(e)}")
+                self.ui.set('status', f"Batch compression complete: {len(dirs)} directories processed")
+                self.ui.call(messagebox.showinfo, "Success", f"Batch compression completed\n{len(dirs)} directories processed")
+                self.log_operation(f"Batch compression completed - {len(dirs)} directories processed")
             
-            self.status_var.set(f"Batch compression complete: {len(dirs)} directories processed")
-            messagebox.showinfo("Success", f"Batch compression completed\n{len(dirs)} directories processed")
-            self.log_operation(f"Batch compression completed - {len(dirs)} directories processed")
-        
-        except Exception as e:
-            messagebox.showerror("Error", f"Batch compression failed:\n{str(e)}")
-            self.status_var.set("Batch compression failed")
-            self.log_operation(f"Batch compression error: {str(e)}")
+            except Exception as e:
+                self.ui.call(messagebox.showerror, "Error", f"Batch compression failed:\n{str(e)}")
+                self.ui.set('status', "Batch compression failed")
+                self.log_operation(f"Batch compression error: {str(e)}")
+            
+            finally:
+                if zip_pool:
+                    zip_pool.shutdown()
+                self.ui.set('progress', 0)
         
-        finally:
-            self.progress['value'] = 0
+        Thread(target=batch_thread, daemon=True).start()
     
     def batch_convert_images(self):
         """Batch convert images in a directory"""
@@ -1278,70 +1482,78 @@ class FileExtractorApp:
         
         format = self.image_format_var.get().lower()
         quality = self.image_quality_var.get()
+        workers = self.batch_workers.get()
+        incremental = self.batch_incremental.get()
+        propagate_deletes = self.batch_propagate_deletes.get()
+        layout = OutputLayout(source_dir, output_dir, self.batch_layout.get())
         
-        try:
-            self.progress['value'] = 0
-            self.status_var.set("Starting batch image conversion...")
-            
-            # Find all image files
-            images = []
-            for root, _, files in os.walk(source_dir):
-                for file in files:
-                    if file.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tif', '.tiff', '.webp')):
-                        images.append(os.path.join(root, file))
-            
-            if not images:
-                messagebox.showinfo("Info", "No image files found in the source directory")
-                return
-            
-            # Process each image
-            for i, img_path in enumerate(images):
-                try:
-                    img_name = os.path.basename(img_path)
-                    self.status_var.set(f"Converting {i+1}/{len(images)}: {img_name}")
-                    
-                    # Create output filename
-                    base = os.path.splitext(img_name)[0]
-                    output_path = os.path.join(output_dir, f"{base}.{format}")
-                    
-                    # Convert the image
-                    with Image.open(img_path) as img:
-                        # Convert to RGB if saving as JPEG
-                        if format in ['jpg', 'jpeg'] and img.mode != 'RGB':
-                            img = img.convert('RGB')
-                        
-                        # Save in the new format
-                        if format in ['jpg', 'jpeg']:
-                            img.save(output_path, 'JPEG', quality=quality)
-                        elif format == 'png':
-                            img.save(output_path, 'PNG', compress_level=9 - (quality // 12))
-                        elif format == 'bmp':
-                            img.save(output_path, 'BMP')
-                        elif format == 'gif':
-                            img.save(output_path, 'GIF')
-                        elif format == 'tiff':
-                            img.save(output_path, 'TIFF', compression='tiff_lzw')
-                        elif format == 'webp':
-                            img.save(output_path, 'WEBP', quality=quality)
-                    
-                    self.progress['value'] = (i + 1) / len(images) * 100
-                    self.root.update_idletasks()
-                    self.log_operation(f"Converted {img_name} to {format.upper()}")
+        def batch_thread():
+            try:
+                self.ui.set('progress', 0)
+                self.ui.set('status', "Starting batch image conversion...")
                 
-                except Exception as e:
-                    self.log_operation(f"Error converting {img_name}: {str(e)}")
+                # Find all image files
+                images = find_images(source_dir, exclude_dir=output_dir)
+                
+                if not images:
+                    self.ui.call(messagebox.showinfo, "Info", "No image files found in the source directory")
+                    return
+                
+                outputs = layout.assign(images, f".{format}")
+                jobs = [(img_path, outputs[img_path]) for img_path in images]
+                summary = ""
+                manifest = None
+                pending_entries = []
+                
+                if incremental:
+                    # Only sources that changed since the last run (or whose output is gone) get converted
+                    self.ui.set('status', "Checking for changed images...")
+                    manifest = ImageManifest(output_dir)
+                    params = conversion_params(format, quality)
+                    plan = plan_incremental(images, source_dir, [output for _, output in jobs], params, manifest.load())
+                    jobs = plan.jobs
+                    manifest.record(plan.refreshed)
+                    summary = f"{plan.skipped} up to date"
+                    if propagate_deletes and plan.deleted:
+                        removed = remove_deleted(manifest, plan.deleted, keep=plan.outputs)
+                        summary += f", {removed} outputs of deleted images removed"
+                        self.log_operation(f"Removed {removed} outputs of deleted images from {output_dir}")
+                
+                def on_result(result, done, total):
+                    img_name = os.path.basename(result.source)
+                    self.ui.set('status', f"Converted {done}/{total}: {img_name}")
+                    self.ui.set('progress', done / total * 100)
+                    if result.ok:
+                        self.log_operation(f"Converted {img_name} to {format.upper()} ({result.elapsed:.2f}s)")
+                        if manifest is not None:
+                            pending_entries.append(entry_for(plan, result, params))
+                            if len(pending_entries) >= RECORD_BATCH:
+                                manifest.record(pending_entries)
+                                pending_entries.clear()
+                    else:
+                        self.log_operation(f"Error converting {img_name}: {result.error}")
+                
+                # Decode and encode in parallel worker processes
+                report = convert_batch(jobs, format, quality, workers=workers, on_result=on_result,
+                                       hash_sources=manifest is not None)
+                if manifest is not None:
+                    manifest.record(pending_entries)
+                    report = f"{report}, {summary}"
+                LayoutManifest(output_dir).record(outputs, layout.mode)
+                
+                self.ui.set('status', f"Batch conversion complete: {report}")
+                self.ui.call(messagebox.showinfo, "Success", f"Batch image conversion completed\n{report}")
+                self.log_operation(f"Batch image conversion completed - {report}")
             
-            self.status_var.set(f"Batch conversion complete: {len(images)} images processed")
-            messagebox.showinfo("Success", f"Batch image conversion completed\n{len(images)} images processed")
-            self.log_operation(f"Batch image conversion completed - {len(images)} images processed")
-        
-        except Exception as e:
-            messagebox.showerror("Error", f"Batch conversion failed:\n{str(e)}")
-            self.status_var.set("Batch conversion failed")
-            self.log_operation(f"Batch conversion error: {str(e)}")
+            except Exception as e:
+                self.ui.call(messagebox.showerror, "Error", f"Batch conversion failed:\n{str(e)}")
+                self.ui.set('status', "Batch conversion failed")
+                self.log_operation(f"Batch conversion error: {str(e)}")
+            
+            finally:
+                self.ui.set('progress', 0)
         
-        finally:
-            self.progress['value'] = 0
+        Thread(target=batch_thread, daemon=True).start()
     
     # Utility methods
     def format_size(self, size):
@@ -1361,9 +1573,12 @@ class FileExtractorApp:
     def log_operation(self, message):
         """Add a message to the operation log"""
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
+        self.ui.call(self.append_log, f"[{timestamp}] {message}\n")
+    
+    def append_log(self, line):
+        """Append a line to the log widget (Tk thread only)"""
+        self.log_text.insert(tk.END, line)
         self.log_text.see(tk.END)
-        self.log_text.update()
     
     def open_website(self):
         """Open the application website"""
@@ -0,0 +1,162 @@
+import os
+import time
+import zipfile
+import tarfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import py7zr
+import rarfile
+import patoolib
+
+ARCHIVE_EXTENSIONS = ('.zip', '.rar', '.7z', '.tar', '.tar.gz', '.tar.bz2', '.tar.xz')
+
+
+def tar_mode(path, prefix='r'):
+    """Return the tarfile mode ('r:gz', 'w:xz', ...) for an archive path"""
+    mode = prefix
+    if path.endswith('.gz'):
+        mode += ':gz'
+    elif path.endswith('.bz2'):
+        mode += ':bz2'
+    elif path.endswith('.xz'):
+        mode += ':xz'
+    return mode
+
+
+def archive_base_name(path):
+    """Archive file name without its (possibly double) extension"""
+    base = os.path.splitext(os.path.basename(path))[0]
+    if base.endswith('.tar'):
+        base = os.path.splitext(base)[0]
+    return base
+
+
+def find_archives(source_dir, exclude_dir=None):
+    """Return every archive below source_dir, skipping exclude_dir (e.g. an output dir inside it)"""
+    exclude_dir = os.path.abspath(exclude_dir) if exclude_dir else None
+    archives = []
+    for root, dirs, files in os.walk(source_dir):
+        if exclude_dir:
+            dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != exclude_dir]
+        for file in files:
+            if file.lower().endswith(ARCHIVE_EXTENSIONS):
+                archives.append(os.path.join(root, file))
+    return archives
+
+
+def extract_archive(archive, outdir, password=None):
+    """Extract one archive in-process where possible, return the backend used"""
+    lower = archive.lower()
+    try:
+        if lower.endswith('.zip'):
+            with zipfile.ZipFile(archive, 'r') as zip_ref:
+                zip_ref.extractall(outdir, pwd=password.encode() if password else None)
+            return 'zipfile'
+
+        if lower.endswith(('.tar', '.tar.gz', '.tar.bz2', '.tar.xz')):
+            with tarfile.open(archive, tar_mode(lower)) as tar_ref:
+                if hasattr(tarfile, 'data_filter'):
+                    tar_ref.extractall(outdir, filter='data')
+                else:
+                    tar_ref.extractall(outdir)
+            return 'tarfile'
+
+        if lower.endswith('.7z'):
+            with py7zr.SevenZipFile(archive, 'r', password=password) as sevenz_ref:
+                sevenz_ref.extractall(path=outdir)
+            return 'py7zr'
+
+        if lower.endswith('.rar'):
+            with rarfile.RarFile(archive, 'r') as rar_ref:
+                rar_ref.extractall(outdir, pwd=password)
+            return 'rarfile'
+
+    except (py7zr.exceptions.UnsupportedCompressionMethodError, rarfile.RarCannotExec,
+            NotImplementedError, RuntimeError):
+        # Codec or helper binary missing for the in-process backend; zipfile raises
+        # NotImplementedError for deflate64/AES and RuntimeError for encrypted members
+        pass
+
+    patoolib.extract_archive(archive, outdir=outdir, password=password, verbosity=-1, interactive=False)
+    return 'patoolib'
+
+
+class ExtractResult:
+    """Timing and outcome of extracting a single archive"""
+
+    def __init__(self, archive, outdir):
+        self.archive = archive
+        self.outdir = outdir
+        self.size = 0
+        self.elapsed = 0.0
+        self.backend = None
+        self.error = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class BatchExtractReport:
+    """Summary of a batch extraction run"""
+
+    def __init__(self, results, wall_time):
+        self.results = results
+        self.wall_time = wall_time
+
+    @property
+    def failed(self):
+        return [r for r in self.results if not r.ok]
+
+    @property
+    def total_bytes(self):
+        return sum(r.size for r in self.results if r.ok)
+
+    @property
+    def mb_per_sec(self):
+        """Compressed input consumed per wall-clock second"""
+        if self.wall_time <= 0:
+            return 0.0
+        return self.total_bytes / (1024 * 1024) / self.wall_time
+
+    def __str__(self):
+        return (f"{len(self.results) - len(self.failed)}/{len(self.results)} archives extracted, "
+                f"{self.total_bytes / (1024 * 1024):.1f} MB in {self.wall_time:.1f}s "
+                f"({self.mb_per_sec:.1f} MB/s)")
+
+
+def _extract_worker(archive, outdir, password):
+    result = ExtractResult(archive, outdir)
+    start = time.perf_counter()
+    try:
+        result.size = os.path.getsize(archive)
+        os.makedirs(outdir, exist_ok=True)
+        result.backend = extract_archive(archive, outdir, password)
+    except Exception as e:
+        result.error = str(e)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def batch_extract(archives, output_dir, workers=None, password=None, on_result=None, outdirs=None):
+    """Extract archives into output_dir/<name> on a process pool
+
+    outdirs optionally maps each archive to its own output directory, e.g.
+    from an OutputLayout. on_result(result, done, total) is called in the
+    calling thread as each archive finishes. Returns a BatchExtractReport.
+    """
+    if outdirs is None:
+        outdirs = {archive: os.path.join(output_dir, archive_base_name(archive)) for archive in archives}
+    workers = max(1, workers or os.cpu_count() or 1)
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=min(workers, max(1, len(archives)))) as pool:
+        futures = [
+            pool.submit(_extract_worker, archive, outdirs[archive], password)
+            for archive in archives
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if on_result:
+                on_result(result, len(results), len(archives))
+    return BatchExtractReport(results, time.perf_counter() - start)
@@ -0,0 +1,128 @@
+import os
+import time
+import hashlib
+import sqlite3
+import tarfile
+from contextlib import closing
+from archive_listing import MemberTable, stream_listing
+from tar_seek import SeekIndex
+from volume_set import find_volumes, is_volume_set, open_archive_file
+
+SCHEMA_VERSION = 2
+# Bytes hashed from each end of the archive to catch in-place rewrites
+HEADER_HASH_BYTES = 64 * 1024
+
+
+def default_index_path():
+    """SQLite file next to the application's per-user settings"""
+    return os.path.join(os.path.expanduser('~'), '.archive_manager', 'archive_index.sqlite3')
+
+
+def header_hash(archive_path):
+    """Hash the first and last bytes of an archive; cheap, but changes when headers do"""
+    digest = hashlib.sha1()
+    with open_archive_file(archive_path) as f:
+        digest.update(f.read(HEADER_HASH_BYTES))
+        f.seek(0, os.SEEK_END)
+        if f.tell() > HEADER_HASH_BYTES:
+            f.seek(max(HEADER_HASH_BYTES, f.tell() - HEADER_HASH_BYTES))
+            digest.update(f.read(HEADER_HASH_BYTES))
+    return digest.hexdigest()
+
+
+class ArchiveIndexCache:
+    """On-disk cache of archive member tables keyed by path and invalidated by size, mtime and header hash"""
+
+    def __init__(self, db_path=None, max_entries=256):
+        self.db_path = db_path or default_index_path()
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                conn.execute('DROP TABLE IF EXISTS archives')
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS archives (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    header_hash TEXT NOT NULL,
+                    last_used REAL NOT NULL,
+                    names BLOB, name_offsets BLOB, sizes BLOB,
+                    mtimes BLOB, offsets BLOB, is_dir BLOB,
+                    seek_index BLOB
+                )
+            ''')
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    @staticmethod
+    def _identity(archive_path):
+        # A volume set is as large as all its volumes and as new as the newest one
+        paths = find_volumes(archive_path) if is_volume_set(archive_path) else [archive_path]
+        stats = [os.stat(path) for path in paths]
+        return os.path.abspath(archive_path), sum(st.st_size for st in stats), max(st.st_mtime_ns for st in stats)
+
+    def load(self, archive_path):
+        """Return the cached (MemberTable, SeekIndex or None), or None if missing or stale"""
+        path, size, mtime_ns = self._identity(archive_path)
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                'SELECT size, mtime_ns, header_hash, names, name_offsets, sizes, mtimes, offsets, is_dir, seek_index '
+                'FROM archives WHERE path = ?', (path,)).fetchone()
+            if row is None:
+                return None
+            if (row[0], row[1]) != (size, mtime_ns) or row[2] != header_hash(archive_path):
+                conn.execute('DELETE FROM archives WHERE path = ?', (path,))
+                return None
+            conn.execute('UPDATE archives SET last_used = ? WHERE path = ?', (time.time(), path))
+        keys = ('names', 'name_offsets', 'sizes', 'mtimes', 'offsets', 'is_dir')
+        seek_index = SeekIndex.from_bytes(row[9]) if row[9] else None
+        return MemberTable.from_columns(dict(zip(keys, row[3:9]))), seek_index
+
+    def store(self, archive_path, table, seek_index=None):
+        """Save a complete MemberTable (and the tar SeekIndex, if any) for archive_path"""
+        path, size, mtime_ns = self._identity(archive_path)
+        columns = table.to_columns()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO archives VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (path, size, mtime_ns, header_hash(archive_path), time.time(),
+                 columns['names'], columns['name_offsets'], columns['sizes'],
+                 columns['mtimes'], columns['offsets'], columns['is_dir'],
+                 seek_index.to_bytes() if seek_index is not None else None))
+            conn.execute(
+                'DELETE FROM archives WHERE path NOT IN '
+                '(SELECT path FROM archives ORDER BY last_used DESC LIMIT ?)', (self.max_entries,))
+
+
+def cached_stream_listing(listing, cache, on_chunk=None, chunk_size=5000):
+    """stream_listing that restores the member table from cache when it is still valid"""
+    try:
+        cached = cache.load(listing.archive_path)
+    except (OSError, sqlite3.Error):
+        cached = None
+
+    if cached is not None:
+        table, listing.seek_index = cached
+        listing.load_table(table)
+        if on_chunk and not listing.cancelled:
+            on_chunk()
+        return
+
+    stream_listing(listing, on_chunk, chunk_size)
+    if listing.done and not listing.error and not listing.cancelled:
+        try:
+            cache.store(listing.archive_path, listing.table, listing.seek_index)
+        except (OSError, sqlite3.Error):
+            pass
+
+
+def read_tar_members_at(tar_ref, offsets):
+    """Yield TarInfo objects read directly at known header offsets, skipping the header walk"""
+    for offset in sorted(offsets):
+        tar_ref.fileobj.seek(offset)
+        yield tarfile.TarInfo.fromtarfile(tar_ref)
@@ -0,0 +1,248 @@
+import time
+import zipfile
+import tarfile
+from array import array
+from threading import Lock
+import py7zr
+import rarfile
+from tar_seek import IndexingReader, tar_codec, xz_seek_index
+from volume_set import is_volume_set, logical_name, open_archive_file
+
+
+def _tuple_timestamp(date_time):
+    """Convert a ZIP/RAR (Y, M, D, h, m, s) tuple to a POSIX timestamp"""
+    try:
+        return time.mktime(tuple(date_time[:6]) + (0, 0, -1))
+    except (TypeError, ValueError, OverflowError):
+        return 0.0
+
+
+def iter_members(archive_path, on_seek_index=None):
+    """Yield (name, size, mtime, is_dir, offset) for each member, streaming where the format allows
+
+    offset is the member's header offset: in the file for ZIP, in the
+    uncompressed stream for tar, 0 where the format does not expose one.
+    For compressed tars on_seek_index(SeekIndex) is called once the whole
+    archive has been read.
+    """
+    # A .zip.001/.7z.001/.tar.001 volume set is read as one joined stream
+    lower = logical_name(archive_path).lower()
+    if lower.endswith('.zip'):
+        with open_archive_file(archive_path) as f, zipfile.ZipFile(f, 'r') as zip_ref:
+            for info in zip_ref.infolist():
+                yield info.filename, info.file_size, _tuple_timestamp(info.date_time), info.is_dir(), info.header_offset
+
+    elif lower.endswith('.rar'):
+        with rarfile.RarFile(archive_path, 'r') as rar_ref:
+            for info in rar_ref.infolist():
+                yield info.filename, info.file_size, _tuple_timestamp(info.date_time), info.is_dir(), 0
+
+    elif lower.endswith(('.7z', '.7zip')):
+        with open_archive_file(archive_path) as f, py7zr.SevenZipFile(f, 'r') as sevenz_ref:
+            for info in sevenz_ref.list():
+                mtime = info.creationtime.timestamp() if info.creationtime else 0.0
+                yield info.filename, info.uncompressed or 0, mtime, info.is_directory, 0
+
+    elif lower.endswith(('.tar', '.tar.gz', '.tar.bz2', '.tar.xz')):
+        codec = tar_codec(lower)
+        source = open_archive_file(archive_path)
+        # The listing decompresses everything anyway; record restart points on the way
+        reader = IndexingReader(source, codec) if codec is not None else None
+        # Seek indexes address offsets in one file, so volume sets do without
+        on_seek_index = None if is_volume_set(archive_path) else on_seek_index
+        # Stream mode reads headers as they come instead of a getmembers() pass
+        try:
+            with tarfile.open(fileobj=reader or source, mode='r|') as tar_ref:
+                for member in tar_ref:
+                    yield member.name, member.size, float(member.mtime), member.isdir(), member.offset
+                    # TarFile keeps every member it has read; drop them as we go
+                    tar_ref.members = []
+            if on_seek_index and codec == 'xz':
+                # xz restart points are blocks, which only the file's own block index
+                # describes; without it the archive is read sequentially
+                try:
+                    on_seek_index(xz_seek_index(archive_path))
+                except (ValueError, IndexError):
+                    pass
+            elif on_seek_index and reader is not None:
+                on_seek_index(reader.finish())
+        finally:
+            (reader or source).close()
+
+    else:
+        raise ValueError(f"Unsupported archive type: {archive_path}")
+
+
+class MemberTable:
+    """Columnar member list: one name blob plus typed arrays instead of per-row objects"""
+
+    def __init__(self):
+        self._names = bytearray()
+        self._name_offsets = array('Q', [0])
+        self.sizes = array('Q')
+        self.mtimes = array('d')
+        self.offsets = array('Q')
+        self.is_dir = bytearray()
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def append(self, name, size, mtime, is_dir=False, offset=0):
+        self._names += name.encode('utf-8', 'surrogateescape')
+        self._name_offsets.append(len(self._names))
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        self.offsets.append(offset)
+        self.is_dir.append(1 if is_dir else 0)
+        return len(self.sizes) - 1
+
+    def name(self, index):
+        start, end = self._name_offsets[index], self._name_offsets[index + 1]
+        return self._names[start:end].decode('utf-8', 'surrogateescape')
+
+    def names(self):
+        for index in range(len(self)):
+            yield self.name(index)
+
+    @property
+    def total_size(self):
+        return sum(self.sizes)
+
+    def to_columns(self):
+        """Raw column bytes, for storing the table without per-row encoding"""
+        return {
+            'names': bytes(self._names),
+            'name_offsets': self._name_offsets.tobytes(),
+            'sizes': self.sizes.tobytes(),
+            'mtimes': self.mtimes.tobytes(),
+            'offsets': self.offsets.tobytes(),
+            'is_dir': bytes(self.is_dir),
+        }
+
+    @classmethod
+    def from_columns(cls, columns):
+        table = cls()
+        table._names = bytearray(columns['names'])
+        table._name_offsets = array('Q')
+        table._name_offsets.frombytes(columns['name_offsets'])
+        table.sizes.frombytes(columns['sizes'])
+        table.mtimes.frombytes(columns['mtimes'])
+        table.offsets.frombytes(columns['offsets'])
+        table.is_dir = bytearray(columns['is_dir'])
+        return table
+
+
+class ArchiveListing:
+    """MemberTable plus a directory index, filled incrementally by a background reader
+
+    Each directory keeps its children in arrival order in one array: a
+    value >= 0 is a member index, a negative value v is subdirectory ~v.
+    """
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self.table = MemberTable()
+        self.dir_paths = ['']
+        self.dir_ids = {'': 0}
+        self.dir_members = [None]  # member index of an explicit directory entry
+        self.children = [array('l')]
+        self.done = False
+        self.cancelled = False
+        self.error = None
+        self.seek_index = None  # tar_seek.SeekIndex for compressed tars
+        self._dirty = set()
+        self._lock = Lock()
+
+    def _dir_id(self, path):
+        dir_id = self.dir_ids.get(path)
+        if dir_id is not None:
+            return dir_id
+        parent, _, _ = path.rpartition('/')
+        parent_id = self._dir_id(parent)
+        dir_id = len(self.dir_paths)
+        self.dir_paths.append(path)
+        self.dir_ids[path] = dir_id
+        self.dir_members.append(None)
+        self.children.append(array('l'))
+        self.children[parent_id].append(~dir_id)
+        self._dirty.add(parent_id)
+        return dir_id
+
+    def _index_member(self, index, name, is_dir):
+        path = name.replace('\\', '/').strip('/')
+        if is_dir:
+            self.dir_members[self._dir_id(path)] = index
+        else:
+            parent_id = self._dir_id(path.rpartition('/')[0])
+            self.children[parent_id].append(index)
+            self._dirty.add(parent_id)
+
+    def add(self, name, size, mtime, is_dir=False, offset=0):
+        with self._lock:
+            index = self.table.append(name, size, mtime, is_dir, offset)
+            self._index_member(index, name, is_dir)
+            return index
+
+    def load_table(self, table):
+        """Index a complete MemberTable, e.g. one restored from the index cache"""
+        with self._lock:
+            self.table = table
+            for index in range(len(table)):
+                self._index_member(index, table.name(index), table.is_dir[index])
+        self.done = True
+
+    def take_dirty(self):
+        """Return and reset the ids of directories that gained children"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            return dirty
+
+    def entries(self, dir_id, start=0, stop=None):
+        with self._lock:
+            return self.children[dir_id][start:stop]
+
+    def child_count(self, dir_id):
+        with self._lock:
+            return len(self.children[dir_id])
+
+    def dir_name(self, dir_id):
+        return self.dir_paths[dir_id].rpartition('/')[2]
+
+    def member_indices_under(self, dir_id):
+        """Indices of every member below a directory, including the directory entry itself"""
+        indices = []
+        stack = [dir_id]
+        with self._lock:
+            while stack:
+                current = stack.pop()
+                if self.dir_members[current] is not None:
+                    indices.append(self.dir_members[current])
+                for entry in self.children[current]:
+                    if entry < 0:
+                        stack.append(~entry)
+                    else:
+                        indices.append(entry)
+        return indices
+
+
+def stream_listing(listing, on_chunk=None, chunk_size=5000):
+    """Fill an ArchiveListing from its archive, calling on_chunk() every chunk_size members
+
+    Meant to run on a background thread; on_chunk() is also called once at
+    the end, after listing.done is set.
+    """
+    try:
+        def on_seek_index(seek_index):
+            listing.seek_index = seek_index
+
+        for count, member in enumerate(iter_members(listing.archive_path, on_seek_index), 1):
+            if listing.cancelled:
+                return
+            listing.add(*member)
+            if on_chunk and count % chunk_size == 0:
+                on_chunk()
+    except Exception as e:
+        listing.error = e
+    listing.done = True
+    if on_chunk and not listing.cancelled:
+        on_chunk()
@@ -0,0 +1,265 @@
+import os
+import time
+import zipfile
+import tarfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import py7zr
+import rarfile
+from tar_seek import CHUNK_SIZE, IndexingReader, SeekIndex, check_segment, tar_codec
+from volume_set import archive_size, logical_name, open_archive_file
+
+# Compressed bytes per ZIP verification task, bounded so every worker gets several tasks
+MIN_GROUP_BYTES = 1024 * 1024
+MAX_GROUP_BYTES = 64 * 1024 * 1024
+GROUP_MEMBERS = 512
+
+
+class MemberResult:
+    """Outcome of verifying a single archive member"""
+
+    def __init__(self, name, size, error=None):
+        self.name = name
+        self.size = size
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class VerifyReport:
+    """Per-member results and throughput of an archive integrity test"""
+
+    def __init__(self, archive, members, wall_time, error=None):
+        self.archive = archive
+        self.members = members
+        self.wall_time = wall_time
+        self.error = error  # archive-level failure, e.g. truncation
+
+    @property
+    def failed(self):
+        return [m for m in self.members if not m.ok]
+
+    @property
+    def ok(self):
+        return self.error is None and not self.failed
+
+    @property
+    def total_bytes(self):
+        return sum(m.size for m in self.members)
+
+    @property
+    def mb_per_sec(self):
+        """Uncompressed member data verified per wall-clock second"""
+        if self.wall_time <= 0:
+            return 0.0
+        return self.total_bytes / (1024 * 1024) / self.wall_time
+
+    def __str__(self):
+        return (f"{len(self.members) - len(self.failed)}/{len(self.members)} members OK, "
+                f"{self.total_bytes / (1024 * 1024):.1f} MB in {self.wall_time:.1f}s "
+                f"({self.mb_per_sec:.1f} MB/s)")
+
+
+def _read_fully(fileobj):
+    while fileobj.read(CHUNK_SIZE):
+        pass
+
+
+def _group_zip_members(infos, workers):
+    """Split members, in file order, into groups of roughly equal compressed size"""
+    infos = sorted(infos, key=lambda info: info.header_offset)
+    total = sum(info.compress_size for info in infos)
+    group_bytes = min(MAX_GROUP_BYTES, max(MIN_GROUP_BYTES, total // (workers * 4)))
+    group = []
+    size = 0
+    for info in infos:
+        group.append(info.filename)
+        size += info.compress_size
+        if size >= group_bytes or len(group) >= GROUP_MEMBERS:
+            yield group, size
+            group = []
+            size = 0
+    if group:
+        yield group, size
+
+
+def _verify_zip_group(archive, names, password):
+    """Read each member to the end; zipfile checks the CRC when the data runs out"""
+    results = []
+    with open_archive_file(archive) as f, zipfile.ZipFile(f, 'r') as zip_ref:
+        for name in names:
+            info = zip_ref.getinfo(name)
+            try:
+                if not info.is_dir():
+                    with zip_ref.open(info, pwd=password.encode() if password else None) as member:
+                        _read_fully(member)
+                results.append(MemberResult(name, info.file_size))
+            except Exception as e:
+                results.append(MemberResult(name, info.file_size, str(e)))
+    return results
+
+
+def verify_zip(archive, password=None, workers=None, on_progress=None):
+    workers = max(1, workers or os.cpu_count() or 1)
+    with open_archive_file(archive) as f, zipfile.ZipFile(f, 'r') as zip_ref:
+        infos = zip_ref.infolist()
+    groups = list(_group_zip_members(infos, workers))
+    total = sum(size for _, size in groups)
+    done = 0
+    members = []
+    with ProcessPoolExecutor(max_workers=min(workers, max(1, len(groups)))) as pool:
+        futures = {pool.submit(_verify_zip_group, archive, names, password): size for names, size in groups}
+        for future in as_completed(futures):
+            members.extend(future.result())
+            done += futures[future]
+            if on_progress:
+                on_progress(done, total)
+    return members, None
+
+
+def _check_segments(archive, index_data, segments):
+    index = SeekIndex.from_bytes(index_data)
+    with open(archive, 'rb') as f:
+        return [(segment, check_segment(f, index, segment)) for segment in segments]
+
+
+def verify_tar_segments(archive, table, seek_index, workers=None, on_progress=None):
+    """Decode the independent segments of a compressed tar in parallel
+
+    Each member is judged by the segments its header and data span, using
+    the header offsets from a previous listing of the same file.
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    index_data = seek_index.to_bytes()
+    count = len(seek_index)
+    per_task = max(1, count // (workers * 4))
+    errors = {}
+    total = sum(seek_index.csizes)
+    done = 0
+    with ProcessPoolExecutor(max_workers=min(workers, count)) as pool:
+        futures = {
+            pool.submit(_check_segments, archive, index_data, range(start, min(count, start + per_task))):
+                sum(seek_index.csizes[start:start + per_task])
+            for start in range(0, count, per_task)
+        }
+        for future in as_completed(futures):
+            for segment, error in future.result():
+                if error:
+                    errors[segment] = error
+            done += futures[future]
+            if on_progress:
+                on_progress(done, total)
+
+    order = sorted(range(len(table)), key=lambda i: table.offsets[i])
+    members = []
+    for position, i in enumerate(order):
+        start = table.offsets[i]
+        end = table.offsets[order[position + 1]] if position + 1 < len(order) else seek_index.size
+        first, _, _, _ = seek_index.restart_point(start)
+        last, _, _, _ = seek_index.restart_point(max(start, end - 1))
+        error = next((errors[s] for s in range(first, last + 1) if s in errors), None)
+        members.append(MemberResult(table.name(i), table.sizes[i], error))
+    return members, None
+
+
+def verify_tar(archive, on_progress=None):
+    """Stream-decode a whole tar, reading every member's data"""
+    codec = tar_codec(logical_name(archive))
+    total = archive_size(archive)
+    members = []
+    source = open_archive_file(archive)
+    with source if codec is None else IndexingReader(source, codec) as source:
+        try:
+            with tarfile.open(fileobj=source, mode='r|') as tar_ref:
+                for member in tar_ref:
+                    try:
+                        if member.isfile():
+                            _read_fully(tar_ref.extractfile(member))
+                        members.append(MemberResult(member.name, member.size))
+                    except Exception as e:
+                        # The stream cannot resync after a bad member
+                        members.append(MemberResult(member.name, member.size, str(e)))
+                        return members, f"Stopped at {member.name}"
+                    tar_ref.members = []
+                    if on_progress:
+                        on_progress(source.compressed_offset if codec else source.tell(), total)
+                end = tar_ref.offset
+            if codec is not None:
+                # Drains the padding and raises if the compressed stream is cut short
+                source.finish()
+            else:
+                source.seek(end)
+                if source.read(tarfile.BLOCKSIZE) != tarfile.NUL * tarfile.BLOCKSIZE:
+                    return members, "Missing end-of-archive marker; the archive may be truncated"
+        except Exception as e:
+            return members, str(e)
+    if on_progress:
+        on_progress(total, total)
+    return members, None
+
+
+def verify_7z(archive, password=None):
+    """py7zr decodes solid blocks sequentially; testzip() names the first bad member"""
+    with open_archive_file(archive) as f, py7zr.SevenZipFile(f, 'r', password=password) as sevenz_ref:
+        infos = [info for info in sevenz_ref.list()]
+        bad = sevenz_ref.testzip()
+    members = [MemberResult(info.filename, info.uncompressed or 0,
+                            "CRC mismatch" if info.filename == bad else None) for info in infos]
+    return members, None
+
+
+def _verify_rar_member(archive, info, password):
+    try:
+        with rarfile.RarFile(archive, 'r') as rar_ref:
+            with rar_ref.open(info, pwd=password) as member:
+                _read_fully(member)
+        return MemberResult(info.filename, info.file_size)
+    except Exception as e:
+        return MemberResult(info.filename, info.file_size, str(e))
+
+
+def verify_rar(archive, password=None, workers=None, on_progress=None):
+    """Members are read through the unrar helper, so threads are enough to run them side by side"""
+    workers = max(1, workers or os.cpu_count() or 1)
+    with rarfile.RarFile(archive, 'r') as rar_ref:
+        infos = [info for info in rar_ref.infolist() if not info.is_dir()]
+    total = sum(info.compress_size for info in infos)
+    done = 0
+    members = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_verify_rar_member, archive, info, password): info.compress_size for info in infos}
+        for future in as_completed(futures):
+            members.append(future.result())
+            done += futures[future]
+            if on_progress:
+                on_progress(done, total)
+    return members, None
+
+
+def verify_archive(archive, password=None, workers=None, table=None, seek_index=None, on_progress=None):
+    """Test every member of an archive and return a VerifyReport
+
+    table and seek_index come from a finished listing of the same file;
+    with them, compressed tars are verified segment-parallel. on_progress
+    (done, total) is called in the calling thread with byte counts.
+    """
+    lower = logical_name(archive).lower()
+    start = time.perf_counter()
+    try:
+        if lower.endswith('.zip'):
+            members, error = verify_zip(archive, password, workers, on_progress)
+        elif lower.endswith('.rar'):
+            members, error = verify_rar(archive, password, workers, on_progress)
+        elif lower.endswith(('.7z', '.7zip')):
+            members, error = verify_7z(archive, password)
+        elif lower.endswith(('.tar', '.tar.gz', '.tar.bz2', '.tar.xz')):
+            if table is not None and len(table) and seek_index is not None and len(seek_index) > 1:
+                members, error = verify_tar_segments(archive, table, seek_index, workers, on_progress)
+            else:
+                members, error = verify_tar(archive, on_progress)
+        else:
+            raise ValueError(f"Unsupported archive type: {archive}")
+    except Exception as e:
+        members, error = [], str(e)
+    return VerifyReport(archive, members, time.perf_counter() - start, error)
@@ -0,0 +1,176 @@
+import os
+import time
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from PIL import Image
+from image_preview import reduce_decode
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tif', '.tiff', '.webp')
+CHUNK_SIZE = 1024 * 1024
+
+
+def find_images(source_dir, exclude_dir=None):
+    """Return every image file below source_dir, skipping exclude_dir (e.g. an output dir inside it)"""
+    exclude_dir = os.path.abspath(exclude_dir) if exclude_dir else None
+    images = []
+    for root, dirs, files in os.walk(source_dir):
+        if exclude_dir:
+            dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != exclude_dir]
+        for file in files:
+            if file.lower().endswith(IMAGE_EXTENSIONS):
+                images.append(os.path.join(root, file))
+    return images
+
+
+def file_hash(path):
+    """Content hash used to tell an edited source from a touched one"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def output_path_for(img_path, output_dir, output_format):
+    base = os.path.splitext(os.path.basename(img_path))[0]
+    return os.path.join(output_dir, f"{base}.{output_format}")
+
+
+def save_image(img, output_path, output_format, quality):
+    """Save an opened image in output_format with the app's per-format settings"""
+    # Convert to RGB if saving as JPEG
+    if output_format in ['jpg', 'jpeg'] and img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    if output_format in ['jpg', 'jpeg']:
+        img.save(output_path, 'JPEG', quality=quality)
+    elif output_format == 'png':
+        img.save(output_path, 'PNG', compress_level=9 - (quality // 12))
+    elif output_format == 'bmp':
+        img.save(output_path, 'BMP')
+    elif output_format == 'gif':
+        img.save(output_path, 'GIF')
+    elif output_format == 'tiff':
+        img.save(output_path, 'TIFF', compression='tiff_lzw')
+    elif output_format == 'webp':
+        img.save(output_path, 'WEBP', quality=quality)
+    else:
+        raise ValueError(f"Unsupported image format: {output_format}")
+
+
+class ImageResult:
+    """Timing and outcome of converting a single image"""
+
+    def __init__(self, source, output_path):
+        self.source = source
+        self.output_path = output_path
+        self.input_size = 0
+        self.output_size = 0
+        self.decode_time = 0.0
+        self.encode_time = 0.0
+        self.content_hash = None
+        self.error = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def elapsed(self):
+        return self.decode_time + self.encode_time
+
+
+class ImageConvertReport:
+    """Summary of an image conversion run"""
+
+    def __init__(self, results, wall_time):
+        self.results = results
+        self.wall_time = wall_time
+
+    @property
+    def failed(self):
+        return [r for r in self.results if not r.ok]
+
+    @property
+    def converted(self):
+        return [r for r in self.results if r.ok]
+
+    @property
+    def images_per_sec(self):
+        if self.wall_time <= 0:
+            return 0.0
+        return len(self.converted) / self.wall_time
+
+    @property
+    def input_bytes(self):
+        return sum(r.input_size for r in self.converted)
+
+    @property
+    def output_bytes(self):
+        return sum(r.output_size for r in self.converted)
+
+    def __str__(self):
+        return (f"{len(self.converted)}/{len(self.results)} images converted in {self.wall_time:.1f}s "
+                f"({self.images_per_sec:.1f} images/s, "
+                f"{self.input_bytes / (1024 * 1024):.1f} MB -> {self.output_bytes / (1024 * 1024):.1f} MB)")
+
+
+def convert_image(source, output_path, output_format, quality, max_dimension=None, hash_source=False):
+    """Decode, convert and save one image; runs in a worker process
+
+    With max_dimension the image is shrunk to fit a max_dimension square,
+    decoding at reduced resolution where the format allows. hash_source
+    also fills in result.content_hash.
+    """
+    result = ImageResult(source, output_path)
+    try:
+        result.input_size = os.path.getsize(source)
+        if hash_source:
+            result.content_hash = file_hash(source)
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        start = time.perf_counter()
+        with Image.open(source) as img:
+            if max_dimension:
+                box = (max_dimension, max_dimension)
+                reduce_decode(img, box)
+                img.thumbnail(box)
+            img.load()
+            result.decode_time = time.perf_counter() - start
+            start = time.perf_counter()
+            save_image(img, output_path, output_format, quality)
+            result.encode_time = time.perf_counter() - start
+        result.output_size = os.path.getsize(output_path)
+    except Exception as e:
+        result.error = str(e)
+    return result
+
+
+def convert_batch(jobs, output_format, quality, workers=None, on_result=None, max_dimension=None,
+                  hash_sources=False):
+    """Convert (source, output_path) pairs on a process pool
+
+    At most two images per worker are in flight, so memory stays flat no
+    matter how many jobs there are. on_result(result, done, total) is called
+    in the calling thread as each image finishes. Returns an
+    ImageConvertReport.
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    jobs = deque(jobs)
+    total = len(jobs)
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=min(workers, max(1, total))) as pool:
+        pending = set()
+        while jobs or pending:
+            while jobs and len(pending) < workers * 2:
+                source, output_path = jobs.popleft()
+                pending.add(pool.submit(convert_image, source, output_path, output_format, quality,
+                                        max_dimension, hash_sources))
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results.append(result)
+                if on_result:
+                    on_result(result, len(results), total)
+    return ImageConvertReport(results, time.perf_counter() - start)
@@ -0,0 +1,133 @@
+import os
+import sqlite3
+from contextlib import closing
+from image_batch import file_hash
+
+MANIFEST_NAME = '.image_manifest.sqlite3'
+SCHEMA_VERSION = 1
+# Rows written per transaction while a batch is still running
+RECORD_BATCH = 500
+
+
+def conversion_params(output_format, quality, max_dimension=None):
+    """Everything besides the source that decides what the output looks like"""
+    return f"{output_format}:q{quality}:max{max_dimension or 0}"
+
+
+class ManifestEntry:
+    """What a previous run converted: source identity, content hash, parameters and output"""
+
+    def __init__(self, source, size, mtime_ns, content_hash, params, output_path):
+        self.source = source
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.content_hash = content_hash
+        self.params = params
+        self.output_path = output_path
+
+    def row(self):
+        return (self.source, self.size, self.mtime_ns, self.content_hash, self.params, self.output_path)
+
+
+class ImageManifest:
+    """SQLite record of converted images, stored in the output directory"""
+
+    def __init__(self, output_dir):
+        self.db_path = os.path.join(output_dir, MANIFEST_NAME)
+        os.makedirs(output_dir, exist_ok=True)
+        with closing(sqlite3.connect(self.db_path)) as conn, conn:
+            if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                conn.execute('DROP TABLE IF EXISTS images')
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS images (
+                    source TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    output_path TEXT NOT NULL
+                )
+            ''')
+
+    def load(self):
+        """Return {source: ManifestEntry} in one query"""
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            return {row[0]: ManifestEntry(*row) for row in conn.execute('SELECT * FROM images')}
+
+    def record(self, entries):
+        with closing(sqlite3.connect(self.db_path)) as conn, conn:
+            conn.executemany('INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?)',
+                             [entry.row() for entry in entries])
+
+    def forget(self, sources):
+        with closing(sqlite3.connect(self.db_path)) as conn, conn:
+            conn.executemany('DELETE FROM images WHERE source = ?', [(source,) for source in sources])
+
+
+class IncrementalPlan:
+    """Work left for an incremental run"""
+
+    def __init__(self):
+        self.jobs = []  # (source, output_path) to convert
+        self.stats = {}  # source -> (size, mtime_ns) seen while planning
+        self.skipped = 0
+        self.refreshed = []  # ManifestEntry whose mtime changed but content did not
+        self.deleted = []  # ManifestEntry whose source is gone
+        self.outputs = set()  # outputs of the sources that still exist
+
+
+def plan_incremental(images, source_dir, output_paths, params, manifest_entries):
+    """Split images into jobs and skips against a loaded manifest
+
+    Unchanged sources cost one stat and one output existence check; only
+    sources whose mtime moved while the size stayed put get hashed, to tell
+    a touch from an edit. output_paths maps each source to its output.
+    """
+    plan = IncrementalPlan()
+    remaining = dict(manifest_entries)
+    for source, output_path in zip(images, output_paths):
+        source = os.path.abspath(source)
+        plan.outputs.add(output_path)
+        st = os.stat(source)
+        plan.stats[source] = (st.st_size, st.st_mtime_ns)
+        entry = remaining.pop(source, None)
+        if (entry is not None and entry.params == params and entry.output_path == output_path
+                and entry.size == st.st_size and os.path.exists(output_path)):
+            if entry.mtime_ns == st.st_mtime_ns:
+                plan.skipped += 1
+                continue
+            if file_hash(source) == entry.content_hash:
+                entry.mtime_ns = st.st_mtime_ns
+                plan.refreshed.append(entry)
+                plan.skipped += 1
+                continue
+        plan.jobs.append((source, output_path))
+
+    root = os.path.join(os.path.abspath(source_dir), '')
+    plan.deleted = [entry for source, entry in remaining.items() if source.startswith(root)]
+    return plan
+
+
+def entry_for(plan, result, params):
+    """Manifest entry for a successful conversion, using the stat taken while planning"""
+    size, mtime_ns = plan.stats[result.source]
+    return ManifestEntry(result.source, size, mtime_ns, result.content_hash, params, result.output_path)
+
+
+def remove_deleted(manifest, entries, keep=()):
+    """Delete the outputs of sources that no longer exist and drop them from the manifest
+
+    Outputs in keep are left alone; another source now writes to them.
+    """
+    removed = 0
+    for entry in entries:
+        if entry.output_path in keep:
+            continue
+        try:
+            os.remove(entry.output_path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    manifest.forget([entry.source for entry in entries])
+    return removed
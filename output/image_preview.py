@@ -0,0 +1,153 @@
+import io
+import os
+import struct
+from collections import OrderedDict
+from threading import Lock
+from PIL import Image
+
+PREVIEW_SIZE = (300, 300)
+# Decoded thumbnails kept in memory, by pixel bytes
+CACHE_BYTES = 64 * 1024 * 1024
+
+EXIF_THUMBNAIL_OFFSET = 0x0201
+EXIF_THUMBNAIL_LENGTH = 0x0202
+TIFF_NEW_SUBFILE_TYPE = 254
+
+
+def _same_aspect(a, b, tolerance=0.02):
+    return abs(a[0] * b[1] - a[1] * b[0]) <= tolerance * a[0] * b[1]
+
+
+def _covers(size, box):
+    """True if an image of size, shrunk to fit box, would not need upscaling"""
+    scale = min(box[0] / size[0], box[1] / size[1])
+    return scale <= 1
+
+
+def reduce_decode(img, box):
+    """Set up an opened, not yet loaded image to decode at the smallest resolution that still covers box
+
+    JPEG uses draft mode, which scales by 1/2, 1/4 or 1/8 inside the DCT.
+    Pyramidal TIFFs switch to the smallest reduced-resolution page that
+    is still big enough. Other formats decode at full size.
+    """
+    full = img.size
+    if img.format == 'JPEG':
+        scale = min(box[0] / full[0], box[1] / full[1])
+        if scale < 1:
+            img.draft(img.mode, (max(1, int(full[0] * scale)), max(1, int(full[1] * scale))))
+    elif img.format == 'TIFF' and getattr(img, 'n_frames', 1) > 1:
+        best = 0
+        best_size = full
+        for frame in range(1, img.n_frames):
+            img.seek(frame)
+            reduced = img.tag_v2.get(TIFF_NEW_SUBFILE_TYPE, 0) & 1
+            if (reduced and _same_aspect(img.size, full) and _covers(img.size, box)
+                    and img.size[0] < best_size[0]):
+                best, best_size = frame, img.size
+        img.seek(best)
+    return img
+
+
+def exif_thumbnail(img):
+    """Return the JPEG thumbnail embedded in the EXIF IFD1 as an opened image, or None
+
+    Parsed straight from the APP1 bytes, so nothing of the main image is decoded.
+    """
+    exif = img.info.get('exif')
+    if not exif:
+        return None
+    if exif.startswith(b'Exif\x00\x00'):
+        exif = exif[6:]
+    try:
+        endian = {b'II': '<', b'MM': '>'}[exif[:2]]
+        ifd0 = struct.unpack_from(endian + 'I', exif, 4)[0]
+        count = struct.unpack_from(endian + 'H', exif, ifd0)[0]
+        ifd1 = struct.unpack_from(endian + 'I', exif, ifd0 + 2 + count * 12)[0]
+        if not ifd1:
+            return None
+        tags = {}
+        count = struct.unpack_from(endian + 'H', exif, ifd1)[0]
+        for entry in range(count):
+            tag, kind, _, value = struct.unpack_from(endian + 'HHII', exif, ifd1 + 2 + entry * 12)
+            if kind == 3:  # SHORT values sit in the first two bytes of the field
+                value = struct.unpack_from(endian + 'H', exif, ifd1 + 2 + entry * 12 + 8)[0]
+            tags[tag] = value
+        offset, length = tags[EXIF_THUMBNAIL_OFFSET], tags[EXIF_THUMBNAIL_LENGTH]
+        data = exif[offset:offset + length]
+        if len(data) != length:
+            return None
+        thumb = Image.open(io.BytesIO(data))
+        thumb.load()
+        return thumb
+    except (KeyError, struct.error, OSError, SyntaxError):
+        return None
+
+
+def make_thumbnail(path, box=PREVIEW_SIZE):
+    """Decode path at reduced size and return an image that fits in box"""
+    with Image.open(path) as img:
+        thumb = exif_thumbnail(img)
+        # Only trust the embedded thumbnail when it is big enough and not letterboxed
+        if thumb is not None and _same_aspect(thumb.size, img.size) and _covers(thumb.size, box):
+            thumb.thumbnail(box)
+            return thumb
+        reduce_decode(img, box)
+        img.thumbnail(box)
+        img.load()
+        return img.copy()
+
+
+class ThumbnailCache:
+    """Thread-safe LRU of decoded thumbnails, bounded by pixel bytes"""
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def key(path, box):
+        st = os.stat(path)
+        return os.path.abspath(path), st.st_size, st.st_mtime_ns, tuple(box)
+
+    @staticmethod
+    def _cost(img):
+        return img.size[0] * img.size[1] * len(img.getbands())
+
+    def get(self, key):
+        with self._lock:
+            img = self._entries.get(key)
+            if img is not None:
+                self._entries.move_to_end(key)
+            return img
+
+    def put(self, key, img):
+        cost = self._cost(img)
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= self._cost(old)
+            self._entries[key] = img
+            self.bytes += cost
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= self._cost(evicted)
+
+
+class PreviewService:
+    """Thumbnails for the preview pane, decoded at reduced size and cached"""
+
+    def __init__(self, cache=None):
+        self.cache = cache or ThumbnailCache()
+
+    def thumbnail(self, path, box=PREVIEW_SIZE):
+        key = ThumbnailCache.key(path, box)
+        img = self.cache.get(key)
+        if img is None:
+            img = make_thumbnail(path, box)
+            self.cache.put(key, img)
+        return img
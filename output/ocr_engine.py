@@ -0,0 +1,366 @@
+import os
+import re
+import time
+import sqlite3
+import tempfile
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from PIL import Image, ImageOps
+import pytesseract
+from pdf2image import convert_from_path, pdfinfo_from_path
+from image_batch import file_hash
+
+# Deskew search range and step, in degrees
+DESKEW_RANGE = 5.0
+DESKEW_STEP = 0.5
+# Longest side of the copy the skew angle is estimated on
+DESKEW_PREVIEW = 800
+SCHEMA_VERSION = 1
+# New cache rows written per transaction
+CACHE_BATCH = 100
+# PDF pages rasterized per task; bounds each worker's bitmaps on disk, one page in memory
+PDF_WINDOW = 4
+# pdftoppm names its output <prefix>-<page>.png, the page zero-padded to the width of the last one
+PAGE_FILE_PATTERN = re.compile(r'-(\d+)\.png$')
+
+
+def default_cache_path():
+    """SQLite file next to the archive index in the per-user settings folder"""
+    return os.path.join(os.path.expanduser('~'), '.archive_manager', 'ocr_cache.sqlite3')
+
+
+def otsu_threshold(gray):
+    """Otsu's threshold from the histogram of an L-mode image"""
+    histogram = gray.histogram()[:256]
+    total = sum(histogram)
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_back = 0
+    weight_back = 0
+    best, threshold = -1.0, 127
+    for i, count in enumerate(histogram):
+        weight_back += count
+        if not weight_back:
+            continue
+        weight_fore = total - weight_back
+        if not weight_fore:
+            break
+        sum_back += i * count
+        mean_back = sum_back / weight_back
+        mean_fore = (sum_all - sum_back) / weight_fore
+        between = weight_back * weight_fore * (mean_back - mean_fore) ** 2
+        if between > best:
+            best, threshold = between, i
+    return threshold
+
+
+def estimate_skew(binary):
+    """Angle (degrees) that makes text rows most distinct, by projection-profile variance"""
+    preview = binary.copy()
+    preview.thumbnail((DESKEW_PREVIEW, DESKEW_PREVIEW))
+    # Ink as white on black, so rotation fills the corners with "no ink"
+    preview = ImageOps.invert(preview.convert('L'))
+    best_angle, best_score = 0.0, -1.0
+    steps = int(DESKEW_RANGE / DESKEW_STEP)
+    for step in range(-steps, steps + 1):
+        angle = step * DESKEW_STEP
+        rotated = preview.rotate(angle, resample=Image.NEAREST, expand=True)
+        # Squeezing to one column averages every row
+        rows = list(rotated.resize((1, rotated.height), Image.BOX).getdata())
+        mean = sum(rows) / len(rows)
+        score = sum((value - mean) ** 2 for value in rows)
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def preprocess(img):
+    """Grayscale, binarize (Otsu) and deskew an image for tesseract"""
+    img = ImageOps.exif_transpose(img)
+    gray = ImageOps.autocontrast(img.convert('L'))
+    threshold = otsu_threshold(gray)
+    binary = gray.point(lambda value: 255 if value > threshold else 0, mode='1')
+    angle = estimate_skew(binary)
+    if angle:
+        binary = binary.convert('L').rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    return binary
+
+
+class OCRResult:
+    """Text and timing for one image or page"""
+
+    def __init__(self, source, page=None):
+        self.source = source
+        self.page = page
+        self.text = ''
+        self.content_hash = None
+        self.elapsed = 0.0
+        self.cached = False
+        self.error = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def label(self):
+        name = os.path.basename(self.source)
+        return f"{name} page {self.page}" if self.page is not None else name
+
+
+class OCRReport:
+    """Summary of an OCR run"""
+
+    def __init__(self, results, wall_time):
+        self.results = results
+        self.wall_time = wall_time
+
+    @property
+    def failed(self):
+        return [r for r in self.results if not r.ok]
+
+    @property
+    def cached(self):
+        return [r for r in self.results if r.cached]
+
+    @property
+    def pages_per_sec(self):
+        if self.wall_time <= 0:
+            return 0.0
+        return len(self.results) / self.wall_time
+
+    def __str__(self):
+        return (f"{len(self.results) - len(self.failed)}/{len(self.results)} pages recognized "
+                f"({len(self.cached)} from cache) in {self.wall_time:.1f}s ({self.pages_per_sec:.2f} pages/s)")
+
+
+class OCRCache:
+    """Recognized text keyed by image content hash, language, tesseract config and preprocessing"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or default_cache_path()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                conn.execute('DROP TABLE IF EXISTS ocr')
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ocr (
+                    key TEXT PRIMARY KEY,
+                    text TEXT NOT NULL
+                )
+            ''')
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    @staticmethod
+    def key(content_hash, lang, config, preprocessed):
+        return f"{content_hash}|{lang}|{config}|{int(bool(preprocessed))}"
+
+    def get(self, key):
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT text FROM ocr WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, items):
+        with closing(self._connect()) as conn, conn:
+            conn.executemany('INSERT OR REPLACE INTO ocr VALUES (?, ?)', items)
+
+
+def _init_worker(omp_threads):
+    # Inherited by the tesseract processes this worker starts
+    os.environ['OMP_THREAD_LIMIT'] = str(omp_threads)
+
+
+def recognize(img, lang='eng', config='', do_preprocess=True):
+    if do_preprocess:
+        img = preprocess(img)
+    return pytesseract.image_to_string(img, lang=lang, config=config)
+
+
+def ocr_image(source, lang, config, do_preprocess, cache_path):
+    """OCR one image file, answering from the cache when possible; runs in a worker process"""
+    result = OCRResult(source)
+    start = time.perf_counter()
+    try:
+        result.content_hash = file_hash(source)
+        if cache_path:
+            text = OCRCache(cache_path).get(OCRCache.key(result.content_hash, lang, config, do_preprocess))
+            if text is not None:
+                result.text, result.cached = text, True
+        if not result.cached:
+            with Image.open(source) as img:
+                result.text = recognize(img, lang, config, do_preprocess)
+    except Exception as e:
+        result.error = str(e)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def ocr_pool(workers=None):
+    """Process pool of OCR workers, with tesseract's OpenMP threads split between them"""
+    cores = os.cpu_count() or 1
+    workers = max(1, workers or cores)
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=(max(1, cores // workers),)), workers
+
+
+def run_ordered(pool, func, items, window, on_result):
+    """Submit func(*item) for each item, delivering results to on_result in item order
+
+    At most window items past the oldest unfinished one are submitted, so
+    a slow item holds back at most window finished results.
+    """
+    items = list(items)
+    futures = {}
+    finished = {}
+    submitted = 0
+    delivered = 0
+    while delivered < len(items):
+        while submitted < len(items) and submitted < delivered + window:
+            futures[pool.submit(func, *items[submitted])] = submitted
+            submitted += 1
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done:
+            finished[futures.pop(future)] = future.result()
+        while delivered in finished:
+            on_result(finished.pop(delivered))
+            delivered += 1
+
+
+def ocr_images(image_paths, on_result=None, workers=None, lang='eng', config='', do_preprocess=True, cache=None):
+    """OCR images in parallel; on_result(result, done, total) is called in input order in the calling thread
+
+    Returns an OCRReport. New text is added to cache (an OCRCache) as it arrives.
+    """
+    start = time.perf_counter()
+    results = []
+    new_text = []
+    cache_path = cache.db_path if cache is not None else None
+
+    def deliver(result):
+        results.append(result)
+        if cache is not None and result.ok and not result.cached:
+            new_text.append((OCRCache.key(result.content_hash, lang, config, do_preprocess), result.text))
+            if len(new_text) >= CACHE_BATCH:
+                cache.put_many(new_text)
+                new_text.clear()
+        if on_result:
+            on_result(result, len(results), len(image_paths))
+
+    pool, workers = ocr_pool(workers)
+    with pool:
+        run_ordered(pool, ocr_image, [(path, lang, config, do_preprocess, cache_path) for path in image_paths],
+                    workers * 4, deliver)
+
+    if new_text:
+        cache.put_many(new_text)
+    return OCRReport(results, time.perf_counter() - start)
+
+
+def _page_hash(pdf_hash, page, dpi):
+    return f"{pdf_hash}:p{page}:dpi{dpi}"
+
+
+def _page_runs(pages):
+    """Split sorted page numbers into [first, last] runs of consecutive pages"""
+    runs = []
+    for page in pages:
+        if runs and runs[-1][1] == page - 1:
+            runs[-1][1] = page
+        else:
+            runs.append([page, page])
+    return runs
+
+
+def ocr_pdf_window(pdf_path, first_page, last_page, dpi, lang, config, do_preprocess, pdf_hash, cache_path):
+    """Rasterize and OCR a range of PDF pages; runs in a worker process
+
+    pdftoppm writes the pages to a temporary folder and they are opened one
+    at a time, so a worker never holds more than one page bitmap. Only the
+    pages missing from the cache are rasterized, one pdftoppm run per
+    stretch of consecutive pages.
+    """
+    results = {}
+    cache = OCRCache(cache_path) if cache_path else None
+    for page in range(first_page, last_page + 1):
+        result = OCRResult(pdf_path, page)
+        result.content_hash = _page_hash(pdf_hash, page, dpi)
+        if cache is not None:
+            text = cache.get(OCRCache.key(result.content_hash, lang, config, do_preprocess))
+            if text is not None:
+                result.text, result.cached = text, True
+        results[page] = result
+
+    missing = [page for page, result in results.items() if not result.cached]
+    if missing:
+        start = time.perf_counter()
+        for run_first, run_last in _page_runs(missing):
+            with tempfile.TemporaryDirectory() as folder:
+                try:
+                    paths = convert_from_path(pdf_path, dpi=dpi, first_page=run_first, last_page=run_last,
+                                              output_folder=folder, paths_only=True, grayscale=True, fmt='png')
+                except Exception as e:
+                    paths = []
+                    for page in range(run_first, run_last + 1):
+                        results[page].error = str(e)
+                seen = set()
+                for path in paths:
+                    match = PAGE_FILE_PATTERN.search(os.path.basename(path))
+                    page = int(match.group(1)) if match else None
+                    if page not in results or results[page].cached:
+                        continue
+                    seen.add(page)
+                    result = results[page]
+                    try:
+                        with Image.open(path) as img:
+                            result.text = recognize(img, lang, config, do_preprocess)
+                    except Exception as e:
+                        result.error = str(e)
+                if paths:
+                    for page in range(run_first, run_last + 1):
+                        if page not in seen:
+                            results[page].error = "pdftoppm produced no image for this page"
+        elapsed = (time.perf_counter() - start) / len(missing)
+        for page in missing:
+            results[page].elapsed = elapsed
+    return [results[page] for page in range(first_page, last_page + 1)]
+
+
+def ocr_pdf(pdf_path, on_result=None, workers=None, dpi=300, lang='eng', config='', do_preprocess=True,
+            cache=None, window=PDF_WINDOW):
+    """OCR a PDF page by page, rasterizing small page windows in parallel workers
+
+    on_result(result, done, total) is called once per page, in page order,
+    in the calling thread. Peak memory does not depend on the page count.
+    Returns an OCRReport.
+    """
+    start = time.perf_counter()
+    total = int(pdfinfo_from_path(pdf_path)['Pages'])
+    pdf_hash = file_hash(pdf_path)
+    cache_path = cache.db_path if cache is not None else None
+    results = []
+    new_text = []
+
+    def deliver(window_results):
+        for result in window_results:
+            results.append(result)
+            if cache is not None and result.ok and not result.cached:
+                new_text.append((OCRCache.key(result.content_hash, lang, config, do_preprocess), result.text))
+            if on_result:
+                on_result(result, len(results), total)
+        if len(new_text) >= CACHE_BATCH:
+            cache.put_many(new_text)
+            new_text.clear()
+
+    windows = [(pdf_path, first, min(total, first + window - 1), dpi, lang, config, do_preprocess, pdf_hash, cache_path)
+               for first in range(1, total + 1, window)]
+    pool, workers = ocr_pool(workers)
+    with pool:
+        run_ordered(pool, ocr_pdf_window, windows, workers * 2, deliver)
+
+    if new_text:
+        cache.put_many(new_text)
+    return OCRReport(results, time.perf_counter() - start)
@@ -0,0 +1,112 @@
+import os
+import hashlib
+import sqlite3
+from contextlib import closing
+
+LAYOUTS = ('mirror', 'sharded', 'flat')
+LAYOUT_MANIFEST_NAME = '.output_layout.sqlite3'
+SCHEMA_VERSION = 1
+# Two levels of 256 directories keep each one small even with millions of outputs
+SHARD_LEVELS = 2
+
+
+def _split_name(path):
+    name = os.path.basename(path)
+    stem, ext = os.path.splitext(name)
+    return stem, ext
+
+
+class OutputLayout:
+    """Deterministic mapping from batch sources to output paths
+
+    mirror  - output_dir/<relative source dir>/<stem><suffix>
+    sharded - output_dir/ab/cd/<stem>-<hash><suffix>, where the hash is of
+              the source's relative path, so names never collide
+    flat    - output_dir/<stem><suffix>, the historical layout; same-named
+              sources overwrite each other
+    """
+
+    def __init__(self, source_dir, output_dir, mode='mirror'):
+        if mode not in LAYOUTS:
+            raise ValueError(f"Unknown output layout: {mode}")
+        self.source_dir = os.path.abspath(source_dir)
+        self.output_dir = output_dir
+        self.mode = mode
+
+    def _relpath(self, source):
+        return os.path.relpath(os.path.abspath(source), self.source_dir).replace(os.sep, '/')
+
+    def path_for(self, source, suffix='', stem=None):
+        """Output path for one source; stem defaults to the file name without its extension"""
+        if stem is None:
+            stem = _split_name(source)[0]
+        if self.mode == 'flat':
+            return os.path.join(self.output_dir, stem + suffix)
+        relpath = self._relpath(source)
+        if self.mode == 'mirror':
+            return os.path.join(self.output_dir, *relpath.split('/')[:-1], stem + suffix)
+        digest = hashlib.sha1(relpath.encode('utf-8', 'surrogateescape')).hexdigest()
+        shards = [digest[i * 2:i * 2 + 2] for i in range(SHARD_LEVELS)]
+        return os.path.join(self.output_dir, *shards, f"{stem}-{digest[:10]}{suffix}")
+
+    def assign(self, sources, suffix='', stem_for=None):
+        """Return {source: output path} for a whole batch
+
+        In mirror mode sources that share a directory and a stem (photo.png
+        and photo.jpg) would meet at the same output; those keep their own
+        extension in the name instead (photo.png.webp, photo.jpg.webp), and
+        if that name is taken too a counter is added (photo.png-2.webp).
+        """
+        stem_for = stem_for or (lambda source: _split_name(source)[0])
+        outputs = {source: self.path_for(source, suffix, stem_for(source)) for source in sources}
+        if self.mode != 'mirror':
+            return outputs
+        claimed = {}
+        for source, output in outputs.items():
+            claimed.setdefault(os.path.normcase(output), []).append(source)
+        used = {output for output, owners in claimed.items() if len(owners) == 1}
+        for owners in claimed.values():
+            if len(owners) == 1:
+                continue
+            for source in sorted(owners):
+                name = os.path.basename(source)
+                output = self.path_for(source, suffix, name)
+                counter = 2
+                while os.path.normcase(output) in used:
+                    output = self.path_for(source, suffix, f"{name}-{counter}")
+                    counter += 1
+                used.add(os.path.normcase(output))
+                outputs[source] = output
+        return outputs
+
+
+class LayoutManifest:
+    """source -> output lookup table kept in the output directory"""
+
+    def __init__(self, output_dir):
+        self.db_path = os.path.join(output_dir, LAYOUT_MANIFEST_NAME)
+        os.makedirs(output_dir, exist_ok=True)
+        with closing(sqlite3.connect(self.db_path)) as conn, conn:
+            if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                conn.execute('DROP TABLE IF EXISTS outputs')
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS outputs (
+                    source TEXT PRIMARY KEY,
+                    output_path TEXT NOT NULL,
+                    layout TEXT NOT NULL
+                )
+            ''')
+
+    def record(self, outputs, layout):
+        """Store {source: output path} pairs produced with the given layout mode"""
+        with closing(sqlite3.connect(self.db_path)) as conn, conn:
+            conn.executemany('INSERT OR REPLACE INTO outputs VALUES (?, ?, ?)',
+                             [(os.path.abspath(source), output, layout) for source, output in outputs.items()])
+
+    def lookup(self, source):
+        """Output path recorded for source, or None"""
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            row = conn.execute('SELECT output_path FROM outputs WHERE source = ?',
+                               (os.path.abspath(source),)).fetchone()
+        return row[0] if row else None
@@ -0,0 +1,134 @@
+import os
+import bz2
+import gzip
+import lzma
+import tarfile
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from volume_set import open_archive_output
+
+# Uncompressed bytes per independently compressed block. xz gets bigger
+# blocks because its ratio suffers most from restarting the dictionary.
+BLOCK_SIZES = {
+    'gz': 4 * 1024 * 1024,
+    'bz2': 4 * 1024 * 1024,
+    'xz': 16 * 1024 * 1024,
+}
+# xz preset dictionary sizes (xz(1)). Encoder memory is roughly ten times
+# the dictionary, per thread, and a block never needs more than its own size.
+XZ_PRESET_DICT = {0: 256 * 1024, 1: 1 << 20, 2: 2 << 20, 3: 4 << 20, 4: 4 << 20,
+                  5: 8 << 20, 6: 8 << 20, 7: 16 << 20, 8: 32 << 20, 9: 64 << 20}
+XZ_MIN_DICT = 4096
+
+
+def codec_for(path):
+    """Return 'gz', 'bz2', 'xz' or None for a tar output path"""
+    lower = path.lower()
+    for codec in ('gz', 'bz2', 'xz'):
+        if lower.endswith('.' + codec):
+            return codec
+    return None
+
+
+def compress_block(codec, data, level):
+    """Compress one block into a self-contained gzip member / bz2 stream / xz stream"""
+    if codec == 'gz':
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if codec == 'bz2':
+        return bz2.compress(data, compresslevel=max(1, level))
+    if codec == 'xz':
+        preset = level & 0x1F
+        dict_size = max(XZ_MIN_DICT, min(XZ_PRESET_DICT.get(preset, 8 << 20), len(data)))
+        filters = [{'id': lzma.FILTER_LZMA2, 'preset': level, 'dict_size': dict_size}]
+        return lzma.compress(data, format=lzma.FORMAT_XZ, check=lzma.CHECK_CRC64, filters=filters)
+    raise ValueError(f"Unsupported codec: {codec}")
+
+
+class ParallelCompressWriter:
+    """Write-only file object that compresses fixed-size blocks on a thread pool
+
+    zlib, bz2 and lzma release the GIL while compressing, so threads keep
+    every core busy without copying blocks between processes. Each block
+    becomes a complete member/stream; concatenated they form multi-member
+    gzip, multi-stream bzip2 or multi-stream xz, all of which stock
+    gzip/bzip2/xz, tar and Python's own readers decompress transparently.
+    """
+
+    def __init__(self, output_path, codec, level=6, workers=None, block_size=None):
+        self.codec = codec
+        self.level = level
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.block_size = block_size or BLOCK_SIZES[codec]
+        self.bytes_in = 0
+        self.bytes_out = 0
+        # A path, or an already open binary file such as a VolumeWriter
+        self._file = open(output_path, 'wb') if isinstance(output_path, str) else output_path
+        self._buffer = bytearray()
+        self._pending = deque()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.closed = False
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        self.bytes_in += len(data)
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            self._submit(block)
+        return len(data)
+
+    def _submit(self, block):
+        # Keep at most two blocks per worker in memory
+        while len(self._pending) >= self.workers * 2:
+            self._write_next()
+        self._pending.append(self._executor.submit(compress_block, self.codec, block, self.level))
+
+    def _write_next(self):
+        compressed = self._pending.popleft().result()
+        self._file.write(compressed)
+        self.bytes_out += len(compressed)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._buffer or not self.bytes_in:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pending:
+                self._write_next()
+        finally:
+            self.closed = True
+            self._executor.shutdown(cancel_futures=True)
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+@contextmanager
+def open_tar_writer(output_path, level=6, workers=None, volume_size=0):
+    """Open a tar archive for writing; .gz/.bz2/.xz outputs are compressed block-parallel
+
+    With volume_size the archive goes straight into output_path.001, .002,
+    ... volumes of that many bytes.
+    """
+    codec = codec_for(output_path)
+    target = open_archive_output(output_path, volume_size)
+    if codec is None:
+        with target, tarfile.open(fileobj=target, mode='w') as tar_ref:
+            yield tar_ref
+        return
+    with ParallelCompressWriter(target, codec, level, workers) as stream:
+        with tarfile.open(fileobj=stream, mode='w|') as tar_ref:
+            yield tar_ref
@@ -0,0 +1,203 @@
+import os
+import zlib
+import struct
+import zipfile
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from volume_set import open_archive_output
+
+CHUNK_SIZE = 1024 * 1024
+# Members whose compressed stream grows past this are spooled to a temp file
+SPOOL_THRESHOLD = 16 * 1024 * 1024
+# Small files are grouped so each task carries at least this much input
+GROUP_BYTES = 4 * 1024 * 1024
+GROUP_FILES = 256
+
+
+def _compress_member(file_path, arcname, level, spool_dir):
+    """Deflate one file the way ZipFile.write would, without a ZipFile"""
+    zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+    zinfo.compress_type = zipfile.ZIP_DEFLATED
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    crc = 0
+    size = 0
+    buffer = bytearray()
+    spool = None
+    with open(file_path, 'rb') as src:
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            crc = zlib.crc32(chunk, crc)
+            buffer += compressor.compress(chunk)
+            if spool is None and len(buffer) > SPOOL_THRESHOLD:
+                spool = tempfile.NamedTemporaryFile(dir=spool_dir, delete=False)
+            if spool is not None:
+                spool.write(buffer)
+                buffer.clear()
+    buffer += compressor.flush()
+
+    zinfo.file_size = size
+    zinfo.CRC = crc
+    if spool is not None:
+        spool.write(buffer)
+        zinfo.compress_size = spool.tell()
+        spool.close()
+        return zinfo, None, spool.name
+    zinfo.compress_size = len(buffer)
+    return zinfo, bytes(buffer), None
+
+
+def _compress_group(group, level, spool_dir):
+    return [_compress_member(file_path, arcname, level, spool_dir) for file_path, arcname in group]
+
+
+def _group_entries(entries):
+    """Batch consecutive small files so per-task overhead stays low"""
+    group = []
+    group_bytes = 0
+    for file_path, arcname in entries:
+        group.append((file_path, arcname))
+        group_bytes += os.path.getsize(file_path)
+        if group_bytes >= GROUP_BYTES or len(group) >= GROUP_FILES:
+            yield group
+            group = []
+            group_bytes = 0
+    if group:
+        yield group
+
+
+# PKZIP records (APPNOTE.TXT 4.3); written directly so pre-deflated members
+# never go through ZipFile's private writer state
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+END_RECORD = struct.Struct('<IHHHHIIH')
+ZIP64_END_RECORD = struct.Struct('<IQHHIIQQQQ')
+ZIP64_LOCATOR = struct.Struct('<IIQI')
+ZIP64_LIMIT = 0xFFFFFFFF
+UTF8_FLAG = 0x800
+VERSION_DEFLATE = 20
+VERSION_ZIP64 = 45
+
+
+def _dos_time(date_time):
+    year, month, day, hour, minute, second = date_time
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+
+def _zip64_extra(*values):
+    data = struct.pack(f'<{len(values)}Q', *values)
+    return struct.pack('<HH', 1, len(data)) + data
+
+
+class DeflatedZipWriter:
+    """Writes already-deflated members and the central directory to a binary stream
+
+    Only what write_zip needs: deflated files, ZIP64 when sizes, offsets or
+    the member count outgrow the classic fields, UTF-8 names.
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.offset = 0
+        self.members = []  # (zinfo, header_offset)
+
+    def _write(self, data):
+        self.fp.write(data)
+        self.offset += len(data)
+
+    def add(self, zinfo, data, spool_path):
+        name = zinfo.filename.encode('utf-8')
+        flags = UTF8_FLAG if not zinfo.filename.isascii() else 0
+        dos_time, dos_date = _dos_time(zinfo.date_time)
+        zip64 = zinfo.file_size >= ZIP64_LIMIT or zinfo.compress_size >= ZIP64_LIMIT
+        extra = _zip64_extra(zinfo.file_size, zinfo.compress_size) if zip64 else b''
+        header_offset = self.offset
+        self._write(LOCAL_HEADER.pack(
+            0x04034b50, VERSION_ZIP64 if zip64 else VERSION_DEFLATE, flags, zipfile.ZIP_DEFLATED,
+            dos_time, dos_date, zinfo.CRC,
+            ZIP64_LIMIT if zip64 else zinfo.compress_size, ZIP64_LIMIT if zip64 else zinfo.file_size,
+            len(name), len(extra)) + name + extra)
+        if spool_path:
+            with open(spool_path, 'rb') as spool:
+                while True:
+                    chunk = spool.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    self._write(chunk)
+            os.remove(spool_path)
+        else:
+            self._write(data)
+        self.members.append((zinfo, header_offset))
+
+    def close(self):
+        """Write the central directory and end records"""
+        directory_offset = self.offset
+        for zinfo, header_offset in self.members:
+            name = zinfo.filename.encode('utf-8')
+            flags = UTF8_FLAG if not zinfo.filename.isascii() else 0
+            dos_time, dos_date = _dos_time(zinfo.date_time)
+            # Only the fields that overflow go into the ZIP64 extra, in this order
+            wide = [value for value in (zinfo.file_size, zinfo.compress_size, header_offset) if value >= ZIP64_LIMIT]
+            extra = _zip64_extra(*wide) if wide else b''
+            version = VERSION_ZIP64 if wide else VERSION_DEFLATE
+            self._write(CENTRAL_HEADER.pack(
+                0x02014b50, (3 << 8) | version, version, flags, zipfile.ZIP_DEFLATED,
+                dos_time, dos_date, zinfo.CRC,
+                min(zinfo.compress_size, ZIP64_LIMIT), min(zinfo.file_size, ZIP64_LIMIT),
+                len(name), len(extra), 0, 0, 0, zinfo.external_attr,
+                min(header_offset, ZIP64_LIMIT)) + name + extra)
+        directory_size = self.offset - directory_offset
+        count = len(self.members)
+        if count >= 0xFFFF or directory_size >= ZIP64_LIMIT or directory_offset >= ZIP64_LIMIT:
+            end64_offset = self.offset
+            self._write(ZIP64_END_RECORD.pack(0x06064b50, ZIP64_END_RECORD.size - 12, (3 << 8) | VERSION_ZIP64,
+                                              VERSION_ZIP64, 0, 0, count, count, directory_size, directory_offset))
+            self._write(ZIP64_LOCATOR.pack(0x07064b50, 0, end64_offset, 1))
+        self._write(END_RECORD.pack(0x06054b50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+                                    min(directory_size, ZIP64_LIMIT), min(directory_offset, ZIP64_LIMIT), 0))
+
+
+def write_zip(output_path, entries, level=6, workers=None, executor=None, on_progress=None, volume_size=0):
+    """Write a standard deflated ZIP, compressing members on a process pool
+
+    entries is a list of (file_path, arcname). Members are written in the
+    given order by a single writer while later members are still being
+    compressed; at most two groups per worker are held in flight.
+    on_progress(done, total) is called after each member is written.
+    With volume_size the ZIP goes straight into output_path.001, .002, ...
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    total = len(entries)
+    done = 0
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_path))) as spool_dir, \
+                open_archive_output(output_path, volume_size) as target:
+            zip_writer = DeflatedZipWriter(target)
+            groups = _group_entries(entries)
+            pending = deque()
+
+            def fill():
+                while len(pending) < workers * 2:
+                    group = next(groups, None)
+                    if group is None:
+                        return
+                    pending.append(executor.submit(_compress_group, group, level, spool_dir))
+
+            fill()
+            while pending:
+                for zinfo, data, spool_path in pending.popleft().result():
+                    zip_writer.add(zinfo, data, spool_path)
+                    done += 1
+                    if on_progress:
+                        on_progress(done, total)
+                fill()
+            zip_writer.close()
+    finally:
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
@@ -0,0 +1,206 @@
+import os
+import zlib
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps, ImageSequence
+
+DEFAULT_DPI = 96
+# EXIF orientations that a page /Rotate can express without touching the JPEG data
+ORIENTATION_ROTATE = {1: 0, 3: 180, 6: 90, 8: 270}
+EXIF_ORIENTATION = 0x0112
+COLORSPACES = {'L': 'DeviceGray', 'RGB': 'DeviceRGB', 'CMYK': 'DeviceCMYK'}
+
+
+class PreparedPage:
+    """Everything the PDF writer needs for one page, ready to be written as is"""
+
+    def __init__(self, source, width, height, dpi, mode, data, filter_name, rotate=0, decode=None):
+        self.source = source
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self.mode = mode
+        self.data = data
+        self.filter_name = filter_name
+        self.rotate = rotate
+        self.decode = decode
+
+
+def _dpi(img):
+    dpi = img.info.get('dpi')
+    try:
+        x, y = float(dpi[0]), float(dpi[1])
+    except (TypeError, ValueError, IndexError):
+        return DEFAULT_DPI, DEFAULT_DPI
+    if x < 1 or y < 1:
+        return DEFAULT_DPI, DEFAULT_DPI
+    return x, y
+
+
+def _normalize(img):
+    """Turn any Pillow mode into L, RGB or CMYK, flattening transparency onto white"""
+    if img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    if img.mode in COLORSPACES:
+        return img
+    if img.mode == '1':
+        return img.convert('L')
+    if img.mode == 'F':
+        # Float data has no fixed range; stretch its own min..max onto 0..255
+        low, high = img.getextrema()
+        scale = 255.0 / (high - low) if high > low else 0.0
+        return img.point(lambda v: v * scale + (-low * scale)).convert('L')
+    if img.mode in ('I;16', 'I;16B', 'I;16L', 'I'):
+        # 16-bit samples (Pillow opens 16-bit PNG/TIFF as I or I;16): keep the high byte
+        return img.convert('I').point(lambda v: v * (1 / 256)).convert('L')
+    return img.convert('RGB')
+
+
+def prepare_pages(source):
+    """Read one image into a list of PreparedPages, one per frame; runs in a worker process
+
+    Baseline JPEGs in L/RGB/CMYK are passed through untouched, with the
+    EXIF orientation expressed as a page rotation. Anything else (every
+    frame of a multi-page TIFF or GIF) is decoded, transposed, normalized
+    and Flate-compressed.
+    """
+    with Image.open(source) as img:
+        orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+        if img.format == 'JPEG' and img.mode in COLORSPACES and orientation in ORIENTATION_ROTATE:
+            with open(source, 'rb') as f:
+                data = f.read()
+            # Photoshop writes inverted CMYK JPEGs and marks them with an Adobe segment
+            decode = [1, 0] * 4 if img.mode == 'CMYK' and 'adobe' in img.info else None
+            return [PreparedPage(source, img.width, img.height, _dpi(img), img.mode, data, 'DCTDecode',
+                                 ORIENTATION_ROTATE[orientation], decode)]
+
+        pages = []
+        for frame in ImageSequence.Iterator(img):
+            dpi = _dpi(frame)
+            page = _normalize(ImageOps.exif_transpose(frame))
+            data = zlib.compress(page.tobytes(), 6)
+            pages.append(PreparedPage(source, page.width, page.height, dpi, page.mode, data, 'FlateDecode'))
+        return pages
+
+
+class StreamingPDFWriter:
+    """Writes a PDF one page at a time; only the xref offsets stay in memory
+
+    Object 1 is the catalog and object 2 the page tree; both are written
+    last, once every page (image, content stream, page object) is on disk.
+    """
+
+    def __init__(self, pdf_path):
+        self.pdf_path = pdf_path
+        self._file = open(pdf_path, 'wb')
+        self._offsets = array('Q', [0, 0, 0])  # index = object number; 1 and 2 filled at close
+        self._pages = []
+        self._file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def _begin(self):
+        number = len(self._offsets)
+        self._offsets.append(self._file.tell())
+        self._file.write(f"{number} 0 obj\n".encode())
+        return number
+
+    def _write_object(self, body, number=None):
+        if number is None:
+            number = self._begin()
+        else:
+            self._offsets[number] = self._file.tell()
+            self._file.write(f"{number} 0 obj\n".encode())
+        self._file.write(body)
+        self._file.write(b"\nendobj\n")
+        return number
+
+    def _write_stream(self, header, data):
+        return self._write_object(b"<< " + header + f" /Length {len(data)} >>\nstream\n".encode() +
+                                  data + b"\nendstream")
+
+    def add_page(self, page):
+        width_pt = page.width * 72.0 / page.dpi[0]
+        height_pt = page.height * 72.0 / page.dpi[1]
+        header = (f"/Type /XObject /Subtype /Image /Width {page.width} /Height {page.height} "
+                  f"/ColorSpace /{COLORSPACES[page.mode]} /BitsPerComponent 8 /Filter /{page.filter_name}")
+        if page.decode:
+            header += " /Decode [" + " ".join(str(v) for v in page.decode) + "]"
+        image = self._write_stream(header.encode(), page.data)
+        content = self._write_stream(b"", f"q {width_pt:.4f} 0 0 {height_pt:.4f} 0 0 cm /Im0 Do Q".encode())
+        page_obj = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width_pt:.4f} {height_pt:.4f}] "
+                    f"/Resources << /XObject << /Im0 {image} 0 R >> >> /Contents {content} 0 R")
+        if page.rotate:
+            page_obj += f" /Rotate {page.rotate}"
+        self._pages.append(self._write_object((page_obj + " >>").encode()))
+
+    def close(self):
+        if self._file.closed:
+            return
+        try:
+            kids = " ".join(f"{number} 0 R" for number in self._pages)
+            self._write_object(f"<< /Type /Pages /Kids [{kids}] /Count {len(self._pages)} >>".encode(), 2)
+            self._write_object(b"<< /Type /Catalog /Pages 2 0 R >>", 1)
+            xref = self._file.tell()
+            lines = [f"xref\n0 {len(self._offsets)}\n", "0000000000 65535 f \n"]
+            lines.extend(f"{offset:010d} 00000 n \n" for offset in self._offsets[1:])
+            lines.append(f"trailer\n<< /Size {len(self._offsets)} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n")
+            self._file.write("".join(lines).encode())
+        finally:
+            self._file.close()
+
+    def abort(self):
+        """Close without writing the page tree and trailer, and delete the partial file"""
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.remove(self.pdf_path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+def write_pdf(image_paths, pdf_path, workers=None, on_progress=None):
+    """Build a PDF from images, preparing pages on a process pool and writing them in order
+
+    Multi-frame images contribute one page per frame. At most two images
+    per worker are held in memory. on_progress(done, total) is called in
+    the calling thread after each image's pages are written. Returns the
+    number of pages written.
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    total = len(image_paths)
+    paths = iter(image_paths)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=min(workers, max(1, total))) as pool, \
+            StreamingPDFWriter(pdf_path) as writer:
+
+        def fill():
+            while len(pending) < workers * 2:
+                path = next(paths, None)
+                if path is None:
+                    return
+                pending.append(pool.submit(prepare_pages, path))
+
+        fill()
+        done = 0
+        pages = 0
+        while pending:
+            for page in pending.popleft().result():
+                writer.add_page(page)
+                pages += 1
+            done += 1
+            if on_progress:
+                on_progress(done, total)
+            fill()
+    return pages
@@ -0,0 +1,447 @@
+import io
+import os
+import bz2
+import lzma
+import zlib
+import struct
+import tarfile
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+
+CHUNK_SIZE = 256 * 1024
+# Uncompressed distance between in-memory zlib checkpoints inside one gzip member
+CHECKPOINT_INTERVAL = 64 * 1024 * 1024
+
+XZ_HEADER_MAGIC = b'\xfd7zXZ\x00'
+XZ_FOOTER_MAGIC = b'YZ'
+
+CODEC_TAGS = {'gz': b'g', 'bz2': b'b', 'xz': b'x'}
+
+
+def tar_codec(path):
+    """Return 'gz', 'bz2', 'xz' or None for a tar archive path"""
+    lower = path.lower()
+    for codec in ('gz', 'bz2', 'xz'):
+        if lower.endswith('.' + codec):
+            return codec
+    return None
+
+
+def _round4(n):
+    return (n + 3) & ~3
+
+
+def _xz_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _xz_encode_varint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _xz_block_stream(flags, unpadded_size, uncompressed_size):
+    """Header and trailer that wrap a single xz block into a complete one-block stream"""
+    header = XZ_HEADER_MAGIC + flags + struct.pack('<I', zlib.crc32(flags))
+    index = bytearray(b'\x00')
+    index += _xz_encode_varint(1)
+    index += _xz_encode_varint(unpadded_size)
+    index += _xz_encode_varint(uncompressed_size)
+    index += b'\x00' * (_round4(len(index)) - len(index))
+    index += struct.pack('<I', zlib.crc32(index))
+    backward = struct.pack('<I', len(index) // 4 - 1)
+    footer = struct.pack('<I', zlib.crc32(backward + flags)) + backward + flags + XZ_FOOTER_MAGIC
+    return header, bytes(index) + footer
+
+
+class SeekIndex:
+    """Decompressor restart points mapped to offsets in the uncompressed tar stream
+
+    Every segment (xz block, gzip member or bzip2 stream) can be decoded on
+    its own. Single-member gzip files additionally get in-memory zlib
+    checkpoints; those cannot be serialized and only live for the session.
+    """
+
+    def __init__(self, codec):
+        self.codec = codec
+        self.uoffs = array('Q')
+        self.usizes = array('Q')
+        self.coffs = array('Q')
+        self.csizes = array('Q')
+        self.unpadded = array('Q')  # xz only
+        self.flags = []  # xz stream flags per segment
+        self.checkpoint_uoffs = array('Q')
+        self.checkpoints = []  # (segment, coff, zlib decompressor copy)
+
+    def __len__(self):
+        return len(self.uoffs)
+
+    @property
+    def size(self):
+        """Total uncompressed size"""
+        if not self.uoffs:
+            return 0
+        return self.uoffs[-1] + self.usizes[-1]
+
+    @property
+    def can_seek(self):
+        """True when there is more than one restart point, i.e. seeking beats a sequential read"""
+        return len(self) > 1 or bool(self.checkpoints)
+
+    def add_segment(self, coff, csize, usize, unpadded=0, flags=b'\x00\x00'):
+        self.uoffs.append(self.size)
+        self.usizes.append(usize)
+        self.coffs.append(coff)
+        self.csizes.append(csize)
+        self.unpadded.append(unpadded)
+        self.flags.append(flags)
+
+    def add_checkpoint(self, uoff, segment, coff, decompressor):
+        self.checkpoint_uoffs.append(uoff)
+        self.checkpoints.append((segment, coff, decompressor))
+
+    def restart_point(self, pos):
+        """Return (segment, uoff, coff, decompressor copy or None) to decode pos from"""
+        segment = max(0, bisect_right(self.uoffs, pos) - 1)
+        uoff, coff, decompressor = self.uoffs[segment], self.coffs[segment], None
+        i = bisect_right(self.checkpoint_uoffs, pos) - 1
+        if i >= 0 and self.checkpoints[i][0] == segment and self.checkpoint_uoffs[i] > uoff:
+            segment, coff, decompressor = self.checkpoints[i]
+            uoff = self.checkpoint_uoffs[i]
+            decompressor = decompressor.copy()
+        return segment, uoff, coff, decompressor
+
+    def to_bytes(self):
+        """Serialize the segments (not the session-only checkpoints)"""
+        count = len(self)
+        flags = b''.join(self.flags)
+        return (CODEC_TAGS[self.codec] + struct.pack('<Q', count) + self.uoffs.tobytes() +
+                self.usizes.tobytes() + self.coffs.tobytes() + self.csizes.tobytes() +
+                self.unpadded.tobytes() + flags)
+
+    @classmethod
+    def from_bytes(cls, data):
+        codec = {tag: name for name, tag in CODEC_TAGS.items()}[data[:1]]
+        index = cls(codec)
+        count = struct.unpack_from('<Q', data, 1)[0]
+        pos = 9
+        for column in (index.uoffs, index.usizes, index.coffs, index.csizes, index.unpadded):
+            column.frombytes(data[pos:pos + count * 8])
+            pos += count * 8
+        index.flags = [data[pos + i * 2:pos + i * 2 + 2] for i in range(count)]
+        return index
+
+
+def xz_seek_index(path):
+    """Build a SeekIndex from the xz stream indexes at the end of the file, without decompressing"""
+    streams = []
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        while pos > 0:
+            # Stream padding between concatenated streams
+            f.seek(pos - 4)
+            if f.read(4) == b'\x00' * 4:
+                pos -= 4
+                continue
+            f.seek(pos - 12)
+            footer = f.read(12)
+            if footer[10:] != XZ_FOOTER_MAGIC:
+                raise ValueError("Not an xz file or corrupt stream footer")
+            backward = (struct.unpack('<I', footer[4:8])[0] + 1) * 4
+            flags = footer[8:10]
+            index_start = pos - 12 - backward
+            f.seek(index_start)
+            index = f.read(backward)
+            count, p = _xz_varint(index, 1)
+            records = []
+            for _ in range(count):
+                unpadded, p = _xz_varint(index, p)
+                usize, p = _xz_varint(index, p)
+                records.append((unpadded, usize))
+            stream_start = index_start - sum(_round4(u) for u, _ in records) - 12
+            f.seek(stream_start)
+            if f.read(6) != XZ_HEADER_MAGIC:
+                raise ValueError("Corrupt xz stream header")
+            streams.append((stream_start, flags, records))
+            pos = stream_start
+
+    seek_index = SeekIndex('xz')
+    for stream_start, flags, records in reversed(streams):
+        coff = stream_start + 12
+        for unpadded, usize in records:
+            seek_index.add_segment(coff, _round4(unpadded), usize, unpadded, flags)
+            coff += _round4(unpadded)
+    return seek_index
+
+
+def _new_decompressor(codec):
+    if codec == 'gz':
+        return zlib.decompressobj(wbits=31)
+    if codec == 'bz2':
+        return bz2.BZ2Decompressor()
+    return lzma.LZMADecompressor(format=lzma.FORMAT_XZ)
+
+
+class IndexingReader(io.RawIOBase):
+    """Sequential decompressing reader that records a SeekIndex as it goes
+
+    Used for the listing pass, which has to decompress the whole archive
+    anyway, so restart points come for free. Unlike tarfile's own stream
+    mode it also reads multi-member gzip and multi-stream bzip2/xz files.
+    """
+
+    def __init__(self, path, codec, checkpoint_interval=CHECKPOINT_INTERVAL):
+        super().__init__()
+        if codec not in ('gz', 'bz2', 'xz'):
+            raise ValueError(f"Unsupported codec: {codec}")
+        self.codec = codec
+        self.index = SeekIndex(codec)
+        self.checkpoint_interval = checkpoint_interval
+        # A path, or an already open binary file such as a joined volume set
+        self._file = open(path, 'rb') if isinstance(path, str) else path
+        self._decompressor = _new_decompressor(codec)
+        self._fresh = True  # no input fed to the current decompressor yet
+        self._member_coff = 0
+        self._member_out = 0
+        self._last_checkpoint = 0
+        self._input = b''  # compressed bytes read but not yet consumed by the decompressor
+        self._more_output = False  # the decompressor may still produce output without new input
+        self._buffer = b''
+        self._offset = 0  # read position in self._buffer
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def _finish_member(self, end_coff):
+        self.index.add_segment(self._member_coff, end_coff - self._member_coff, self._member_out)
+        self._member_out = 0
+        self._last_checkpoint = 0
+
+    def _fill(self):
+        """Decompress the next piece of output, at most CHUNK_SIZE bytes; b'' at the end
+
+        Output is capped per call, so a small chunk of highly compressible
+        input never turns into one huge buffer.
+        """
+        while True:
+            if not self._input and not self._more_output:
+                self._input = self._file.read(CHUNK_SIZE)
+                if not self._input:
+                    self._eof = True
+                    if not self._fresh:
+                        raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+                    return b''
+            if self._fresh:
+                # Zero padding between or after members/streams
+                self._input = self._input.lstrip(b'\x00')
+                if not self._input:
+                    continue
+                self._member_coff = self._file.tell() - len(self._input)
+                self._fresh = False
+            decompressor = self._decompressor
+            out = decompressor.decompress(self._input, CHUNK_SIZE)
+            self._member_out += len(out)
+            if decompressor.eof:
+                self._input = decompressor.unused_data
+                self._more_output = False
+                self._finish_member(self._file.tell() - len(self._input))
+                self._decompressor = _new_decompressor(self.codec)
+                self._fresh = True
+            elif self.codec == 'gz':
+                # zlib hands back what it did not consume; a full output chunk may leave more pending
+                self._input = decompressor.unconsumed_tail
+                self._more_output = len(out) == CHUNK_SIZE
+            else:
+                # bz2 and lzma keep unconsumed input internally
+                self._input = b''
+                self._more_output = not decompressor.needs_input
+            if (self.codec == 'gz' and not self._fresh and not self._input and not self._more_output and
+                    self._member_out - self._last_checkpoint >= self.checkpoint_interval):
+                # All input so far is consumed, so the copy restarts exactly at file.tell()
+                self.index.add_checkpoint(self.index.size + self._member_out, len(self.index),
+                                          self._file.tell(), self._decompressor.copy())
+                self._last_checkpoint = self._member_out
+            if out:
+                return out
+
+    @property
+    def compressed_offset(self):
+        return self._file.tell()
+
+    def finish(self):
+        """Read to the end (tar stops at its end marker) and return the complete SeekIndex"""
+        while self.read(CHUNK_SIZE):
+            pass
+        return self.index
+
+    def readinto(self, b):
+        while self._offset >= len(self._buffer) and not self._eof:
+            self._buffer = self._fill()
+            self._offset = 0
+        n = min(len(b), len(self._buffer) - self._offset)
+        b[:n] = memoryview(self._buffer)[self._offset:self._offset + n]
+        self._offset += n
+        return n
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def check_segment(fileobj, index, segment):
+    """Decode one segment completely; return None, or a description of what is wrong
+
+    The codecs verify their own checksums (gzip CRC32, bzip2 block CRCs, xz
+    block check) as the data is decompressed.
+    """
+    decompressor = _new_decompressor(index.codec)
+    out = 0
+    try:
+        if index.codec == 'xz':
+            header, suffix = _xz_block_stream(index.flags[segment], index.unpadded[segment],
+                                              index.usizes[segment])
+            decompressor.decompress(header)
+        fileobj.seek(index.coffs[segment])
+        remaining = index.csizes[segment]
+        while remaining:
+            data = fileobj.read(min(CHUNK_SIZE, remaining))
+            if not data:
+                return "Compressed data is truncated"
+            remaining -= len(data)
+            out += len(decompressor.decompress(data))
+        if index.codec == 'xz':
+            out += len(decompressor.decompress(suffix))
+    except (OSError, EOFError, ValueError, zlib.error, lzma.LZMAError) as e:
+        return str(e)
+    if not decompressor.eof:
+        return "Compressed stream ends early"
+    if out != index.usizes[segment]:
+        return f"Expected {index.usizes[segment]} bytes, decoded {out}"
+    return None
+
+
+class SeekableTarStream(io.RawIOBase):
+    """Read-only, seekable view of a compressed tar that only decodes the segments it needs"""
+
+    def __init__(self, path, index):
+        super().__init__()
+        self.index = index
+        self._file = open(path, 'rb')
+        self._pos = 0
+        self._decompressor = None
+        self._segment = -1
+        self._dpos = 0  # uncompressed offset of self._buffer[0]
+        self._buffer = b''
+        self._cpos = 0  # next compressed byte to feed
+        self._cend = 0
+        self._suffix = b''
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.index.size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def _start(self, segment, uoff, coff, decompressor):
+        self._segment = segment
+        self._dpos = uoff
+        self._buffer = b''
+        self._cpos = coff
+        self._cend = self.index.coffs[segment] + self.index.csizes[segment]
+        self._suffix = b''
+        if decompressor is not None:
+            self._decompressor = decompressor
+            return
+        self._decompressor = _new_decompressor(self.index.codec)
+        if self.index.codec == 'xz':
+            header, self._suffix = _xz_block_stream(self.index.flags[segment], self.index.unpadded[segment],
+                                                    self.index.usizes[segment])
+            self._buffer = self._decompressor.decompress(header)
+
+    def _decode_more(self):
+        """Decode the next chunk of the current segment; False at end of segment"""
+        if self._cpos >= self._cend:
+            if self._suffix:
+                data, self._suffix = self._suffix, b''
+                self._dpos += len(self._buffer)
+                self._buffer = self._decompressor.decompress(data)
+                return True
+            return False
+        self._file.seek(self._cpos)
+        data = self._file.read(min(CHUNK_SIZE, self._cend - self._cpos))
+        if not data:
+            return False
+        self._cpos += len(data)
+        self._dpos += len(self._buffer)
+        self._buffer = self._decompressor.decompress(data)
+        if self._cpos >= self._cend and not self._suffix:
+            self._buffer += getattr(self._decompressor, 'flush', lambda: b'')()
+        return True
+
+    def _position(self):
+        """Make self._buffer cover self._pos; False at end of stream"""
+        pos = self._pos
+        if pos >= self.index.size:
+            return False
+        in_segment = (0 <= self._segment < len(self.index) and self._dpos <= pos and
+                      pos < self.index.uoffs[self._segment] + self.index.usizes[self._segment])
+        if in_segment:
+            restart = self.index.restart_point(pos)
+            # Jump ahead when a checkpoint is closer than what we have decoded
+            if restart[0] == self._segment and restart[1] > self._dpos + len(self._buffer):
+                self._start(*restart)
+        else:
+            self._start(*self.index.restart_point(pos))
+        while pos >= self._dpos + len(self._buffer):
+            if not self._decode_more():
+                if self._segment + 1 >= len(self.index):
+                    return False
+                next_segment = self._segment + 1
+                self._start(next_segment, self.index.uoffs[next_segment], self.index.coffs[next_segment], None)
+        return True
+
+    def readinto(self, b):
+        if not self._position():
+            return 0
+        start = self._pos - self._dpos
+        n = min(len(b), len(self._buffer) - start)
+        b[:n] = self._buffer[start:start + n]
+        self._pos += n
+        return n
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+@contextmanager
+def open_indexed_tar(path, index):
+    """Open a compressed tar for random access through its SeekIndex"""
+    with io.BufferedReader(SeekableTarStream(path, index), buffer_size=CHUNK_SIZE) as stream:
+        with tarfile.open(fileobj=stream, mode='r:') as tar_ref:
+            yield tar_ref
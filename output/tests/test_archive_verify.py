@@ -0,0 +1,82 @@
+import io
+import os
+import sys
+import time
+import tarfile
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from archive_verify import verify_tar
+except ImportError as e:  # py7zr / rarfile not installed
+    raise unittest.SkipTest(f"archive_verify unavailable: {e}")
+
+# Slack for timer noise on a busy machine
+TIME_MARGIN = 1.5
+TIME_SLACK = 0.5
+
+
+def _build_tar(path, mode):
+    """Highly compressible members, the case where a reader that re-slices its buffer falls apart"""
+    with tarfile.open(path, mode) as tar_ref:
+        for i in range(4):
+            data = bytes([65 + i]) * (16 * 1024 * 1024)
+            info = tarfile.TarInfo(f"big{i}.bin")
+            info.size = len(data)
+            tar_ref.addfile(info, io.BytesIO(data))
+        for i in range(500):
+            data = (b"line %d of some text\n" % i) * 200
+            info = tarfile.TarInfo(f"dir/small{i}.txt")
+            info.size = len(data)
+            tar_ref.addfile(info, io.BytesIO(data))
+
+
+def _read_with_tarfile(path):
+    with tarfile.open(path, mode='r|*') as tar_ref:
+        for member in tar_ref:
+            if member.isfile():
+                member_file = tar_ref.extractfile(member)
+                while member_file.read(1024 * 1024):
+                    pass
+
+
+class VerifyTarTimingTest(unittest.TestCase):
+    """verify_tar must stay no slower than a plain tarfile stream read"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check_codec(self, extension, mode):
+        path = os.path.join(self.tmp.name, f"sample.{extension}")
+        _build_tar(path, mode)
+
+        start = time.perf_counter()
+        _read_with_tarfile(path)
+        baseline = time.perf_counter() - start
+
+        start = time.perf_counter()
+        members, error = verify_tar(path)
+        elapsed = time.perf_counter() - start
+
+        self.assertIsNone(error)
+        self.assertEqual(len(members), 504)
+        self.assertTrue(all(member.ok for member in members))
+        self.assertLessEqual(elapsed, baseline * TIME_MARGIN + TIME_SLACK,
+                             f"verify_tar took {elapsed:.2f}s, tarfile r|* {baseline:.2f}s")
+
+    def test_gz(self):
+        self.check_codec('tar.gz', 'w:gz')
+
+    def test_bz2(self):
+        self.check_codec('tar.bz2', 'w:bz2')
+
+    def test_xz(self):
+        self.check_codec('tar.xz', 'w:xz')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import re
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from PIL import Image
+    from pdf_stream import prepare_pages, write_pdf
+except ImportError as e:  # Pillow not installed
+    raise unittest.SkipTest(f"pdf_stream unavailable: {e}")
+
+
+class MultiFrameTest(unittest.TestCase):
+    """Every frame of a multi-page image becomes its own PDF page"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tiff = os.path.join(self.tmp.name, 'scan.tif')
+        frames = [Image.new('RGB', (40 + i * 10, 30), color) for i, color in enumerate(('red', 'green', 'blue'))]
+        frames[0].save(self.tiff, save_all=True, append_images=frames[1:])
+        self.png = os.path.join(self.tmp.name, 'single.png')
+        Image.new('L', (20, 20), 128).save(self.png)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_prepare_pages_returns_every_frame(self):
+        pages = prepare_pages(self.tiff)
+        self.assertEqual([page.width for page in pages], [40, 50, 60])
+
+    def test_pdf_page_count(self):
+        pdf_path = os.path.join(self.tmp.name, 'out.pdf')
+        progress = []
+        pages = write_pdf([self.tiff, self.png], pdf_path, workers=2,
+                          on_progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual(pages, 4)
+        self.assertEqual(progress, [(1, 2), (2, 2)])
+        with open(pdf_path, 'rb') as f:
+            data = f.read()
+        self.assertEqual(len(re.findall(rb'/Type /Page\b', data)), 4)
+        self.assertIn(b'/Count 4', data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,438 @@
+import io
+import os
+import re
+import time
+import bisect
+import hashlib
+from array import array
+from collections import OrderedDict
+
+# Bytes per kernel copy call; also how often merge progress is reported
+COPY_CHUNK = 64 * 1024 * 1024
+BUFFER_SIZE = 8 * 1024 * 1024
+HASH_CHUNK = 4 * 1024 * 1024
+READ_BUFFER = 1024 * 1024
+# Volume files a VolumeReader keeps open at once
+MAX_OPEN_VOLUMES = 16
+# Digest length (hex characters) -> hashlib algorithm, for checksum manifests
+DIGEST_ALGORITHMS = {32: 'md5', 40: 'sha1', 64: 'sha256', 128: 'sha512'}
+MANIFEST_NAMES = ('SHA256SUMS', 'SHA1SUMS', 'MD5SUMS', 'SHA512SUMS')
+MANIFEST_SUFFIXES = ('.sha256', '.sha256sum', '.sha1', '.md5', '.sha512')
+
+_VOLUME_NUMBER = re.compile(r'\.(\d{3,})$')
+
+
+def volume_base(first_volume):
+    """'backup.zip.001' -> 'backup.zip'; None if the name has no numeric volume suffix"""
+    match = _VOLUME_NUMBER.search(first_volume)
+    return first_volume[:match.start()] if match else None
+
+
+def _numbered_volumes(base):
+    """{volume number: path} for every base.NNN file, from one directory scan"""
+    directory = os.path.dirname(os.path.abspath(base))
+    prefix = os.path.basename(base) + '.'
+    numbered = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith(prefix):
+                suffix = entry.name[len(prefix):]
+                if suffix.isdigit() and len(suffix) >= 3:
+                    numbered[int(suffix)] = entry.path
+    return numbered
+
+
+def find_volumes(first_volume):
+    """Return the ordered volume paths of a .001/.002/... set with one directory scan"""
+    base = volume_base(first_volume)
+    if base is None:
+        raise ValueError(f"Not a numbered volume: {os.path.basename(first_volume)}")
+    numbered = _numbered_volumes(base)
+    volumes = []
+    number = 1
+    while number in numbered:
+        volumes.append(numbered[number])
+        number += 1
+    if not volumes:
+        raise FileNotFoundError(f"No volumes found for {os.path.basename(first_volume)}")
+    if len(volumes) != len(numbered):
+        raise FileNotFoundError(f"Volume {os.path.basename(base)}.{number:03d} is missing")
+    return volumes
+
+
+def is_volume_set(path):
+    return volume_base(path) is not None
+
+
+def logical_name(path):
+    """The archive name a volume set stands for ('backup.zip' for 'backup.zip.001'); other paths unchanged"""
+    return volume_base(path) or path
+
+
+class VolumeReader(io.RawIOBase):
+    """Read-only, seekable view of a volume set as one continuous file
+
+    Volume start offsets are kept in an array, so locating the volume for
+    any position is a binary search. Volume files are opened on demand and
+    the least recently used ones closed beyond MAX_OPEN_VOLUMES.
+    """
+
+    def __init__(self, volumes, max_open=MAX_OPEN_VOLUMES):
+        super().__init__()
+        self.volumes = list(volumes)
+        self.name = logical_name(self.volumes[0])
+        self.starts = array('Q', [0])
+        for volume in self.volumes:
+            self.starts.append(self.starts[-1] + os.path.getsize(volume))
+        self.size = self.starts[-1]
+        self.max_open = max_open
+        self._handles = OrderedDict()
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self._pos = offset
+        return offset
+
+    def volume_at(self, offset):
+        """Index of the volume holding the given offset of the joined stream"""
+        return bisect.bisect_right(self.starts, offset) - 1
+
+    def _handle(self, number):
+        handle = self._handles.get(number)
+        if handle is None:
+            if len(self._handles) >= self.max_open:
+                self._handles.popitem(last=False)[1].close()
+            handle = self._handles[number] = open(self.volumes[number], 'rb')
+        else:
+            self._handles.move_to_end(number)
+        return handle
+
+    def readinto(self, b):
+        if self._pos >= self.size:
+            return 0
+        number = self.volume_at(self._pos)
+        handle = self._handle(number)
+        handle.seek(self._pos - self.starts[number])
+        # One volume per call; BufferedReader asks again for the rest
+        view = memoryview(b)[:min(len(b), self.starts[number + 1] - self._pos)]
+        n = handle.readinto(view)
+        if not n:
+            raise IOError(f"Volume {os.path.basename(self.volumes[number])} is shorter than when the set was opened")
+        self._pos += n
+        return n
+
+    def close(self):
+        for handle in self._handles.values():
+            handle.close()
+        self._handles.clear()
+        super().close()
+
+
+def open_volume_set(first_volume):
+    """Open a .001/.002/... set as one buffered, seekable binary file"""
+    return io.BufferedReader(VolumeReader(find_volumes(first_volume)), buffer_size=READ_BUFFER)
+
+
+def open_archive_file(path):
+    """Binary file for an archive: the joined stream for a volume set, the file itself otherwise"""
+    return open_volume_set(path) if is_volume_set(path) else open(path, 'rb')
+
+
+class VolumeWriter(io.RawIOBase):
+    """Write-only file that rolls over to base.001, base.002, ... every volume_size bytes
+
+    Every volume but the last is exactly volume_size bytes, so any offset
+    maps to one volume; writes that go back to patch a header (as the ZIP
+    and 7z writers do) land in the right place. Volumes left over from an
+    earlier, longer set of the same name are removed on close.
+    """
+
+    def __init__(self, base_path, volume_size):
+        super().__init__()
+        if volume_size <= 0:
+            raise ValueError("Volume size must be positive")
+        self.base_path = base_path
+        self.name = base_path
+        self.volume_size = volume_size
+        self.volumes = []
+        self.size = 0
+        self._pos = 0
+        self._file = None
+        self._number = None
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self._pos = offset
+        return offset
+
+    def volume_path(self, number):
+        return f"{self.base_path}.{number + 1:03d}"
+
+    def _volume(self, number):
+        if number != self._number:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            while len(self.volumes) <= number:
+                path = self.volume_path(len(self.volumes))
+                open(path, 'wb').close()
+                self.volumes.append(path)
+            self._file = open(self.volumes[number], 'r+b')
+            self._number = number
+        return self._file
+
+    def write(self, b):
+        view = memoryview(b).cast('B')
+        written = 0
+        while written < len(view):
+            number, offset = divmod(self._pos, self.volume_size)
+            f = self._volume(number)
+            f.seek(offset)
+            n = min(len(view) - written, self.volume_size - offset)
+            f.write(view[written:written + n])
+            written += n
+            self._pos += n
+            self.size = max(self.size, self._pos)
+        return written
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._file is not None:
+                self._file.close()
+            if not self.volumes:
+                self._volume(0)
+                self._file.close()
+            for number, stale in _numbered_volumes(self.base_path).items():
+                if number > len(self.volumes):
+                    os.remove(stale)
+        finally:
+            self._file = None
+            super().close()
+
+
+def open_archive_output(path, volume_size=0):
+    """Binary file to write an archive to: rolling path.001, .002, ... volumes when volume_size is set"""
+    return VolumeWriter(path, volume_size) if volume_size else open(path, 'wb')
+
+
+def archive_size(path):
+    """Size of an archive file, or of all the volumes of a set together"""
+    if is_volume_set(path):
+        return sum(os.path.getsize(volume) for volume in find_volumes(path))
+    return os.path.getsize(path)
+
+
+def merged_output_path(first_volume):
+    """Where a merged set goes: the volume name without its number, e.g. backup.zip"""
+    base = volume_base(first_volume)
+    return base if os.path.splitext(base)[1] else base + '.zip'
+
+
+def _copy_kernel(src, dst, offset, length, method, on_bytes):
+    """Copy length bytes from src to dst at offset; returns the method that worked"""
+    copied = 0
+    while copied < length:
+        count = min(COPY_CHUNK, length - copied)
+        n = 0
+        if method == 'copy_file_range':
+            try:
+                n = os.copy_file_range(src, dst, count, None, offset + copied)
+            except OSError:
+                # Unsupported across these filesystems / by this kernel; retry with sendfile
+                method = 'sendfile'
+        if method == 'sendfile':
+            try:
+                os.lseek(dst, offset + copied, os.SEEK_SET)
+                n = os.sendfile(dst, src, None, count)
+            except OSError:
+                method = 'buffered'
+        if method == 'buffered':
+            os.lseek(dst, offset + copied, os.SEEK_SET)
+            n = 0
+            while n < count:
+                data = os.read(src, min(BUFFER_SIZE, count - n))
+                if not data:
+                    break
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(dst, view):]
+                n += len(data)
+        if n == 0:
+            raise IOError("Volume ended early")
+        copied += n
+        if on_bytes:
+            on_bytes(n)
+    return method
+
+
+def _preferred_copy_method():
+    if hasattr(os, 'copy_file_range'):
+        return 'copy_file_range'
+    if hasattr(os, 'sendfile'):
+        return 'sendfile'
+    return 'buffered'
+
+
+def _preallocate(fd, size):
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            pass  # Not supported by this filesystem
+    os.ftruncate(fd, size)
+
+
+class MergeReport:
+    """Outcome of merging a volume set"""
+
+    def __init__(self, output_path, volumes, total_bytes, elapsed, method):
+        self.output_path = output_path
+        self.volumes = volumes
+        self.total_bytes = total_bytes
+        self.elapsed = elapsed
+        self.method = method
+        self.checks = []  # (file name, ok) from a checksum manifest
+
+    @property
+    def verified(self):
+        return bool(self.checks) and all(ok for _, ok in self.checks)
+
+    @property
+    def mb_per_sec(self):
+        if self.elapsed <= 0:
+            return 0.0
+        return self.total_bytes / (1024 * 1024) / self.elapsed
+
+    def __str__(self):
+        text = (f"{len(self.volumes)} volumes, {self.total_bytes / (1024 * 1024):.1f} MB in {self.elapsed:.1f}s "
+                f"({self.mb_per_sec:.1f} MB/s, {self.method})")
+        if self.checks:
+            bad = [name for name, ok in self.checks if not ok]
+            text += f", checksums: {'all OK' if not bad else 'MISMATCH in ' + ', '.join(bad)}"
+        return text
+
+
+def merge_volume_files(volumes, output_path, on_progress=None):
+    """Concatenate volumes into output_path with kernel-side copies
+
+    The output is preallocated to its final size. on_progress(done, total)
+    is called with byte counts. Returns a MergeReport.
+    """
+    sizes = [os.path.getsize(volume) for volume in volumes]
+    total = sum(sizes)
+    done = 0
+    method = _preferred_copy_method()
+    start = time.perf_counter()
+
+    def on_bytes(count):
+        nonlocal done
+        done += count
+        if on_progress:
+            on_progress(done, total)
+
+    dst = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        _preallocate(dst, total)
+        offset = 0
+        for volume, size in zip(volumes, sizes):
+            src = os.open(volume, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+            try:
+                method = _copy_kernel(src, dst, offset, size, method, on_bytes)
+            finally:
+                os.close(src)
+            offset += size
+    except BaseException:
+        os.close(dst)
+        os.remove(output_path)
+        raise
+    os.close(dst)
+    return MergeReport(output_path, volumes, total, time.perf_counter() - start, method)
+
+
+def find_checksum_manifest(first_volume):
+    """Look next to the volumes for base.sha256 / base.md5 / SHA256SUMS style files"""
+    base = volume_base(first_volume) or first_volume
+    directory = os.path.dirname(os.path.abspath(first_volume))
+    candidates = [base + suffix for suffix in MANIFEST_SUFFIXES]
+    candidates += [os.path.join(directory, name) for name in MANIFEST_NAMES]
+    return next((path for path in candidates if os.path.isfile(path)), None)
+
+
+def read_checksum_manifest(manifest_path):
+    """Parse sha256sum/md5sum style lines into {file name: (algorithm, hex digest)}"""
+    checksums = {}
+    with open(manifest_path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            parts = line.strip().split(None, 1)
+            if len(parts) != 2:
+                continue
+            digest, name = parts[0].lower(), parts[1].lstrip('*')
+            algorithm = DIGEST_ALGORITHMS.get(len(digest))
+            if algorithm and all(c in '0123456789abcdef' for c in digest):
+                checksums[os.path.basename(name)] = (algorithm, digest)
+    return checksums
+
+
+def file_digest(path, algorithm, on_bytes=None):
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+            if on_bytes:
+                on_bytes(len(chunk))
+    return digest.hexdigest()
+
+
+def verify_checksums(paths, checksums, on_progress=None):
+    """Check each path listed in checksums; returns [(file name, ok)]"""
+    listed = [path for path in paths if os.path.basename(path) in checksums]
+    total = sum(os.path.getsize(path) for path in listed)
+    done = 0
+
+    def on_bytes(count):
+        nonlocal done
+        done += count
+        if on_progress:
+            on_progress(done, total)
+
+    results = []
+    for path in listed:
+        algorithm, expected = checksums[os.path.basename(path)]
+        results.append((os.path.basename(path), file_digest(path, algorithm, on_bytes) == expected))
+    return results
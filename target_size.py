@@ -0,0 +1,101 @@
+import os
+import hashlib
+
+# MP4 container overhead, as a share of the stream bitrates
+MUX_OVERHEAD = 0.01
+# Below this there is not enough room left for any watchable video
+MIN_VIDEO_KBPS = 50
+# Accepted miss, as a share of the requested size
+DEFAULT_TOLERANCE = 0.03
+# Second passes run after the first when the size misses the tolerance
+MAX_RETRIES = 2
+# First-pass stats folders kept, newest first
+MAX_PASSLOGS = 16
+
+
+def default_passlog_dir():
+    """First-pass stats live next to the probe cache, so later runs can skip pass 1"""
+    return os.path.join(os.path.expanduser('~'), '.auto_ffmpeg', 'passlogs')
+
+
+def video_bitrate_for(target_bytes, duration, audio_kbps):
+    """Video kbit/s that makes a file of duration seconds come out at target_bytes"""
+    if duration <= 0:
+        raise ValueError("Cannot target a size without knowing the duration")
+    total_kbps = target_bytes * 8 / duration / 1000 / (1 + MUX_OVERHEAD)
+    video_kbps = total_kbps - audio_kbps
+    if video_kbps < MIN_VIDEO_KBPS:
+        raise ValueError(f"{target_bytes / (1024 * 1024):.1f} MB is too small for {duration:.0f}s "
+                         f"with {audio_kbps} kbit/s audio")
+    return video_kbps
+
+
+def corrected_bitrate(video_kbps, target_bytes, actual_bytes, audio_bytes):
+    """Scale the video bitrate by how far the video part of the last attempt missed"""
+    wanted = max(1, target_bytes - audio_bytes)
+    got = max(1, actual_bytes - audio_bytes)
+    return max(MIN_VIDEO_KBPS, video_kbps * wanted / got)
+
+
+def within_tolerance(actual_bytes, target_bytes, tolerance):
+    return abs(actual_bytes - target_bytes) <= target_bytes * tolerance
+
+
+def passlog_prefix(passlog_dir, input_identity, settings):
+    """Stats file prefix for one input and x264 preset; the stats hold for any bitrate"""
+    key = f"{input_identity}|{settings['preset']}".encode('utf-8', 'surrogateescape')
+    folder = os.path.join(passlog_dir, hashlib.sha1(key).hexdigest())
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, 'x264')
+
+
+def has_passlog(prefix):
+    return os.path.exists(prefix + '-0.log') and os.path.exists(prefix + '-0.log.mbtree')
+
+
+def prune_passlogs(passlog_dir, keep=MAX_PASSLOGS, in_use=()):
+    """Drop all but the most recently used stats folders, never one in in_use
+
+    This is housekeeping only: a folder that cannot be removed is left for
+    the next run.
+    """
+    try:
+        with os.scandir(passlog_dir) as entries:
+            folders = sorted((entry for entry in entries if entry.is_dir()),
+                             key=lambda entry: entry.stat().st_mtime, reverse=True)
+    except OSError:
+        return
+    in_use = {os.path.abspath(folder) for folder in in_use}
+    for entry in folders[keep:]:
+        if os.path.abspath(entry.path) in in_use:
+            continue
+        try:
+            for name in os.listdir(entry.path):
+                os.remove(os.path.join(entry.path, name))
+            os.rmdir(entry.path)
+        except OSError:
+            continue
+
+
+def build_pass_command(ffmpeg_path, input_file, output_file, settings, video_kbps, pass_number, passlog,
+                       threads=None):
+    """libx264 two-pass command; pass 1 only writes stats, so it skips audio and output"""
+    cmd = [
+        ffmpeg_path,
+        '-i', input_file,
+        '-c:v', 'libx264',
+        '-b:v', f"{video_kbps:.0f}k",
+        '-preset', settings['preset'],
+        '-pass', str(pass_number),
+        '-passlogfile', passlog,
+    ]
+    if threads:
+        cmd += ['-threads', str(threads)]
+    if pass_number == 1:
+        return cmd + ['-an', '-sn', '-dn', '-f', 'null', '-y', os.devnull]
+    return cmd + [
+        '-c:a', 'aac',
+        '-b:a', f"{settings['audio_quality']}k",
+        '-movflags', '+faststart',
+        '-y', output_file
+    ]
@@ -0,0 +1,589 @@
+import os
+import sys
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+from collections import deque
+from threading import Lock, Thread
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ffmpeg_progress import ProgressEvent, ProgressParser, ProgressPublisher, ffprobe_path_for, parse_duration
+from chunked_encode import (build_audio_command, build_concat_command, build_segment_command, keyframe_times,
+                            plan_segments, segment_length_for, write_concat_list)
+from media_probe import PLAN_COPY, PLAN_FULL, MediaInfo, ProbeCache, plan_transcode, probe_media
+from crf_search import QUALITY_TARGETS, SampleCache, search_crf, target_score
+from target_size import (DEFAULT_TOLERANCE, MAX_RETRIES, build_pass_command, corrected_bitrate, default_passlog_dir,
+                         has_passlog, passlog_prefix, prune_passlogs, video_bitrate_for, within_tolerance)
+
+# CRF / preset / audio bitrate (kbps) per quality preset. copy_bpp is the
+# most video bits per pixel per frame an H.264 input may have to be
+# stream-copied instead of re-encoded, roughly what that CRF produces.
+QUALITY_PRESETS = {
+    "high": {"crf": 18, "preset": "slow", "audio_quality": 192, "copy_bpp": 0.13},
+    "balanced": {"crf": 22, "preset": "medium", "audio_quality": 160, "copy_bpp": 0.075},
+    "medium": {"crf": 26, "preset": "fast", "audio_quality": 128, "copy_bpp": 0.045},
+    "small": {"crf": 30, "preset": "veryfast", "audio_quality": 96, "copy_bpp": 0.025},
+}
+
+# Machine-readable progress on stdout, only real errors on stderr
+PROGRESS_ARGS = ['-hide_banner', '-nostats', '-loglevel', 'error', '-progress', 'pipe:1']
+# Without a probed duration ffmpeg's own Duration line is needed, so every
+# stderr line is logged with its level and only errors are kept
+DURATION_LOGLEVEL = 'level+info'
+ERROR_TAGS = ('[error] ', '[fatal] ', '[panic] ')
+
+# libx264 stops scaling well past this many threads per encode, so on big
+# machines it is faster to run several encoders side by side
+X264_THREADS_PER_JOB = 4
+
+
+def get_quality_settings(quality):
+    """Return FFmpeg parameters for a quality preset name"""
+    return dict(QUALITY_PRESETS.get(quality, QUALITY_PRESETS["small"]))
+
+
+def default_worker_count(threads_per_job=X264_THREADS_PER_JOB):
+    """Number of parallel ffmpeg processes that fills the machine"""
+    cores = os.cpu_count() or 1
+    return max(1, cores // max(1, threads_per_job))
+
+
+def startupinfo():
+    """Hide the console window of child processes on Windows"""
+    if platform.system() == "Windows":
+        info = subprocess.STARTUPINFO()
+        info.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        return info
+    return None
+
+
+def build_ffmpeg_command(ffmpeg_path, input_file, output_file, settings, threads=None, plan=PLAN_FULL):
+    """Build the libx264/aac command line used for every conversion
+
+    PLAN_COPY remuxes both streams and PLAN_AUDIO re-encodes only the audio.
+    """
+    cmd = [ffmpeg_path, '-i', input_file]
+    if plan == PLAN_FULL:
+        cmd += [
+            '-c:v', 'libx264',
+            '-crf', str(settings['crf']),
+            '-preset', settings['preset'],
+        ]
+        if threads:
+            cmd += ['-threads', str(threads)]
+    else:
+        # Subtitle and data streams cannot be copied into MP4 as they are
+        cmd += ['-map', '0:v:0', '-map', '0:a:0?', '-sn', '-dn', '-c:v', 'copy']
+    if plan == PLAN_COPY:
+        cmd += ['-c:a', 'copy']
+    else:
+        cmd += [
+            '-c:a', 'aac',
+            '-b:a', f"{settings['audio_quality']}k",
+        ]
+    cmd += [
+        '-movflags', '+faststart',
+        '-y',  # Overwrite output
+        output_file
+    ]
+    return cmd
+
+
+def with_progress(cmd, loglevel='error'):
+    """Insert the -progress reporting flags after the binary"""
+    args = list(PROGRESS_ARGS)
+    args[args.index('-loglevel') + 1] = loglevel
+    return cmd[:1] + args + cmd[1:]
+
+
+def _drain(stream, tail):
+    """Keep the last lines of a pipe so the child never blocks on it"""
+    for line in stream:
+        tail.append(line.rstrip())
+
+
+def _drain_with_duration(stream, tail, parser):
+    """Like _drain for a level-tagged info log: take the first Duration line, keep only errors"""
+    for line in stream:
+        line = line.rstrip()
+        if not parser.duration:
+            parser.duration = parse_duration(line) or parser.duration
+        tag = next((tag for tag in ERROR_TAGS if tag in line), None)
+        if tag:
+            context, _, message = line.partition(tag)
+            tail.append(f"{context}{message}")
+
+
+class TranscodeJob:
+    """One input/output/preset conversion request"""
+
+    def __init__(self, input_file, output_file, quality="balanced", settings=None, chunked=False, allow_copy=True,
+                 target_size_mb=None, size_tolerance=DEFAULT_TOLERANCE, auto_crf=False, metric='ssim'):
+        if not output_file.lower().endswith('.mp4'):
+            output_file += '.mp4'
+        self.input_file = input_file
+        self.output_file = output_file
+        self.quality = quality
+        self.settings = settings or get_quality_settings(quality)
+        self.chunked = chunked  # split at keyframes and encode segments in parallel
+        self.allow_copy = allow_copy  # stream-copy inputs that already meet the preset
+        self.target_size_mb = target_size_mb  # two-pass to this size instead of the preset's CRF
+        self.size_tolerance = size_tolerance
+        self.auto_crf = auto_crf  # pick the CRF per input from sample encodes; quality sets the target score
+        self.metric = metric  # 'ssim' or 'psnr'
+
+    def __repr__(self):
+        return f"TranscodeJob({self.input_file!r} -> {self.output_file!r}, {self.quality})"
+
+
+class TranscodeResult:
+    """Outcome of a single TranscodeJob"""
+
+    def __init__(self, job):
+        self.job = job
+        self.returncode = None
+        self.error = None
+        self.elapsed = 0.0
+        self.media_duration = 0.0
+        self.input_size = 0
+        self.output_size = 0
+        self.segments = 0  # parallel segments of a chunked encode
+        self.plan = None  # media_probe PLAN_COPY / PLAN_AUDIO / PLAN_FULL
+        self.passes = 0  # ffmpeg passes run by a target-size encode
+        self.video_kbps = None  # bitrate of the last target-size pass
+        self.size_error = None  # relative size miss when the retries ran out outside the tolerance
+        self.crf_search = None  # crf_search.CRFSearch for auto-CRF jobs
+        self.warnings = []  # problems worked around, e.g. a fallback to a plain encode
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and self.error is None
+
+
+class BatchSummary:
+    """Aggregate statistics for a batch of jobs"""
+
+    def __init__(self, results, wall_time):
+        self.results = results
+        self.wall_time = wall_time
+
+    @property
+    def succeeded(self):
+        return [r for r in self.results if r.ok]
+
+    @property
+    def failed(self):
+        return [r for r in self.results if not r.ok]
+
+    @property
+    def media_seconds(self):
+        return sum(r.media_duration for r in self.succeeded)
+
+    @property
+    def throughput(self):
+        """Seconds of media encoded per wall-clock second"""
+        if self.wall_time <= 0:
+            return 0.0
+        return self.media_seconds / self.wall_time
+
+    def __str__(self):
+        return (f"{len(self.succeeded)}/{len(self.results)} jobs ok, "
+                f"{self.media_seconds:.1f}s of media in {self.wall_time:.1f}s "
+                f"({self.throughput:.2f}x realtime)")
+
+
+class TranscodeEngine:
+    """Run TranscodeJobs on a pool of parallel ffmpeg processes"""
+
+    def __init__(self, ffmpeg_path, workers=None, threads_per_job=X264_THREADS_PER_JOB,
+                 ffprobe_path=None, max_progress_rate=4.0, probe_cache=None, passlog_dir=None, sample_cache=None):
+        self.ffmpeg_path = ffmpeg_path
+        self.ffprobe_path = ffprobe_path or ffprobe_path_for(ffmpeg_path)
+        self.probe_cache = probe_cache
+        self.passlog_dir = passlog_dir or default_passlog_dir()
+        self.sample_cache = sample_cache
+        self.threads_per_job = threads_per_job
+        self.workers = workers or default_worker_count(threads_per_job)
+        self.progress = ProgressPublisher(max_progress_rate)
+        self._processes = set()
+        self._lock = Lock()
+        self._passlogs_in_use = set()  # stats folders of running target-size jobs
+        self._passlog_lock = Lock()
+        self._cancelled = False
+
+    def run_job(self, job, on_progress=None, slots=None):
+        """Encode one job in the calling thread and return its TranscodeResult
+
+        ProgressEvents go to every listener subscribed on self.progress and
+        to on_progress(event), throttled to max_progress_rate per second.
+        Chunked jobs are split at keyframes and encoded on self.workers
+        parallel ffmpeg processes.
+
+        slots is how many of self.workers this job may occupy (all of them
+        by default). A job that has the machine to itself leaves the thread
+        count to libx264, which then uses every core.
+        """
+        result = TranscodeResult(job)
+        start = time.monotonic()
+        slots = self.workers if slots is None else slots
+        threads = None if slots >= self.workers else self.threads_per_job
+        try:
+            if not os.path.exists(job.input_file):
+                raise FileNotFoundError(f"Input file does not exist: {job.input_file}")
+            result.input_size = os.path.getsize(job.input_file)
+            info = self.probe(job.input_file)
+            duration = info.duration
+            if job.target_size_mb or not job.allow_copy:
+                result.plan = PLAN_FULL
+            else:
+                result.plan = plan_transcode(info, job.settings)
+
+            # The searched CRF stays with this run; the caller's job keeps its preset settings
+            settings = job.settings
+            if job.auto_crf and not job.target_size_mb and result.plan == PLAN_FULL and duration:
+                # Sample encodes share the slots this job owns, like its other ffmpeg processes
+                try:
+                    result.crf_search = search_crf(
+                        self._run_capture, self.ffmpeg_path, job.input_file, duration, settings,
+                        target_score(job.metric, job.quality), job.metric, slots,
+                        self.threads_per_job if slots > 1 else threads,
+                        self.sample_cache, ProbeCache.identity(job.input_file))
+                except (OSError, RuntimeError, ValueError) as e:
+                    if self._cancelled:
+                        raise RuntimeError("Cancelled") from e
+                    # The preset's CRF still gives a perfectly good encode
+                    result.warnings.append(f"CRF search failed, using the preset's CRF {settings['crf']}: {e}")
+                else:
+                    settings = dict(settings, crf=result.crf_search.crf)
+
+            keyframes = None
+            if job.chunked and duration and result.plan == PLAN_FULL and not job.target_size_mb:
+                keyframes = self._keyframes(job, result)
+
+            if job.target_size_mb:
+                self._run_target_size(job, info, result, on_progress, threads)
+            elif keyframes is not None:
+                self._run_chunked(job, info, result, on_progress, settings, keyframes)
+            else:
+                cmd = build_ffmpeg_command(self.ffmpeg_path, job.input_file, job.output_file,
+                                           settings, threads=threads, plan=result.plan)
+                publish = lambda event: self.progress.publish(event, on_progress)
+                returncode, errors, last = self._run_ffmpeg(cmd, job, duration, publish)
+                result.returncode = returncode
+                result.media_duration = duration or (last and (last.duration or last.out_time)) or 0.0
+                result.error = self._failure(returncode, errors)
+            if result.ok:
+                result.output_size = os.path.getsize(job.output_file)
+        except Exception as e:
+            result.error = str(e)
+        finally:
+            self.progress.forget(job)
+        result.elapsed = time.monotonic() - start
+        return result
+
+    def probe(self, input_file):
+        """MediaInfo for an input; an empty one (unknown duration, full transcode) if ffprobe fails"""
+        try:
+            return probe_media(self.ffprobe_path, input_file, self.probe_cache, startupinfo())
+        except (OSError, RuntimeError, ValueError):
+            return MediaInfo({})
+
+    def _run_ffmpeg(self, cmd, job, duration, on_event=None):
+        """Run one ffmpeg command, feeding every ProgressEvent to on_event
+
+        Returns (returncode, last stderr lines, last ProgressEvent).
+        """
+        process = subprocess.Popen(
+            with_progress(cmd, 'error' if duration else DURATION_LOGLEVEL),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            startupinfo=startupinfo()
+        )
+        with self._lock:
+            self._processes.add(process)
+        errors = deque(maxlen=20)
+        parser = ProgressParser(job, duration)
+        if duration:
+            drain = Thread(target=_drain, args=(process.stderr, errors), daemon=True)
+        else:
+            drain = Thread(target=_drain_with_duration, args=(process.stderr, errors, parser), daemon=True)
+        drain.start()
+        try:
+            for line in process.stdout:
+                event = parser.feed(line)
+                if event and on_event:
+                    on_event(event)
+            process.wait()
+            drain.join()
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+        return process.returncode, errors, parser.last_event
+
+    def _run_capture(self, cmd):
+        """Run an ffmpeg command without progress reporting; returns (returncode, stderr text)"""
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            startupinfo=startupinfo()
+        )
+        with self._lock:
+            self._processes.add(process)
+        try:
+            _, stderr = process.communicate()
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+        return process.returncode, stderr
+
+    def _failure(self, returncode, errors):
+        """Error text for a finished ffmpeg process, None on success"""
+        if returncode == 0:
+            return None
+        if self._cancelled:
+            return "Cancelled"
+        detail = errors[-1] if errors else f"exit code {returncode}"
+        return f"ffmpeg failed: {detail}"
+
+    def _run_target_size(self, job, info, result, on_progress, threads=None):
+        """Two-pass encode to job.target_size_mb, redoing only pass 2 with a corrected bitrate on a miss
+
+        The first-pass stats are kept per input and x264 preset, so retries
+        here and later runs with another size skip pass 1.
+        """
+        duration = info.duration
+        target_bytes = job.target_size_mb * 1024 * 1024
+        audio_kbps = job.settings['audio_quality'] if info.audio is not None else 0
+        audio_bytes = audio_kbps * 1000 / 8 * duration
+        result.video_kbps = video_bitrate_for(target_bytes, duration, audio_kbps)
+        result.media_duration = duration
+        passlog = passlog_prefix(self.passlog_dir, ProbeCache.identity(job.input_file), job.settings)
+        folder = os.path.dirname(passlog)
+        os.utime(folder)
+        with self._passlog_lock:
+            self._passlogs_in_use.add(folder)
+            prune_passlogs(self.passlog_dir, in_use=self._passlogs_in_use)
+        try:
+            self._run_passes(job, duration, target_bytes, audio_bytes, passlog, result, on_progress, threads)
+        finally:
+            with self._passlog_lock:
+                self._passlogs_in_use.discard(folder)
+
+    def _run_passes(self, job, duration, target_bytes, audio_bytes, passlog, result, on_progress, threads):
+        """Pass 1 unless its stats exist, then pass 2 until the size fits or the retries run out"""
+        # Passes expected in total, for one progress figure across all of them
+        planned = [2 if not has_passlog(passlog) else 1]
+
+        def run_pass(number):
+            done = result.passes
+
+            def publish(event):
+                out_time = event.out_time or 0.0
+                total_us = int((done * duration + min(out_time, duration)) * 1000000)
+                self.progress.publish(ProgressEvent(job, duration * planned[0], {'out_time_us': str(total_us)}),
+                                      on_progress)
+
+            cmd = build_pass_command(self.ffmpeg_path, job.input_file, job.output_file, job.settings,
+                                     result.video_kbps, number, passlog, threads)
+            returncode, errors, _ = self._run_ffmpeg(cmd, job, duration, publish)
+            result.passes += 1
+            result.returncode = returncode
+            result.error = self._failure(returncode, errors)
+            return result.ok
+
+        reused_stats = has_passlog(passlog)
+        if not reused_stats and not run_pass(1):
+            return
+        for attempt in range(MAX_RETRIES + 1):
+            if not run_pass(2):
+                if not reused_stats or self._cancelled:
+                    return
+                # Stale or damaged stats from an earlier run; measure again
+                reused_stats = False
+                planned[0] += 2
+                if not run_pass(1) or not run_pass(2):
+                    return
+            actual = os.path.getsize(job.output_file)
+            if within_tolerance(actual, target_bytes, job.size_tolerance):
+                break
+            if attempt == MAX_RETRIES:
+                result.size_error = actual / target_bytes - 1
+                break
+            result.video_kbps = corrected_bitrate(result.video_kbps, target_bytes, actual, audio_bytes)
+            planned[0] += 1
+        self.progress.publish(ProgressEvent(job, duration, {'progress': 'end'}), on_progress)
+
+    def _keyframes(self, job, result):
+        """Keyframe times for a chunked encode, or None (with a warning) to encode in one piece"""
+        try:
+            return keyframe_times(self.ffprobe_path, job.input_file, startupinfo())
+        except (OSError, RuntimeError) as e:
+            result.warnings.append(f"Chunked encode skipped, encoding in one piece: {e}")
+            return None
+
+    def _run_chunked(self, job, info, result, on_progress, settings, keyframes):
+        """Encode keyframe-aligned segments in parallel, the audio on its own, then join them losslessly"""
+        duration = info.duration
+        segments = plan_segments(keyframes, duration, segment_length_for(duration, self.workers))
+        result.media_duration = duration
+        result.segments = len(segments)
+        # Seconds encoded so far per segment; summed into one progress figure for the job
+        encoded = [0.0] * len(segments)
+        progress_lock = Lock()
+        failed = []
+        # Segments share the machine, unless there is only one worker
+        threads = self.threads_per_job if self.workers > 1 else None
+
+        def publish(index, event):
+            with progress_lock:
+                if event.out_time is not None:
+                    encoded[index] = min(event.out_time, segments[index][1])
+                total_us = int(sum(encoded) * 1000000)
+            self.progress.publish(ProgressEvent(job, duration, {'out_time_us': str(total_us)}), on_progress)
+
+        def run_step(index, cmd):
+            if failed or self._cancelled:
+                return
+            on_event = (lambda event: publish(index, event)) if index is not None else None
+            returncode, errors, _ = self._run_ffmpeg(cmd, job, duration, on_event)
+            error = self._failure(returncode, errors)
+            if error:
+                failed.append(error)
+
+        out_dir = os.path.dirname(os.path.abspath(job.output_file))
+        with tempfile.TemporaryDirectory(prefix='.chunks-', dir=out_dir) as work_dir:
+            segment_files = [os.path.join(work_dir, f"segment{i:05d}.mp4") for i in range(len(segments))]
+            audio_file = None
+            steps = []
+            if info.audio is not None:
+                audio_file = os.path.join(work_dir, 'audio.m4a')
+                steps.append((None, build_audio_command(self.ffmpeg_path, job.input_file, audio_file, settings)))
+            steps += [(i, build_segment_command(self.ffmpeg_path, job.input_file, segment_files[i], start, length,
+                                                settings, threads))
+                      for i, (start, length) in enumerate(segments)]
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for future in [pool.submit(run_step, index, cmd) for index, cmd in steps]:
+                    future.result()
+            if failed:
+                result.returncode = 1
+                result.error = failed[0]
+                return
+
+            list_file = os.path.join(work_dir, 'segments.txt')
+            write_concat_list(list_file, segment_files)
+            cmd = build_concat_command(self.ffmpeg_path, list_file, audio_file, job.output_file)
+            returncode, errors, _ = self._run_ffmpeg(cmd, job, duration)
+            result.returncode = returncode
+            result.error = self._failure(returncode, errors)
+        if result.ok:
+            self.progress.publish(ProgressEvent(job, duration, {'progress': 'end'}), on_progress)
+
+    def run(self, jobs, on_progress=None, on_job_done=None):
+        """Run all jobs in parallel and return a BatchSummary
+
+        on_job_done(result) is called from the worker thread as each job ends.
+        Chunked jobs already use every worker, so those run one at a time.
+        """
+        self._cancelled = False
+        start = time.monotonic()
+        results = []
+        if any(job.chunked for job in jobs):
+            workers = 1
+        else:
+            workers = max(1, min(self.workers, len(jobs)))
+        # Jobs run one at a time get every worker; side by side, one each
+        slots = self.workers if workers == 1 else 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self._run_queued, job, on_progress, slots) for job in jobs]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if on_job_done:
+                    on_job_done(result)
+        return BatchSummary(results, time.monotonic() - start)
+
+    def _run_queued(self, job, on_progress, slots):
+        if self._cancelled:
+            result = TranscodeResult(job)
+            result.error = "Cancelled"
+            return result
+        return self.run_job(job, on_progress, slots)
+
+    def cancel(self):
+        """Stop queued jobs and terminate running ffmpeg processes"""
+        self._cancelled = True
+        with self._lock:
+            for process in self._processes:
+                process.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch transcode videos to H.264/AAC MP4")
+    parser.add_argument('inputs', nargs='+', help='input video files')
+    parser.add_argument('--output-dir', '-o', help='output directory (default: next to input)')
+    parser.add_argument('--quality', '-q', default='balanced', choices=sorted(QUALITY_PRESETS))
+    parser.add_argument('--jobs', '-j', type=int, help='parallel ffmpeg processes')
+    parser.add_argument('--threads', type=int, default=X264_THREADS_PER_JOB,
+                        help='libx264 threads per process when several run at once')
+    parser.add_argument('--ffmpeg', default='ffmpeg', help='path to ffmpeg binary')
+    parser.add_argument('--chunked', action='store_true',
+                        help='split each input at keyframes and encode the segments in parallel')
+    parser.add_argument('--target-size', type=float, metavar='MB',
+                        help='two-pass encode each output to this size instead of the preset CRF')
+    parser.add_argument('--size-tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='accepted size miss as a fraction (default %(default)s)')
+    parser.add_argument('--auto-crf', action='store_true',
+                        help='choose the CRF per input from sample encodes; --quality sets the target score')
+    parser.add_argument('--metric', default='ssim', choices=sorted(QUALITY_TARGETS),
+                        help='quality metric for --auto-crf')
+    parser.add_argument('--always-encode', action='store_true',
+                        help='re-encode even inputs that could be stream-copied')
+    parser.add_argument('--no-cache', action='store_true', help='do not cache ffprobe results or CRF samples')
+    parser.add_argument('--verbose', '-v', action='store_true', help='print encode progress')
+    args = parser.parse_args()
+
+    jobs = []
+    for input_file in args.inputs:
+        dir_name, file_name = os.path.split(input_file)
+        name = os.path.splitext(file_name)[0]
+        out_dir = args.output_dir or dir_name
+        jobs.append(TranscodeJob(input_file, os.path.join(out_dir, f"{name}_compressed.mp4"), args.quality,
+                                 chunked=args.chunked, allow_copy=not args.always_encode,
+                                 target_size_mb=args.target_size, size_tolerance=args.size_tolerance,
+                                 auto_crf=args.auto_crf, metric=args.metric))
+
+    engine = TranscodeEngine(args.ffmpeg, workers=args.jobs, threads_per_job=args.threads,
+                             max_progress_rate=1.0, probe_cache=None if args.no_cache else ProbeCache(),
+                             sample_cache=None if args.no_cache else SampleCache())
+    if args.verbose:
+        def log_progress(event):
+            percent = f"{event.percent:.1f}%" if event.percent is not None else "?"
+            speed = f"{event.speed}x" if event.speed is not None else "?"
+            print(f"{event.job.input_file}: {percent} fps={event.fps} speed={speed}")
+        engine.progress.subscribe(log_progress)
+
+    def report(result):
+        status = f"ok ({result.plan})" if result.ok else f"FAILED ({result.error})"
+        if result.ok and result.passes:
+            status += f", {result.output_size / (1024 * 1024):.1f} MB after {result.passes} passes"
+        if result.ok and result.size_error is not None:
+            status += f" ({result.size_error:+.1%} off target)"
+        if result.ok and result.crf_search:
+            status += f", {result.crf_search}"
+        for warning in result.warnings:
+            print(f"{result.job.input_file}: warning: {warning}")
+        print(f"{result.job.input_file}: {status} in {result.elapsed:.1f}s")
+
+    summary = engine.run(jobs, on_job_done=report)
+    print(summary)
+    return 0 if not summary.failed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
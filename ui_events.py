@@ -0,0 +1,55 @@
+import sys
+from threading import Lock
+from collections import deque
+
+
+class UIEventBus:
+    """Collect UI updates from worker threads and apply them on the Tk main loop
+
+    Keyed state (progress value, status text) is coalesced so only the latest
+    value per key is drawn once per frame. One-off calls such as message boxes
+    run in the order they were posted.
+    """
+
+    def __init__(self, root, fps=30):
+        self.root = root
+        self.interval = max(1, int(1000 / fps))
+        self._handlers = {}
+        self._pending = {}
+        self._calls = deque()
+        self._lock = Lock()
+        self.root.after(self.interval, self._drain)
+
+    def register(self, key, handler):
+        """Apply handler(value) for the latest value posted under key"""
+        self._handlers[key] = handler
+
+    def set(self, key, value):
+        """Post coalesced state; may be called from any thread"""
+        with self._lock:
+            self._pending[key] = value
+
+    def call(self, func, *args, **kwargs):
+        """Queue func(*args, **kwargs) to run on the Tk thread"""
+        self._calls.append((func, args, kwargs))
+
+    def _run(self, func, *args, **kwargs):
+        """Run one update; a failing one is reported like any Tk callback and does not stop the rest"""
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            self.root.report_callback_exception(*sys.exc_info())
+
+    def _drain(self):
+        try:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            for key, value in pending.items():
+                handler = self._handlers.get(key)
+                if handler is not None:  # no handler (yet) for this key: nothing to draw
+                    self._run(handler, value)
+            while self._calls:
+                func, args, kwargs = self._calls.popleft()
+                self._run(func, *args, **kwargs)
+        finally:
+            self.root.after(self.interval, self._drain)